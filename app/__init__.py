@@ -28,19 +28,44 @@ def create_app(config_name='default'):
     except OSError:
         pass
     
+    # Time pool checkouts when a QueuePool is in use
+    from sqlalchemy.pool import QueuePool
+    from app.db_metrics import TimedQueuePool, install_pool_metrics
+    engine_options = app.config.get('SQLALCHEMY_ENGINE_OPTIONS')
+    if engine_options and engine_options.get('poolclass') is QueuePool:
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = dict(engine_options, poolclass=TimedQueuePool)
+    
     # Initialize extensions with app
     db.init_app(app)
     login_manager.init_app(app)
     
+    from app.profiling import init_profiling
+    with app.app_context():
+        install_pool_metrics(db.engine)
+        init_profiling(app, db.engine)
+
+    from app.storage import init_image_store
+    from app.image_processing import init_image_pool
+    from app.image_resize import init_image_resizer
+    from app.cache import init_cache
+    from app.ai_gateway import init_ai_gateway
+    from app.assets import init_assets
+    init_image_store(app)
+    init_image_pool(app)
+    init_image_resizer(app)
+    init_cache(app)
+    init_ai_gateway(app)
+    init_assets(app)
+    
     # Configure login manager
     login_manager.login_view = 'main.login'
     login_manager.login_message = 'Please log in to access this page.'
     
-    # User loader callback
+    # User loader callback; the session's cached identity usually saves the query
     @login_manager.user_loader
     def load_user(user_id):
-        from app.models import User
-        return User.query.get(int(user_id))
+        from app.auth_cache import load_user
+        return load_user(int(user_id))
     
     # Register blueprints
     from app.routes import main
@@ -62,7 +87,9 @@ def create_app(config_name='default'):
         with app.app_context():
             try:
                 from app import models
+                from app.search import ensure_search_index
                 db.create_all()
+                ensure_search_index()
             except Exception as e:
                 print(f"Database initialization skipped or failed: {e}")
     
@@ -0,0 +1,198 @@
+"""
+Response cache for Ask AI.
+
+Answers are keyed by the normalized prompt, the model family that
+produced them (gemini, gemma, llama, ...) and the max_tokens budget they
+were generated under (a short-budget answer may be truncated), so a
+repeat question is served without an LLM round trip. Entries expire after
+AI_CACHE_TTL and the least recently used are evicted past
+AI_CACHE_MAXSIZE. An in-process LRU sits in front of an optional SQLite
+file (AI_CACHE_PATH) that all workers on a host share.
+
+Answers are cleaned (clean_reasoning_output) once, before they are stored.
+"""
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+from app.cache import LRUCache
+
+_SIGNATURE = re.compile(
+    r'(Sharmila[\s\S]*from\s+(Dibakar|Cristiano Ronaldo|Virat Kohli|Park Bo Gum|Karan Aujla))', re.I)
+
+
+def clean_reasoning_output(text):
+    """
+    Server-side port of the cleanReasoningOutput the browser used to run on
+    every answer: pull the signed message out of short personality replies
+    and drop blank lines some models emit before the answer.
+
+    The browser version also listed "thinking" headers (Okay, First, Based
+    on, ...), but tested them against a trimmed line where their trailing
+    newline could never match, so they never stripped anything. That is kept,
+    rather than starting to cut genuine answers that open with "First".
+    """
+    if not text:
+        return text
+
+    if len(text) < 1000:
+        match = _SIGNATURE.search(text)
+        if match:
+            return match.group(1).strip()
+
+    lines = text.split('\n')
+    start = 0
+    while start < len(lines) and not lines[start].strip():
+        start += 1
+    if start:
+        text = '\n'.join(lines[start:]).strip() or text
+    return text
+
+
+def normalize_prompt(prompt):
+    """Case, Unicode form, whitespace and trailing punctuation don't change the answer."""
+    prompt = unicodedata.normalize('NFKC', prompt).casefold()
+    return ' '.join(prompt.split()).rstrip(' ?!.')
+
+
+def model_family(model):
+    """'meta/llama-3.1-405b-instruct' -> 'llama', 'deepseek-ai/DeepSeek-R1' -> 'deepseek'."""
+    name = model.rsplit('/', 1)[-1].lower()
+    match = re.match(r'[a-z]+', name)
+    return match.group(0) if match else name
+
+
+class SQLiteBackend:
+    """Cache entries in a SQLite file, so workers on the same host share them."""
+
+    def __init__(self, path, maxsize):
+        self.path = path
+        self.maxsize = maxsize
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS ai_responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_ai_responses_last_used ON ai_responses (last_used)")
+
+    def _connect(self):
+        # A short-lived connection per call keeps this safe across threads
+        return sqlite3.connect(self.path, timeout=5)
+
+    def get(self, key):
+        """Return (value, seconds_left) or None."""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT value, expires_at FROM ai_responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                conn.execute("DELETE FROM ai_responses WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE ai_responses SET last_used = ? WHERE key = ?", (now, key))
+        return row[0], row[1] - now
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO ai_responses (key, value, expires_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, value, now + ttl, now),
+            )
+            conn.execute("DELETE FROM ai_responses WHERE expires_at < ?", (now,))
+            conn.execute(
+                "DELETE FROM ai_responses WHERE key IN "
+                "(SELECT key FROM ai_responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.maxsize,),
+            )
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM ai_responses")
+
+    def size(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM ai_responses").fetchone()[0]
+
+
+class AIResponseCache:
+    """In-process LRU of answers, optionally backed by a shared SQLite file."""
+
+    def __init__(self, maxsize=1000, ttl=86400, path=None):
+        self.ttl = ttl
+        self.local = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.shared = SQLiteBackend(path, maxsize) if path else None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.shared_hits = 0
+        self.shared_errors = 0
+
+    @staticmethod
+    def key(prompt, family, max_tokens):
+        return f'{family}:{max_tokens}:{normalize_prompt(prompt)}'
+
+    def get(self, prompt, families, max_tokens):
+        """
+        Return (family, answer) for the first of `families` (in preference
+        order) that has a cached answer to `prompt` at this max_tokens, or None.
+        """
+        for family in families:
+            key = self.key(prompt, family, max_tokens)
+            found, value = self.local.get(key)
+            if not found and self.shared is not None:
+                try:
+                    entry = self.shared.get(key)
+                except sqlite3.Error:
+                    self.shared_errors += 1
+                    entry = None
+                if entry is not None:
+                    value, seconds_left = entry
+                    self.local.set(key, value, ttl=seconds_left)
+                    found = True
+                    with self._lock:
+                        self.shared_hits += 1
+            if found:
+                with self._lock:
+                    self.hits += 1
+                return family, value
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, prompt, family, max_tokens, answer):
+        key = self.key(prompt, family, max_tokens)
+        self.local.set(key, answer)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, answer, self.ttl)
+            except sqlite3.Error:
+                self.shared_errors += 1
+
+    def clear(self):
+        self.local.clear()
+        if self.shared is not None:
+            self.shared.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        stats = {
+            'backend': 'sqlite' if self.shared is not None else 'local',
+            'local_size': self.local.stats()['size'],
+            'maxsize': self.local.maxsize,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+            'shared_hits': self.shared_hits,
+            'shared_errors': self.shared_errors,
+        }
+        if self.shared is not None:
+            try:
+                stats['shared_size'] = self.shared.size()
+            except sqlite3.Error:
+                self.shared_errors += 1
+        return stats
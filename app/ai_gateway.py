@@ -0,0 +1,440 @@
+"""
+Server-side gateway for Ask AI.
+
+Replaces the browser's serial provider/model fallback chain. Candidates
+(one model per provider first, ordered by observed latency) are raced with
+hedged requests: the first starts immediately, another is launched every
+AI_HEDGE_DELAY seconds without a first token (or at once when one fails),
+up to AI_MAX_HEDGES in flight. The first to produce a token wins, the rest
+are cancelled by closing their sockets, and the winner's tokens are relayed
+as they arrive. Per-provider circuit breakers skip providers that keep
+failing or timing out. Repeat questions are answered from the response
+cache (app/ai_cache.py) without contacting any provider.
+
+Providers must speak the OpenAI chat-completions protocol with stream=true.
+"""
+import http.client
+import json
+import queue
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+
+from flask import current_app
+
+from app.ai_cache import AIResponseCache, clean_reasoning_output, model_family
+
+SYSTEM_PROMPT = (
+    "You are SheSafe AI, a professional and empathetic expert in women's sexual and urinary health and "
+    "hygiene. Your tone is supportive, informative, and safe. Your goal is to provide accurate health "
+    "information while reminding users that you are an AI and they should consult a doctor for clinical "
+    "diagnosis. Particularly answer women sexual and urinary health and hygeniene related questions."
+)
+
+
+def default_providers(config):
+    """Provider list in priority order, with keys from config."""
+    return [
+        {
+            'name': 'Gemini',
+            'url': 'https://generativelanguage.googleapis.com/v1beta/openai/chat/completions',
+            'api_key': config.get('GEMINI_API_KEY'),
+            'models': ['gemini-flash-latest'],
+        },
+        {
+            'name': 'OpenRouter',
+            'url': 'https://openrouter.ai/api/v1/chat/completions',
+            'api_key': config.get('OPENROUTER_API_KEY'),
+            'models': [
+                'google/gemma-2-9b-it:free',
+                'meta-llama/llama-3.2-3b-instruct:free',
+                'microsoft/phi-3-mini-128k-instruct:free',
+                'google/gemini-2.0-flash-exp:free',
+            ],
+        },
+        {
+            'name': 'NVIDIA NIM',
+            'url': 'https://integrate.api.nvidia.com/v1/chat/completions',
+            'api_key': config.get('NVIDIA_API_KEY'),
+            'models': [
+                'meta/llama-3.1-405b-instruct',
+                'mistralai/mistral-large-2-instruct',
+                'nvidia/llama-3.1-nemotron-70b-instruct',
+                'google/gemma-2-27b-it',
+                'nvidia/nemotron-mini-4b-instruct',
+            ],
+        },
+        {
+            'name': 'SiliconFlow',
+            'url': 'https://api.siliconflow.cn/v1/chat/completions',
+            'api_key': config.get('SILICONFLOW_API_KEY'),
+            'models': [
+                'deepseek-ai/DeepSeek-V3',
+                'deepseek-ai/DeepSeek-R1',
+                'THUDM/glm-4-9b-chat',
+                'Qwen/Qwen2.5-7B-Instruct',
+                'internlm/internlm2_5-20b-chat',
+            ],
+        },
+    ]
+
+
+class ProviderError(Exception):
+    """A provider request failed or returned nothing usable."""
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after `failure_threshold` consecutive failures; open ->
+    half-open after `cooldown` seconds, letting one trial request through.
+    Also keeps an exponentially weighted time-to-first-token used to rank
+    providers.
+    """
+
+    def __init__(self, failure_threshold=3, cooldown=30.0, alpha=0.3):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.latency = None
+        self.successes = 0
+        self.errors = 0
+
+    def allow(self):
+        """Whether a request may be sent now; claims the trial slot when half-open."""
+        with self._lock:
+            if self.state == 'open':
+                if time.monotonic() - self.opened_at < self.cooldown:
+                    return False
+                self.state = 'half_open'
+                self.trial_in_flight = False
+            if self.state == 'half_open':
+                if self.trial_in_flight:
+                    return False
+                self.trial_in_flight = True
+            return True
+
+    def _observe_latency(self, seconds):
+        self.latency = seconds if self.latency is None else \
+            self.alpha * seconds + (1 - self.alpha) * self.latency
+
+    def record_success(self, first_token_seconds):
+        with self._lock:
+            self.successes += 1
+            self.failures = 0
+            self.state = 'closed'
+            self.trial_in_flight = False
+            self._observe_latency(first_token_seconds)
+
+    def record_failure(self):
+        with self._lock:
+            self.errors += 1
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+    def record_abandoned(self, elapsed):
+        """A hedge that lost the race: it took at least `elapsed` to respond."""
+        with self._lock:
+            self.trial_in_flight = False
+            if self.latency is None or elapsed > self.latency:
+                self._observe_latency(elapsed)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.failures,
+                'latency_ms': round(self.latency * 1000, 1) if self.latency is not None else None,
+                'successes': self.successes,
+                'errors': self.errors,
+            }
+
+
+class Attempt(threading.Thread):
+    """One streaming request to one provider/model, reporting to a shared queue."""
+
+    def __init__(self, provider, model, payload, events, breaker, timeout):
+        super().__init__(daemon=True)
+        self.provider = provider
+        self.model = model
+        self.payload = payload
+        self.events = events
+        self.breaker = breaker
+        self.timeout = timeout
+        self.cancelled = False
+        self.started_at = None
+        self.first_token_at = None
+        self._conn = None
+
+    def _connect(self):
+        url = urlsplit(self.provider['url'])
+        conn_class = http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+        self._conn = conn_class(url.hostname, url.port, timeout=self.timeout)
+        body = json.dumps(dict(self.payload, model=self.model, stream=True))
+        self._conn.request('POST', url.path or '/', body=body, headers={
+            'Content-Type': 'application/json',
+            'Accept': 'text/event-stream',
+            'Authorization': f"Bearer {self.provider.get('api_key') or ''}",
+            'X-Title': 'SheSafe',
+        })
+        return self._conn.getresponse()
+
+    def _deltas(self, response):
+        """Yield content fragments from an SSE stream (or a plain JSON reply)."""
+        if 'application/json' in (response.getheader('Content-Type') or ''):
+            message = json.loads(response.read())['choices'][0]['message']
+            text = message.get('content') or message.get('reasoning')
+            if text:
+                yield text
+            return
+        for raw in response:
+            line = raw.decode('utf-8', 'replace').strip()
+            if not line.startswith('data:'):
+                continue
+            data = line[5:].strip()
+            if data == '[DONE]':
+                return
+            choices = json.loads(data).get('choices') or [{}]
+            delta = choices[0].get('delta') or {}
+            text = delta.get('content') or delta.get('reasoning')
+            if text:
+                yield text
+
+    def run(self):
+        self.started_at = time.monotonic()
+        try:
+            response = self._connect()
+            if response.status != 200:
+                raise ProviderError(f'HTTP {response.status}')
+            for text in self._deltas(response):
+                if self.cancelled:
+                    return
+                if self.first_token_at is None:
+                    self.first_token_at = time.monotonic()
+                    self.breaker.record_success(self.first_token_at - self.started_at)
+                self.events.put((self, 'delta', text))
+            if self.first_token_at is None:
+                raise ProviderError('empty response')
+            self.events.put((self, 'done', None))
+        except Exception as e:
+            if self.cancelled:
+                return
+            if self.first_token_at is None:
+                self.breaker.record_failure()
+            self.events.put((self, 'error', f"{self.provider['name']} {self.model}: {e}"))
+        finally:
+            if self._conn is not None:
+                self._conn.close()
+
+    def cancel(self, timed_out=False):
+        """
+        Stop relaying and drop the connection so the provider stops generating.
+        Without a first token by then, it counts as a breaker failure if the
+        request timed out (overall deadline, or `timeout` elapsed) and as an
+        abandoned hedge otherwise.
+        """
+        if self.cancelled:
+            return
+        self.cancelled = True
+        if self.first_token_at is None and self.started_at is not None:
+            elapsed = time.monotonic() - self.started_at
+            if timed_out or elapsed >= self.timeout:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_abandoned(elapsed)
+        conn = self._conn
+        sock = getattr(conn, 'sock', None) if conn else None
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+class AIGateway:
+    """Hedged, circuit-broken, streaming access to the configured providers."""
+
+    def __init__(self, providers, hedge_delay=1.5, max_hedges=3, first_token_timeout=20.0,
+                 stream_timeout=60.0, failure_threshold=3, cooldown=30.0, cache=None):
+        self.providers = [p for p in providers if p.get('api_key')]
+        self.hedge_delay = hedge_delay
+        self.max_hedges = max_hedges
+        self.first_token_timeout = first_token_timeout
+        self.stream_timeout = stream_timeout
+        self.breakers = {p['name']: CircuitBreaker(failure_threshold, cooldown) for p in self.providers}
+        # Last model that worked for each provider is tried first next time
+        self.preferred = {}
+        self.cache = cache
+
+    def candidates(self):
+        """
+        (provider, model) pairs to try in order: providers ranked by observed
+        latency (unknown counts as the hedge delay), one model from each
+        before any provider's second model, so hedges hit different providers.
+        """
+        def rank(item):
+            index, provider = item
+            latency = self.breakers[provider['name']].latency
+            return (latency if latency is not None else self.hedge_delay, index)
+
+        ordered = [p for _, p in sorted(enumerate(self.providers), key=rank)]
+        model_lists = []
+        for provider in ordered:
+            models = list(provider['models'])
+            preferred = self.preferred.get(provider['name'])
+            if preferred in models:
+                models.remove(preferred)
+                models.insert(0, preferred)
+            model_lists.append((provider, models))
+
+        for depth in range(max((len(m) for _, m in model_lists), default=0)):
+            for provider, models in model_lists:
+                if depth < len(models):
+                    yield provider, models[depth]
+
+    def stream(self, prompt, max_tokens=1000):
+        """
+        Generate events for one prompt: {'type': 'meta', provider, model}
+        once a winner is chosen, then {'type': 'delta', 'text'} fragments and
+        finally {'type': 'done', 'text'} with the cleaned full answer, or
+        {'type': 'error', 'message'}. A cached answer comes back as a
+        single delta, with 'cached': True on the meta event.
+        """
+        candidates = list(self.candidates())
+        if self.cache is not None:
+            families = list(dict.fromkeys(model_family(model) for _, model in candidates))
+            hit = self.cache.get(prompt, families, max_tokens)
+            if hit is not None:
+                family, answer = hit
+                yield {'type': 'meta', 'provider': 'cache', 'model': family, 'cached': True}
+                yield {'type': 'delta', 'text': answer}
+                yield {'type': 'done', 'text': answer}
+                return
+
+        payload = {
+            'messages': [{'role': 'system', 'content': SYSTEM_PROMPT}, {'role': 'user', 'content': prompt}],
+            'max_tokens': max_tokens,
+            'temperature': 0.5,
+        }
+        events = queue.Queue()
+        pending = iter(candidates)
+        running = []
+        errors = []
+        parts = []
+
+        def launch():
+            for provider, model in pending:
+                breaker = self.breakers[provider['name']]
+                if breaker.allow():
+                    attempt = Attempt(provider, model, payload, events, breaker, self.first_token_timeout)
+                    running.append(attempt)
+                    attempt.start()
+                    return True
+            return False
+
+        try:
+            # Race until some attempt produces a first token
+            winner = None
+            deadline = time.monotonic() + self.first_token_timeout
+            next_hedge = time.monotonic() + self.hedge_delay
+            launch()
+            while winner is None:
+                if not running and not launch():
+                    yield {'type': 'error', 'message': 'All AI providers failed. ' + '; '.join(errors[-3:])}
+                    return
+                now = time.monotonic()
+                if now >= deadline:
+                    for attempt in running:
+                        attempt.cancel(timed_out=True)
+                    yield {'type': 'error', 'message': 'AI providers timed out.'}
+                    return
+                try:
+                    attempt, kind, value = events.get(timeout=max(min(next_hedge, deadline) - now, 0))
+                except queue.Empty:
+                    if time.monotonic() >= next_hedge:
+                        if len(running) < self.max_hedges:
+                            launch()
+                        next_hedge = time.monotonic() + self.hedge_delay
+                    continue
+                if attempt not in running:
+                    continue
+                if kind == 'delta':
+                    winner = attempt
+                    for other in running:
+                        if other is not winner:
+                            other.cancel()
+                    running[:] = [winner]
+                    self.preferred[winner.provider['name']] = winner.model
+                    yield {'type': 'meta', 'provider': winner.provider['name'], 'model': winner.model}
+                    parts.append(value)
+                    yield {'type': 'delta', 'text': value}
+                else:
+                    # Failed (or finished empty): replace it straight away
+                    running.remove(attempt)
+                    errors.append(value or f"{attempt.provider['name']} {attempt.model}: empty response")
+                    launch()
+                    next_hedge = time.monotonic() + self.hedge_delay
+
+            # Relay the winner's remaining tokens
+            while True:
+                try:
+                    attempt, kind, value = events.get(timeout=self.stream_timeout)
+                except queue.Empty:
+                    yield {'type': 'error', 'message': 'AI response stalled.'}
+                    return
+                if attempt is not winner:
+                    continue
+                if kind == 'delta':
+                    parts.append(value)
+                    yield {'type': 'delta', 'text': value}
+                elif kind == 'done':
+                    answer = clean_reasoning_output(''.join(parts))
+                    if self.cache is not None:
+                        self.cache.set(prompt, model_family(winner.model), max_tokens, answer)
+                    yield {'type': 'done', 'text': answer}
+                    return
+                else:
+                    yield {'type': 'error', 'message': value}
+                    return
+        finally:
+            # Also runs when the client disconnects mid-stream
+            for attempt in running:
+                attempt.cancel()
+
+    def status(self):
+        status = {'providers': {name: breaker.snapshot() for name, breaker in self.breakers.items()}}
+        if self.cache is not None:
+            status['cache'] = self.cache.stats()
+        return status
+
+
+def init_ai_gateway(app):
+    """Build the gateway from AI_PROVIDERS (or the default provider list) and AI_* tuning settings."""
+    providers = app.config.get('AI_PROVIDERS') or default_providers(app.config)
+    cache = None
+    if app.config.get('AI_CACHE_TTL', 0) > 0:
+        cache = AIResponseCache(maxsize=app.config.get('AI_CACHE_MAXSIZE', 1000),
+                                ttl=app.config['AI_CACHE_TTL'],
+                                path=app.config.get('AI_CACHE_PATH'))
+    app.extensions['ai_gateway'] = AIGateway(
+        providers,
+        hedge_delay=app.config.get('AI_HEDGE_DELAY', 1.5),
+        max_hedges=app.config.get('AI_MAX_HEDGES', 3),
+        first_token_timeout=app.config.get('AI_FIRST_TOKEN_TIMEOUT', 20.0),
+        stream_timeout=app.config.get('AI_STREAM_TIMEOUT', 60.0),
+        failure_threshold=app.config.get('AI_BREAKER_FAILURES', 3),
+        cooldown=app.config.get('AI_BREAKER_COOLDOWN', 30.0),
+        cache=cache,
+    )
+
+
+def get_ai_gateway():
+    return current_app.extensions['ai_gateway']
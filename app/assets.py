@@ -0,0 +1,95 @@
+"""
+Content-hashed static asset manifest.
+
+build_assets.py writes app/static/asset-manifest.json, mapping each static
+file to a short hash of its contents. Templates link assets with
+asset_url(), which appends that hash (?v=...), so a URL's content never
+changes and can be cached forever; the service worker precaches the same
+URLs under a cache named after the manifest version. If the manifest has
+not been built (or in debug mode, where files change under it), it is
+computed at startup instead.
+"""
+import hashlib
+import json
+import os
+
+from flask import current_app, request, url_for
+
+MANIFEST_NAME = 'asset-manifest.json'
+
+# User content and generated files are not part of the build
+EXCLUDE_DIRS = {'uploads'}
+EXCLUDE_FILES = {MANIFEST_NAME}
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def build_manifest(static_folder):
+    """{'version': ..., 'assets': {relative path: hash}} for everything under static_folder."""
+    assets = {}
+    for root, dirs, files in os.walk(static_folder):
+        dirs[:] = sorted(d for d in dirs if d not in EXCLUDE_DIRS)
+        for name in sorted(files):
+            if name in EXCLUDE_FILES or name.startswith('.'):
+                continue
+            path = os.path.join(root, name)
+            assets[os.path.relpath(path, static_folder).replace(os.sep, '/')] = _file_hash(path)
+    version = hashlib.sha256(json.dumps(assets, sort_keys=True).encode()).hexdigest()[:12]
+    return {'version': version, 'assets': assets}
+
+
+def write_manifest(static_folder):
+    manifest = build_manifest(static_folder)
+    with open(os.path.join(static_folder, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write('\n')
+    return manifest
+
+
+def load_manifest(static_folder):
+    try:
+        with open(os.path.join(static_folder, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return build_manifest(static_folder)
+
+
+def get_manifest():
+    return current_app.extensions['asset_manifest']
+
+
+def asset_url(filename):
+    """URL for a static file, versioned by its content hash when it is in the manifest."""
+    version = get_manifest()['assets'].get(filename)
+    if version:
+        return url_for('static', filename=filename, v=version)
+    return url_for('static', filename=filename)
+
+
+def precache_urls():
+    """Versioned URLs of every built asset, for the service worker to precache."""
+    return [asset_url(filename) for filename in get_manifest()['assets']]
+
+
+def init_assets(app):
+    """Load the manifest, expose asset_url() to templates and mark hashed URLs immutable."""
+    app.extensions['asset_manifest'] = build_manifest(app.static_folder) if app.debug \
+        else load_manifest(app.static_folder)
+    app.jinja_env.globals['asset_url'] = asset_url
+
+    @app.after_request
+    def cache_hashed_assets(response):
+        if request.endpoint == 'static' and response.status_code == 200:
+            filename = (request.view_args or {}).get('filename')
+            version = app.extensions['asset_manifest']['assets'].get(filename)
+            if version and request.args.get('v') == version:
+                response.headers['Cache-Control'] = IMMUTABLE
+        return response
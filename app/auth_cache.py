@@ -0,0 +1,175 @@
+"""
+Cached identity for Flask-Login's user_loader.
+
+The logged-in user's id, role, name and vendor profile id are kept in the
+(signed) Flask session with the user's auth_version. On each request the
+loader compares that version with the current one and returns a CachedUser
+without loading the User row. Role and ownership checks then need no
+queries; anything else on the user loads the full row on first access.
+
+auth_version is bumped when role, password or name change and when the
+user's vendor profile is created or deleted. The current version is read
+with a primary-key SELECT of that one column, unless a shared cache backend
+(CACHE_REDIS_URL) is configured: then it is cached there and invalidated
+after commit, which every worker sees on its next request. A per-worker
+cache is never used for it, since other workers would keep honouring a
+revoked role or session until the entry expired.
+"""
+import threading
+
+from flask import abort, session
+from flask_login import UserMixin, logout_user
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app import db
+from app.cache import get_cache
+from app.models import User, Vendor
+
+IDENTITY_KEY = '_identity'
+
+
+class LoaderStats:
+    """Per-worker user_loader counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    def record(self, outcome):
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def snapshot(self):
+        total = self.hits + self.misses + self.stale
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'stale': self.stale,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+loader_stats = LoaderStats()
+
+
+class CachedUser(UserMixin):
+    """The authenticated user as cached in the session."""
+
+    def __init__(self, identity):
+        self.id = identity['id']
+        self.role = identity['role']
+        self.name = identity['name']
+        self.vendor_profile_id = identity['vendor_profile_id']
+        self._user = None
+
+    @property
+    def vendor_profile(self):
+        if self.vendor_profile_id is None:
+            return None
+        return db.session.get(Vendor, self.vendor_profile_id)
+
+    def __getattr__(self, name):
+        # Only called for attributes not cached above (email, bookings, ...)
+        if name.startswith('_'):
+            raise AttributeError(name)
+        if self._user is None:
+            self._user = db.session.get(User, self.id)
+            if self._user is None:
+                # Deleted since the loader checked its version
+                forget_identity()
+                logout_user()
+                abort(401)
+        return getattr(self._user, name)
+
+    def __repr__(self):
+        return f'<CachedUser {self.id}>'
+
+
+def _version_key(user_id):
+    return f'auth_version:{user_id}'
+
+
+def current_auth_version(user_id):
+    """The user's auth_version, or None if the user no longer exists."""
+    def query():
+        return db.session.query(User.auth_version).filter(User.id == user_id).scalar()
+
+    cache = get_cache()
+    if cache.shared is None:
+        return query()
+    return cache.get_or_set(_version_key(user_id), query)
+
+
+def identity_for(user):
+    return {
+        'id': user.id,
+        'role': user.role,
+        'name': user.name,
+        'vendor_profile_id': user.vendor_profile_id if user.role == 'vendor' else None,
+        'version': user.auth_version or 0,
+    }
+
+
+def load_user(user_id):
+    """user_loader: a CachedUser when the session's identity is current, else the User row."""
+    identity = session.get(IDENTITY_KEY)
+    if identity and identity.get('id') == user_id:
+        if identity.get('version') == current_auth_version(user_id):
+            loader_stats.record('hits')
+            return CachedUser(identity)
+        loader_stats.record('stale')
+    else:
+        loader_stats.record('misses')
+
+    user = db.session.get(User, user_id)
+    if user is not None:
+        session[IDENTITY_KEY] = identity_for(user)
+    return user
+
+
+def forget_identity():
+    session.pop(IDENTITY_KEY, None)
+
+
+@event.listens_for(Session, 'before_flush')
+def _collect_identity_changes(db_session, flush_context, instances):
+    changed = db_session.info.setdefault('auth_changed_users', set())
+    for obj in db_session.new:
+        if isinstance(obj, Vendor) and obj.user_id is not None:
+            owner = db_session.get(User, obj.user_id)
+            if owner is not None:
+                owner.bump_auth_version()
+                changed.add(owner.id)
+    for obj in db_session.deleted:
+        if isinstance(obj, User):
+            changed.add(obj.id)
+        elif isinstance(obj, Vendor) and obj.user_id is not None:
+            owner = db_session.get(User, obj.user_id)
+            if owner is not None and owner not in db_session.deleted:
+                owner.bump_auth_version()
+            changed.add(obj.user_id)
+    for obj in db_session.dirty:
+        if isinstance(obj, User) and inspect(obj).attrs.auth_version.history.has_changes():
+            changed.add(obj.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_identities(db_session):
+    changed = db_session.info.pop('auth_changed_users', None)
+    if not changed:
+        return
+    try:
+        cache = get_cache()
+    except RuntimeError:
+        # Committed outside an app context (scripts): nothing is cached there
+        return
+    for user_id in changed:
+        cache.invalidate(_version_key(user_id))
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_identity_changes(db_session):
+    db_session.info.pop('auth_changed_users', None)
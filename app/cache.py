@@ -0,0 +1,214 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+
+class LRUCache:
+    """Thread-safe in-process LRU cache with a per-entry TTL."""
+
+    def __init__(self, maxsize=128, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return (found, value)."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return False, None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return True, value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (time.monotonic() + (ttl or self.ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_matching(self, predicate):
+        with self._lock:
+            for key in [k for k in self._data if predicate(k)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+class RedisBackend:
+    """Shared cache backend so all workers see the same entries."""
+
+    def __init__(self, url, prefix='shesafe:'):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, json.dumps(value), ex=int(ttl))
+
+    def generation(self, key):
+        return int(self.client.get(self.prefix + key + ':gen') or 0)
+
+    def bump_generation(self, key):
+        return self.client.incr(self.prefix + key + ':gen')
+
+
+class Cache:
+    """
+    Two-tier cache: an in-process LRU in front of an optional shared backend.
+
+    Invalidation bumps a per-key generation in the shared backend, so other
+    workers drop their local copy on their next read instead of serving it
+    until the TTL runs out.
+    """
+
+    def __init__(self, local, shared=None):
+        self.local = local
+        self.shared = shared
+        self.shared_hits = 0
+        self.shared_errors = 0
+        self.invalidations = 0
+
+    def _generation(self, key):
+        if self.shared is None:
+            return 0
+        try:
+            return self.shared.generation(key)
+        except Exception:
+            self.shared_errors += 1
+            return None
+
+    def get_or_set(self, key, factory):
+        """Return the cached value for key, computing it with factory() on a miss."""
+        generation = self._generation(key)
+        local_key = (key, generation)
+
+        found, value = self.local.get(local_key)
+        if found:
+            return value
+
+        if self.shared is not None and generation is not None:
+            try:
+                value = self.shared.get(f'{key}:{generation}')
+            except Exception:
+                self.shared_errors += 1
+                value = None
+            if value is not None:
+                self.shared_hits += 1
+                self.local.set(local_key, value)
+                return value
+
+        value = factory()
+        self.local.set(local_key, value)
+        if self.shared is not None and generation is not None:
+            try:
+                self.shared.set(f'{key}:{generation}', value, self.local.ttl)
+            except Exception:
+                self.shared_errors += 1
+        return value
+
+    def invalidate(self, key):
+        self.invalidations += 1
+        self.local.delete_matching(lambda local_key: local_key[0] == key)
+        if self.shared is not None:
+            try:
+                self.shared.bump_generation(key)
+            except Exception:
+                self.shared_errors += 1
+
+    def stats(self):
+        stats = self.local.stats()
+        stats.update({
+            'backend': 'redis' if self.shared is not None else 'local',
+            'shared_hits': self.shared_hits,
+            'shared_errors': self.shared_errors,
+            'invalidations': self.invalidations,
+        })
+        return stats
+
+
+def init_cache(app):
+    """Create the app cache, using Redis as a shared tier if configured."""
+    local = LRUCache(maxsize=app.config.get('CACHE_MAXSIZE', 128),
+                     ttl=app.config.get('CACHE_TTL', 300))
+    shared = None
+    redis_url = app.config.get('CACHE_REDIS_URL')
+    if redis_url:
+        try:
+            shared = RedisBackend(redis_url)
+        except ImportError:
+            app.logger.warning("CACHE_REDIS_URL is set but the redis package is not installed; "
+                               "using the in-process cache only.")
+    app.extensions['cache'] = Cache(local, shared)
+
+
+def get_cache():
+    return current_app.extensions['cache']
+
+
+VERIFIED_VENDORS_KEY = 'verified_vendors'
+
+
+def get_verified_vendors():
+    """Serialized verified, active vendors, served from cache when possible."""
+    from app.models import Vendor
+    return get_cache().get_or_set(VERIFIED_VENDORS_KEY, Vendor.verified_listing)
+
+
+# (listing, {vendor id: serialized vendor}) for the listing last returned by the cache
+_verified_by_id = (None, {})
+
+
+def get_verified_vendors_by_id():
+    """
+    Cached verified vendors by id. The map is built once per cached listing
+    (not stored in the shared tier, whose JSON would turn the ids into strings).
+    """
+    global _verified_by_id
+    vendors = get_verified_vendors()
+    listing, by_id = _verified_by_id
+    if listing is not vendors:
+        by_id = {v['id']: v for v in vendors}
+        _verified_by_id = (vendors, by_id)
+    return by_id
+
+
+def invalidate_verified_vendors():
+    get_cache().invalidate(VERIFIED_VENDORS_KEY)
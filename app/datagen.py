@@ -0,0 +1,296 @@
+"""
+Bulk synthetic data generation.
+
+Rows are streamed in batches straight into the tables: executemany inserts
+on SQLite and other dialects, COPY ... FROM STDIN on PostgreSQL. Every
+generated account shares one precomputed password hash and vendors are
+scattered around configurable city centres, so realistic volumes build in
+seconds rather than hours.
+"""
+import csv
+import io
+import math
+import random
+from array import array
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+from itertools import islice
+
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.models import User, Vendor, VendorImage, Booking, Feedback, RevenueDaily, PLACEHOLDER_VENDOR_IMAGE
+
+CityCentre = namedtuple('CityCentre', 'name lat lng spread_km weight')
+
+DEFAULT_CITIES = [
+    CityCentre('Sonipat', 28.9457, 77.1024, 6.0, 3.0),
+    CityCentre('Delhi', 28.6139, 77.2090, 12.0, 5.0),
+    CityCentre('Gurugram', 28.4595, 77.0266, 8.0, 2.0),
+    CityCentre('Panipat', 29.3909, 76.9635, 5.0, 1.0),
+]
+
+CATEGORIES = ['Washroom', 'Restaurant', 'Dhaba', 'Fuel Station', 'Cafe', 'Mall']
+STATUSES = ['completed'] * 6 + ['pending'] * 2 + ['confirmed', 'cancelled']
+PAYMENT_MODES = ['app', 'pay_at_location']
+AMOUNTS = [10.0, 20.0, 30.0, 50.0]
+COMMENTS = ['Clean and well lit.', 'Staff were helpful.', 'Felt safe here.', 'Could be cleaner.', 'Great stop on the highway.']
+
+# Real vendors near Ashoka University, previously loaded by populate_ashoka.py
+# and add_user_vendors.py
+FIXTURE_VENDORS = [
+    {'email': 'greenchick@shesafe.com', 'name': 'Green Chick Chop', 'business_name': 'Green Chick Chop Kundli',
+     'lat': 28.9392, 'lng': 77.1158, 'address': 'TDI City, Kundli, Sonepat, Haryana 131023',
+     'cctv': True, 'female_staff': (time(9, 0), time(21, 0)), 'rating': 4.8, 'image': None},
+    {'email': 'dominos@shesafe.com', 'name': "Domino's Pizza", 'business_name': "Domino's Customer Safe Zone",
+     'lat': 28.9554, 'lng': 77.1082, 'address': 'Omaxe City, Sonepat, Haryana 131023',
+     'cctv': True, 'female_staff': None, 'rating': 4.8, 'image': None},
+    {'email': 'savoy@shesafe.com', 'name': 'Savoy Greens', 'business_name': 'Savoy Greens Rest Stop',
+     'lat': 28.9351, 'lng': 77.1189, 'address': 'NH 1, Kundli, Sonepat, Haryana 131023',
+     'cctv': True, 'female_staff': (time(9, 0), time(21, 0)), 'rating': 4.8, 'image': None},
+    {'email': 'parker@shesafe.com', 'name': 'Parker Mall', 'business_name': 'Parker Mall Management',
+     'lat': 28.9375, 'lng': 77.1165, 'address': 'Parker Mall, NH 1, Kundli, Sonepat, Haryana',
+     'cctv': True, 'female_staff': (time(9, 0), time(21, 0)), 'rating': 4.8, 'image': None},
+    {'email': 'goldenhut@shesafe.com', 'name': 'Golden Hut', 'business_name': 'Golden Hut Restaurants & Rooms',
+     'lat': 28.945581303017335, 'lng': 77.09604303657157,
+     'address': 'Opposite Ashoka University, Near Rai NH1, Rai, Sonipat, Haryana 131021',
+     'cctv': True, 'female_staff': (time(8, 0), time(22, 0)), 'rating': 4.9,
+     'image': 'https://lh3.googleusercontent.com/p/AF1QipONwuyOQooKIAY3UJueWReljlzJ_ZkykQpFmONf=s1600'},
+    {'email': 'bollywood@shesafe.com', 'name': 'Bollywood Dhaba', 'business_name': 'Dhaba Bollywood',
+     'lat': 28.922467309144793, 'lng': 77.10397787102141,
+     'address': 'Stone Chowk, Near 20th Mile, Rajiv Gandhi Education City, Sonipat, Haryana 131029',
+     'cctv': True, 'female_staff': None, 'rating': 4.9,
+     'image': 'https://lh3.googleusercontent.com/p/AF1QipPTyuWEXnWcbaGLE_vl3YRsvkgMlrryhuv8y08Y=s1600'},
+]
+
+TABLES = (User, Vendor, VendorImage, Booking, Feedback)
+
+
+def parse_city(spec):
+    """Parse 'name:lat,lng[:spread_km[:weight]]' into a CityCentre."""
+    parts = spec.split(':')
+    if len(parts) < 2:
+        raise ValueError(f"Invalid city '{spec}', expected name:lat,lng[:spread_km[:weight]]")
+    lat, lng = (float(x) for x in parts[1].split(','))
+    spread_km = float(parts[2]) if len(parts) > 2 else 5.0
+    weight = float(parts[3]) if len(parts) > 3 else 1.0
+    return CityCentre(parts[0], lat, lng, spread_km, weight)
+
+
+def clustered_point(rng, city):
+    """A point normally distributed around a city centre, spread given in km."""
+    lat = rng.gauss(city.lat, city.spread_km / 111.0)
+    lng = rng.gauss(city.lng, city.spread_km / (111.0 * math.cos(math.radians(city.lat))))
+    return lat, lng
+
+
+def _copy_value(value):
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    return value
+
+
+def bulk_insert(model, rows, batch_size=5000):
+    """
+    Insert an iterable of row dicts in batches and return the row count.
+
+    Uses COPY on PostgreSQL and executemany inserts elsewhere. Every row
+    must have the same keys.
+    """
+    rows = iter(rows)
+    use_copy = db.engine.dialect.name == 'postgresql'
+    count = 0
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return count
+        if use_copy:
+            columns = list(batch[0])
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in batch:
+                writer.writerow([_copy_value(row[c]) for c in columns])
+            buffer.seek(0)
+            cursor = db.session.connection().connection.cursor()
+            cursor.copy_expert(
+                f"COPY {model.__tablename__} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer
+            )
+        else:
+            db.session.execute(db.insert(model), batch)
+        count += len(batch)
+
+
+def next_ids():
+    """Next free primary key for each generated table."""
+    return {
+        model: (db.session.execute(db.select(db.func.max(model.id))).scalar() or 0) + 1
+        for model in TABLES
+    }
+
+
+def reset_sequences():
+    """Advance PostgreSQL serial sequences past explicitly inserted ids."""
+    if db.engine.dialect.name != 'postgresql':
+        return
+    for model in TABLES:
+        table = model.__tablename__
+        db.session.execute(db.text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 1)) FROM {table}"
+        ))
+
+
+def load_fixtures(password_hash, now=None):
+    """Insert the real Ashoka-area vendors whose accounts don't exist yet. Returns the number added."""
+    now = now or datetime.utcnow()
+    existing = set(db.session.execute(
+        db.select(User.email).where(User.email.in_([f['email'] for f in FIXTURE_VENDORS]))
+    ).scalars())
+    fixtures = [f for f in FIXTURE_VENDORS if f['email'] not in existing]
+    if not fixtures:
+        return 0
+
+    ids = next_ids()
+    users, vendors, images = [], [], []
+    for offset, data in enumerate(fixtures):
+        user_id, vendor_id = ids[User] + offset, ids[Vendor] + offset
+        users.append({'id': user_id, 'name': data['name'], 'email': data['email'],
+                      'password_hash': password_hash, 'role': 'vendor'})
+        start, end = data['female_staff'] or (None, None)
+        vendors.append({
+            'id': vendor_id, 'user_id': user_id, 'business_name': data['business_name'],
+            'description': None, 'latitude': data['lat'], 'longitude': data['lng'],
+            'address': data['address'], 'category': 'Washroom', 'has_cctv': data['cctv'],
+            'has_female_staff': data['female_staff'] is not None,
+            'female_staff_start_time': start, 'female_staff_end_time': end,
+            'is_verified': True, 'is_active': True, 'average_rating': data['rating'], 'created_at': now,
+            'updated_at': now,
+        })
+        if data['image']:
+            images.append({'vendor_id': vendor_id, 'image_url': data['image'], 'uploaded_at': now})
+
+    bulk_insert(User, users)
+    bulk_insert(Vendor, vendors)
+    bulk_insert(VendorImage, images)
+    return len(fixtures)
+
+
+def generate(users=0, vendors=0, bookings=0, feedbacks=0, cities=None, password_hash=None,
+             password='password123', batch_size=5000, random_seed=42, now=None):
+    """
+    Append synthetic users, vendors (one owner account and image each),
+    bookings and feedbacks, then rebuild vendor rating aggregates.
+
+    Ids continue from the current maximum so this can run against a
+    populated database. The revenue rollup is rebuilt when bookings are
+    added. Returns a dict of inserted row counts. The caller
+    commits.
+    """
+    rng = random.Random(random_seed)
+    cities = cities or DEFAULT_CITIES
+    weights = [c.weight for c in cities]
+    password_hash = password_hash or generate_password_hash(password)
+    now = now or datetime.utcnow()
+    ids = next_ids()
+
+    first_user = ids[User]
+    first_owner = first_user + users
+    first_vendor = ids[Vendor]
+
+    def user_rows():
+        for user_id in range(first_user, first_owner):
+            yield {'id': user_id, 'name': f'User {user_id}', 'email': f'user{user_id}@shesafe.test',
+                   'password_hash': password_hash, 'role': 'user'}
+        for i in range(vendors):
+            user_id = first_owner + i
+            yield {'id': user_id, 'name': f'Vendor Owner {user_id}', 'email': f'vendor{user_id}@shesafe.test',
+                   'password_hash': password_hash, 'role': 'vendor'}
+
+    def vendor_rows():
+        for i in range(vendors):
+            vendor_id = first_vendor + i
+            city = rng.choices(cities, weights)[0]
+            lat, lng = clustered_point(rng, city)
+            female_staff = rng.random() < 0.5
+            yield {
+                'id': vendor_id,
+                'user_id': first_owner + i,
+                'business_name': f'{city.name} Safe Stop {vendor_id}',
+                'description': 'Synthetic vendor.',
+                'latitude': lat,
+                'longitude': lng,
+                'address': f'{vendor_id} Main Road, {city.name}',
+                'category': ', '.join(rng.sample(CATEGORIES, rng.randint(1, 3))),
+                'has_cctv': rng.random() < 0.7,
+                'has_female_staff': female_staff,
+                'female_staff_start_time': time(9, 0) if female_staff else None,
+                'female_staff_end_time': time(21, 0) if female_staff else None,
+                'is_verified': rng.random() < 0.9,
+                'is_active': True,
+                'average_rating': 0.0,
+                'created_at': now,
+                'updated_at': now,
+            }
+
+    def image_rows():
+        for i in range(vendors):
+            yield {'vendor_id': first_vendor + i, 'image_url': PLACEHOLDER_VENDOR_IMAGE, 'uploaded_at': now}
+
+    counts = {
+        'users': bulk_insert(User, user_rows(), batch_size),
+        'vendors': bulk_insert(Vendor, vendor_rows(), batch_size),
+        'vendor_images': bulk_insert(VendorImage, image_rows(), batch_size),
+        'bookings': 0,
+        'feedbacks': 0,
+    }
+
+    # Bookings only reference rows created here, so gaps left by deleted
+    # users or vendors in a live database can't break foreign keys
+    user_range = (first_user, first_owner - 1) if users else None
+    vendor_range = (first_vendor, first_vendor + vendors - 1) if vendors else None
+    if bookings and user_range and vendor_range:
+        first_booking = ids[Booking]
+        completed = array('l')
+        vendor_of = array('l', [0]) * bookings
+
+        def booking_rows():
+            for i in range(bookings):
+                status = rng.choice(STATUSES)
+                visit = now - timedelta(minutes=rng.randint(0, 365 * 24 * 60))
+                vendor_id = rng.randint(*vendor_range)
+                vendor_of[i] = vendor_id
+                if status == 'completed':
+                    completed.append(i)
+                yield {
+                    'id': first_booking + i,
+                    'user_id': rng.randint(*user_range),
+                    'vendor_id': vendor_id,
+                    'booking_time': visit - timedelta(hours=rng.randint(1, 48)),
+                    'visit_date': visit,
+                    'payment_mode': rng.choice(PAYMENT_MODES),
+                    'amount': rng.choice(AMOUNTS),
+                    'status': status,
+                }
+
+        counts['bookings'] = bulk_insert(Booking, booking_rows(), batch_size)
+
+        def feedback_rows():
+            for i in rng.sample(completed, min(feedbacks, len(completed))):
+                hygiene, safety, staff = rng.randint(1, 5), rng.randint(1, 5), rng.randint(1, 5)
+                yield {
+                    'booking_id': first_booking + i,
+                    'vendor_id': vendor_of[i],
+                    'hygiene_rating': hygiene,
+                    'safety_rating': safety,
+                    'staff_behavior_rating': staff,
+                    'overall_rating': (hygiene + safety + staff) / 3.0,
+                    'comments': rng.choice(COMMENTS),
+                    'created_at': now,
+                }
+
+        counts['feedbacks'] = bulk_insert(Feedback, feedback_rows(), batch_size)
+
+    if counts['bookings']:
+        RevenueDaily.rebuild()
+    if counts['feedbacks']:
+        Vendor.recompute_ratings()
+    return counts
@@ -0,0 +1,117 @@
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+
+class LatencyStat:
+    """Running count / total / max of a latency in seconds."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'avg_ms': round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            'max_ms': round(self.max * 1000, 3),
+        }
+
+
+class PoolMetrics:
+    """Connection pool counters shared by every engine in the process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.checkout_wait = LatencyStat()
+        self.connect_latency = LatencyStat()
+
+    def observe(self, name, seconds):
+        with self._lock:
+            getattr(self, name).observe(seconds)
+
+    def incr(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'checkins': self.checkins,
+                'connects': self.connects,
+                'invalidations': self.invalidations,
+                'checkout_wait': self.checkout_wait.to_dict(),
+                'connect_latency': self.connect_latency.to_dict(),
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waits for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_metrics.observe('checkout_wait', time.perf_counter() - start)
+
+
+def install_pool_metrics(engine):
+    """Attach checkout/checkin/connect listeners to an engine's pool."""
+
+    @event.listens_for(engine, 'do_connect')
+    def before_connect(dialect, conn_rec, cargs, cparams):
+        pool_metrics._local.connect_start = time.perf_counter()
+
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        start = getattr(pool_metrics._local, 'connect_start', None)
+        if start is not None:
+            pool_metrics.observe('connect_latency', time.perf_counter() - start)
+            pool_metrics._local.connect_start = None
+        pool_metrics.incr('connects')
+
+    @event.listens_for(engine, 'checkout')
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        pool_metrics.incr('checkouts')
+
+    @event.listens_for(engine, 'checkin')
+    def on_checkin(dbapi_connection, connection_record):
+        pool_metrics.incr('checkins')
+
+    @event.listens_for(engine, 'invalidate')
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        pool_metrics.incr('invalidations')
+
+
+def pool_status(engine):
+    """Current pool occupancy plus the process-wide counters."""
+    pool = engine.pool
+    status = {'pool_class': type(pool).__name__, 'status': pool.status()}
+    if isinstance(pool, QueuePool):
+        status.update({
+            'size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'overflow': pool.overflow(),
+            'checked_in': pool.checkedin(),
+        })
+    status.update(pool_metrics.to_dict())
+    return status
@@ -0,0 +1,150 @@
+"""
+Streaming CSV / JSONL exports for admins.
+
+Each export selects plain columns (no ORM objects) with yield_per, which
+uses a server-side cursor on PostgreSQL, and is written out chunk by chunk
+from a generator, so memory stays flat however large the table is.
+"""
+import csv
+import io
+import json
+from datetime import date, datetime, time, timedelta
+
+from app import db
+from app.models import User, Vendor, Booking, Feedback, RevenueDaily
+
+YIELD_PER = 1000
+
+FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+def _datetime_range(column, start, end):
+    """Filters for an inclusive [start, end] date range on a DateTime column."""
+    filters = []
+    if start:
+        filters.append(column >= start)
+    if end:
+        filters.append(column < end + timedelta(days=1))
+    return filters
+
+
+def _bookings(start, end, vendor_id):
+    stmt = db.select(
+        Booking.id, Booking.user_id, User.name.label('user_name'), Booking.vendor_id,
+        Vendor.business_name, Booking.booking_time, Booking.visit_date,
+        Booking.payment_mode, Booking.amount, Booking.status,
+    ).join(User, User.id == Booking.user_id).join(Vendor, Vendor.id == Booking.vendor_id).\
+        where(*_datetime_range(Booking.visit_date, start, end))
+    if vendor_id:
+        stmt = stmt.where(Booking.vendor_id == vendor_id)
+    return stmt.order_by(Booking.id)
+
+
+def _feedback(start, end, vendor_id):
+    stmt = db.select(
+        Feedback.id, Feedback.booking_id, Feedback.vendor_id, Vendor.business_name,
+        Feedback.hygiene_rating, Feedback.safety_rating, Feedback.staff_behavior_rating,
+        Feedback.overall_rating, Feedback.comments, Feedback.created_at,
+    ).join(Vendor, Vendor.id == Feedback.vendor_id).\
+        where(*_datetime_range(Feedback.created_at, start, end))
+    if vendor_id:
+        stmt = stmt.where(Feedback.vendor_id == vendor_id)
+    return stmt.order_by(Feedback.id)
+
+
+def _vendors(start, end, vendor_id):
+    stmt = db.select(
+        Vendor.id, Vendor.user_id, Vendor.business_name, Vendor.address, Vendor.latitude,
+        Vendor.longitude, Vendor.category, Vendor.has_cctv, Vendor.has_female_staff,
+        Vendor.is_verified, Vendor.is_active, Vendor.average_rating, Vendor.rating_count,
+        Vendor.created_at,
+    ).where(*_datetime_range(Vendor.created_at, start, end))
+    if vendor_id:
+        stmt = stmt.where(Vendor.id == vendor_id)
+    return stmt.order_by(Vendor.id)
+
+
+def _revenue(start, end, vendor_id):
+    stmt = db.select(
+        RevenueDaily.day, RevenueDaily.vendor_id, Vendor.business_name,
+        RevenueDaily.payment_mode, RevenueDaily.bookings, RevenueDaily.amount,
+    ).join(Vendor, Vendor.id == RevenueDaily.vendor_id)
+    if start:
+        stmt = stmt.where(RevenueDaily.day >= start)
+    if end:
+        stmt = stmt.where(RevenueDaily.day <= end)
+    if vendor_id:
+        stmt = stmt.where(RevenueDaily.vendor_id == vendor_id)
+    return stmt.order_by(RevenueDaily.day, RevenueDaily.vendor_id, RevenueDaily.payment_mode)
+
+
+EXPORTS = {
+    'bookings': _bookings,
+    'feedback': _feedback,
+    'vendors': _vendors,
+    'revenue': _revenue,
+}
+
+
+def export_rows(kind, start=None, end=None, vendor_id=None):
+    """
+    Return (column_names, row_iterator) for an export. Dates are inclusive;
+    rows are fetched YIELD_PER at a time.
+    """
+    stmt = EXPORTS[kind](start, end, vendor_id)
+    result = db.session.execute(stmt.execution_options(yield_per=YIELD_PER))
+    return list(result.keys()), result
+
+
+def _jsonable(value):
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return value
+
+
+def stream_csv(columns, rows):
+    """Yield CSV text a chunk (YIELD_PER rows) at a time."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % YIELD_PER == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def stream_jsonl(columns, rows):
+    """Yield one JSON object per line, batched YIELD_PER lines at a time."""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps({c: _jsonable(v) for c, v in zip(columns, row)}))
+        if len(lines) == YIELD_PER:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def stream_export(kind, fmt, start=None, end=None, vendor_id=None):
+    """Generator of text chunks for an export in 'csv' or 'jsonl' format."""
+    columns, rows = export_rows(kind, start, end, vendor_id)
+    writer = stream_csv if fmt == 'csv' else stream_jsonl
+    try:
+        yield from writer(columns, rows)
+    finally:
+        rows.close()
+
+
+def export_filename(kind, fmt, start=None, end=None, vendor_id=None):
+    parts = [kind]
+    if vendor_id:
+        parts.append(f'vendor{vendor_id}')
+    if start or end:
+        parts.append(f"{start or 'start'}_{end or 'now'}")
+    return '-'.join(parts) + f'.{fmt}'
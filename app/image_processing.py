@@ -0,0 +1,274 @@
+"""
+Upload image processing in a bounded process pool.
+
+Uploads are spooled to disk by storage.save_uploads(); the pool only ever
+receives file paths, never image bytes. Each job decodes the image with
+Pillow (rejecting anything that isn't a decodable image or is larger than
+IMAGE_MAX_PIXELS), applies the EXIF orientation, shrinks it to fit
+IMAGE_MAX_DIMENSION and re-encodes it as IMAGE_FORMAT (WebP by default)
+without any metadata, so GPS and camera EXIF never reach the public image
+URLs. The same job also encodes a copy at each IMAGE_THUMBNAIL_WIDTHS
+width narrower than the image, for srcset. Decoding happens outside the
+request thread's GIL, so a multi-image onboarding batch is processed in
+parallel.
+
+IMAGE_PROCESS_WORKERS=0 (or a platform without process support, e.g.
+serverless) processes images inline instead.
+"""
+import atexit
+import hashlib
+import os
+import tempfile
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from flask import current_app
+
+CHUNK_SIZE = 64 * 1024
+
+MIME_TYPES = {'WEBP': 'image/webp', 'AVIF': 'image/avif', 'JPEG': 'image/jpeg', 'PNG': 'image/png'}
+
+ProcessedImage = namedtuple('ProcessedImage', 'path content_hash mime_type size_bytes width height variants')
+
+# A fixed-width derivative: {width: Variant}; the full image is listed under its own width
+Variant = namedtuple('Variant', 'path content_hash size_bytes')
+
+
+class InvalidImage(ValueError):
+    """The upload is not an image Pillow can decode, or is too large to."""
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _flatten(image):
+    """RGB, or RGBA when the image has transparency."""
+    if image.mode in ('RGB', 'RGBA'):
+        return image
+    if image.mode in ('LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info):
+        return image.convert('RGBA')
+    return image.convert('RGB')
+
+
+def process_image(src_path, out_dir, options):
+    """
+    Decode, validate, orient, resize and re-encode one spooled upload.
+
+    Runs in a pool worker. Writes the result to a temp file in out_dir and
+    returns a ProcessedImage; raises InvalidImage for unusable input.
+    """
+    from PIL import Image, ImageOps
+
+    Image.MAX_IMAGE_PIXELS = options['max_pixels']
+    max_dimension = options['max_dimension']
+    try:
+        with Image.open(src_path) as image:
+            # JPEG can decode at a reduced scale, which avoids holding the full-size bitmap
+            image.draft('RGB', (max_dimension, max_dimension))
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+            image = _flatten(image)
+    except (Image.DecompressionBombError, Image.DecompressionBombWarning) as e:
+        raise InvalidImage('Image is too large') from e
+    except (OSError, SyntaxError, ValueError) as e:
+        raise InvalidImage('Not a valid image') from e
+
+    main = _encode(image, out_dir, options)
+    variants = {image.width: main}
+    try:
+        variants.update(_encode_variants(image, out_dir, options))
+    except Exception:
+        for variant in variants.values():
+            os.remove(variant.path)
+        raise
+    return ProcessedImage(main.path, main.content_hash, MIME_TYPES[options['format']],
+                          main.size_bytes, image.width, image.height, variants)
+
+
+def process_variants(src_path, out_dir, options):
+    """
+    Fixed-width derivatives of an already stored image, for backfilling.
+    Returns ({width: Variant}, full width); the stored original isn't re-encoded.
+    """
+    from PIL import Image, ImageOps
+
+    Image.MAX_IMAGE_PIXELS = options['max_pixels']
+    widest = max(options['thumbnail_widths'], default=1)
+    try:
+        with Image.open(src_path) as image:
+            # Images stored before uploads were re-encoded may still carry an EXIF rotation
+            rotated = image.getexif().get(0x0112) in (5, 6, 7, 8)
+            full_width = image.height if rotated else image.width
+            image.draft('RGB', (widest, widest))
+            image = _flatten(ImageOps.exif_transpose(image))
+    except (Image.DecompressionBombError, OSError, SyntaxError, ValueError) as e:
+        raise InvalidImage('Not a valid image') from e
+    # Derivatives are only made for widths narrower than the full image
+    options = dict(options, thumbnail_widths=[w for w in options['thumbnail_widths'] if w < full_width])
+    return _encode_variants(image, out_dir, options), full_width
+
+
+def render_resized(src_path, out_dir, width, height, options):
+    """
+    A stored image for /img, cropped to fill width x height (like
+    object-fit: cover). Never upscales: an image smaller than the box gets
+    the largest crop of the box's aspect ratio it has. Returns a Variant.
+    """
+    from PIL import Image, ImageOps
+
+    Image.MAX_IMAGE_PIXELS = options['max_pixels']
+    try:
+        with Image.open(src_path) as image:
+            largest = max(width, height)
+            image.draft('RGB', (largest, largest))
+            image = _flatten(ImageOps.exif_transpose(image))
+    except (Image.DecompressionBombError, OSError, SyntaxError, ValueError) as e:
+        raise InvalidImage('Not a valid image') from e
+
+    scale = min(1.0, image.width / width, image.height / height)
+    image = ImageOps.fit(image, (max(1, round(width * scale)), max(1, round(height * scale))), Image.LANCZOS)
+    return _encode(image, out_dir, options)
+
+
+def _encode(image, out_dir, options):
+    image_format = options['format']
+    if image_format == 'JPEG' and image.mode == 'RGBA':
+        image = image.convert('RGB')
+    save_options = {'quality': options['quality']}
+    if image_format == 'WEBP':
+        save_options['method'] = 4
+    elif image_format == 'JPEG':
+        save_options.update(optimize=True, progressive=True)
+
+    # No exif/icc_profile/xmp arguments: the re-encoded file carries no metadata
+    fd, out_path = tempfile.mkstemp(dir=out_dir, suffix='.' + image_format.lower())
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            image.save(f, format=image_format, **save_options)
+    except Exception:
+        os.remove(out_path)
+        raise
+    return Variant(out_path, hash_file(out_path), os.path.getsize(out_path))
+
+
+def _encode_variants(image, out_dir, options):
+    """{width: Variant} for each configured width narrower than the image."""
+    from PIL import Image
+
+    variants = {}
+    try:
+        for width in sorted(options['thumbnail_widths']):
+            if width >= image.width:
+                continue
+            height = max(1, round(image.height * width / image.width))
+            variants[width] = _encode(image.resize((width, height), Image.LANCZOS), out_dir, options)
+    except Exception:
+        for variant in variants.values():
+            os.remove(variant.path)
+        raise
+    return variants
+
+
+def _output_format(requested):
+    from PIL import features
+
+    requested = requested.upper()
+    if requested == 'AVIF' and not features.check('avif'):
+        current_app.logger.warning('IMAGE_FORMAT=AVIF but Pillow has no AVIF support; using WEBP')
+        return 'WEBP'
+    if requested not in MIME_TYPES:
+        raise ValueError(f'Unsupported IMAGE_FORMAT: {requested!r}')
+    return requested
+
+
+def processing_options(app=None):
+    config = (app or current_app).config
+    return {
+        'format': _output_format(config.get('IMAGE_FORMAT', 'WEBP')),
+        'quality': config.get('IMAGE_QUALITY', 82),
+        'max_dimension': config.get('IMAGE_MAX_DIMENSION', 2048),
+        'max_pixels': config.get('IMAGE_MAX_PIXELS', 40_000_000),
+        'thumbnail_widths': tuple(config.get('IMAGE_THUMBNAIL_WIDTHS', (160, 320, 640))),
+    }
+
+
+class ImagePool:
+    """
+    Lazily started process pool, one per worker process.
+
+    Forked app workers (gunicorn) each start their own pool on first use;
+    a pool inherited across a fork is never reused.
+    """
+
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def executor(self):
+        if self.max_workers <= 0:
+            return None
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                try:
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                except (OSError, NotImplementedError, ImportError) as e:
+                    # No working multiprocessing primitives here: process inline
+                    current_app.logger.warning(f'Image process pool unavailable ({e}); processing inline')
+                    self.max_workers = 0
+                    return None
+                self._pid = os.getpid()
+            return self._executor
+
+    def map(self, fn, jobs):
+        """Run fn(*job) for each job; returns a list of results or the exception each raised."""
+        executor = self.executor()
+        futures = None
+        if executor is not None:
+            try:
+                futures = [executor.submit(fn, *job) for job in jobs]
+            except BrokenProcessPool:
+                self._executor = None
+
+        results = []
+        for i, job in enumerate(jobs):
+            try:
+                if futures is None:
+                    results.append(fn(*job))
+                    continue
+                try:
+                    results.append(futures[i].result())
+                except BrokenProcessPool:
+                    # A pool worker died (OOM kill, ...): finish inline, start a fresh pool next time
+                    self._executor = None
+                    futures = None
+                    results.append(fn(*job))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def shutdown(self):
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+
+
+def init_image_pool(app):
+    workers = app.config.get('IMAGE_PROCESS_WORKERS')
+    if workers is None:
+        workers = min(4, os.cpu_count() or 1)
+    pool = ImagePool(workers)
+    app.extensions['image_pool'] = pool
+    atexit.register(pool.shutdown)
+
+
+def get_image_pool():
+    return current_app.extensions['image_pool']
@@ -0,0 +1,302 @@
+"""
+On-the-fly cropped images for /img/<hash>?w=&h=&fmt=.
+
+Both w and h are required, and only the boxes listed in IMAGE_RESIZE_SIZES
+(the ones the templates ask for), at 1x and 2x, can be requested; any
+other size is a 400, so the endpoint can't be used to render and cache
+arbitrary sizes. The image is cropped to fill the box.
+
+A variant is rendered from the stored image (in the image process pool)
+the first time it is asked for and kept in a size-bounded on-disk LRU
+cache under IMAGE_RESIZE_CACHE_PATH, shared by every worker on the host.
+A variant is identified by the source hash plus the resize parameters, so
+its URL never changes content and is served with an ETag and an immutable
+Cache-Control.
+
+Concurrent requests for the same variant within a worker wait for a single
+render. Across workers a duplicate render is possible but harmless: files
+are written under a temp name and renamed into place.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import namedtuple
+
+from flask import current_app
+
+from app.image_processing import MIME_TYPES, get_image_pool, processing_options, render_resized
+from app.storage import get_image_store
+
+# fmt= values and the Pillow format each one renders
+RESIZE_FORMATS = {'webp': 'WEBP', 'avif': 'AVIF', 'jpeg': 'JPEG', 'jpg': 'JPEG', 'png': 'PNG'}
+
+# Pixel densities each IMAGE_RESIZE_SIZES box is served at (VendorImage.resized_srcset's 1x/2x)
+RESIZE_DENSITIES = (1, 2)
+
+ResizeSpec = namedtuple('ResizeSpec', 'width height format')
+
+
+def allowed_sizes(boxes):
+    """{(w, h)} that may be requested for the configured (width, height) boxes."""
+    return frozenset((width * density, height * density)
+                     for width, height in boxes for density in RESIZE_DENSITIES)
+
+
+def parse_resize_spec(args, sizes):
+    """ResizeSpec from request args; raises ValueError for a size not in `sizes` or an unknown format."""
+    try:
+        size = (int(args['w']), int(args['h']))
+    except (KeyError, ValueError):
+        raise ValueError('w and h are required integers') from None
+    if size not in sizes:
+        raise ValueError(f'{size[0]}x{size[1]} is not an available size')
+    width, height = size
+    fmt = (args.get('fmt') or 'webp').lower()
+    if fmt not in RESIZE_FORMATS:
+        raise ValueError(f'fmt must be one of {", ".join(sorted(RESIZE_FORMATS))}')
+    image_format = RESIZE_FORMATS[fmt]
+    if image_format == 'AVIF' and not _avif_supported():
+        image_format = 'WEBP'
+    return ResizeSpec(width, height, image_format)
+
+
+_avif = None
+
+
+def _avif_supported():
+    global _avif
+    if _avif is None:
+        from PIL import features
+        _avif = bool(features.check('avif'))
+    return _avif
+
+
+def variant_key(content_hash, spec, quality):
+    """Cache key and ETag of a variant."""
+    raw = f'{content_hash}:{spec.width}x{spec.height}:{spec.format}:{quality}'
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class DiskLRUCache:
+    """
+    Size-bounded file cache. A file's mtime is its last use, so eviction
+    (oldest first, down to 90% of max_bytes) works from a directory scan
+    and stays correct when several workers share the directory.
+    """
+
+    LOW_WATER = 0.9
+    # Refresh a hit's mtime at most this often, and rescan for other workers' writes this often
+    TOUCH_INTERVAL = 60
+    RESCAN_INTERVAL = 300
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total = None
+        self._scanned_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], key)
+
+    def contains(self, key):
+        return os.path.exists(self._path(key))
+
+    def open(self, key):
+        """Open file for key, or None on a miss."""
+        path = self._path(key)
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            if time.time() - os.fstat(f.fileno()).st_mtime > self.TOUCH_INTERVAL:
+                os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return f
+
+    def staging_dir(self):
+        directory = os.path.join(self.root, 'staging')
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+    def put(self, key, src_path):
+        """Move the file at src_path into the cache as key."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        size = os.path.getsize(src_path)
+        os.replace(src_path, path)
+        with self._lock:
+            if self._total is None or time.monotonic() - self._scanned_at > self.RESCAN_INTERVAL:
+                self._total = sum(entry[2] for entry in self._scan())
+                self._scanned_at = time.monotonic()
+            else:
+                self._total += size
+            if self._total > self.max_bytes:
+                self._evict(keep=path)
+
+    def _scan(self):
+        """(mtime, path, size) of every cached file."""
+        entries = []
+        for directory in os.scandir(self.root):
+            if not directory.is_dir() or directory.name == 'staging':
+                continue
+            for entry in os.scandir(directory.path):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, entry.path, stat.st_size))
+        return entries
+
+    def _evict(self, keep):
+        entries = sorted(self._scan())
+        total = sum(size for _, _, size in entries)
+        target = self.max_bytes * self.LOW_WATER
+        for _, path, size in entries:
+            if total <= target:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.evictions += 1
+        self._total = total
+        self._scanned_at = time.monotonic()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'bytes': self._total,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+class SingleFlight:
+    """Collapse concurrent calls for the same key into one; the others wait for its result."""
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.collapsed = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+            else:
+                self.collapsed += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class ImageResizer:
+    """Renders /img variants into the disk cache, one render per variant at a time."""
+
+    def __init__(self, cache, quality, sizes):
+        self.cache = cache
+        self.quality = quality
+        self.sizes = sizes
+        self.renders = SingleFlight()
+        self.rendered = 0
+
+    def open(self, content_hash, spec):
+        """
+        (file, key) for the variant, rendering it on a miss.
+        Raises LookupError if the source image isn't stored and InvalidImage if it can't be decoded.
+        """
+        key = variant_key(content_hash, spec, self.quality)
+        f = self.cache.open(key)
+        if f is None:
+            self.renders.do(key, lambda: self._render(content_hash, spec, key))
+            f = self.cache.open(key)
+            if f is None:
+                raise LookupError(f'Variant {key} was evicted before it could be served')
+        return f, key
+
+    def _render(self, content_hash, spec, key):
+        # Another worker may have rendered it while this one waited
+        if self.cache.contains(key):
+            return
+
+        store = get_image_store()
+        staging = self.cache.staging_dir()
+        src_path, temporary = store.local_path(content_hash), False
+        if src_path is None:
+            data = store.get(content_hash)
+            if data is None:
+                raise LookupError(f'Unknown image {content_hash}')
+            fd, src_path = tempfile.mkstemp(dir=staging)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            temporary = True
+
+        options = dict(processing_options(), format=spec.format, quality=self.quality)
+        try:
+            [result] = get_image_pool().map(render_resized, [(src_path, staging, spec.width, spec.height, options)])
+        finally:
+            if temporary:
+                os.remove(src_path)
+        if isinstance(result, Exception):
+            raise result
+        self.cache.put(key, result.path)
+        self.rendered += 1
+
+    @staticmethod
+    def mime_type(spec):
+        return MIME_TYPES[spec.format]
+
+    def stats(self):
+        stats = self.cache.stats()
+        stats.update({'rendered': self.rendered, 'collapsed': self.renders.collapsed})
+        return stats
+
+
+def init_image_resizer(app):
+    cache = DiskLRUCache(app.config['IMAGE_RESIZE_CACHE_PATH'], app.config['IMAGE_RESIZE_CACHE_BYTES'])
+    sizes = allowed_sizes(app.config['IMAGE_RESIZE_SIZES'])
+    app.extensions['image_resizer'] = ImageResizer(cache, app.config.get('IMAGE_QUALITY', 82), sizes)
+
+
+def get_image_resizer():
+    return current_app.extensions['image_resizer']
@@ -1,7 +1,12 @@
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
+from collections import Counter
+from sqlalchemy import event, inspect
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, deferred
 from app import db
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlencode
 
 
 def utcnow():
@@ -18,6 +23,10 @@ class User(UserMixin, db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False, index=True)
     password_hash = db.Column(db.String(255), nullable=False)
     role = db.Column(db.String(20), nullable=False, default='user')
+
+    # Bumped whenever a field cached by app/auth_cache.py changes (role,
+    # password, name, vendor profile), so cached session identities go stale
+    auth_version = db.Column(db.Integer, default=0, nullable=False, server_default='0')
     
     # Relationship to vendor profile
     vendor_profile = db.relationship('Vendor', backref='user', uselist=False, cascade='all, delete-orphan')
@@ -29,11 +38,33 @@ class User(UserMixin, db.Model):
     def check_password(self, password):
         """Check if the provided password matches the hash."""
         return check_password_hash(self.password_hash, password)
+
+    @property
+    def vendor_profile_id(self):
+        return self.vendor_profile.id if self.vendor_profile else None
+
+    def bump_auth_version(self):
+        self.auth_version = (self.auth_version or 0) + 1
     
     def __repr__(self):
         return f'<User {self.email}>'
 
 
+@event.listens_for(User.role, 'set', active_history=True)
+@event.listens_for(User.password_hash, 'set', active_history=True)
+@event.listens_for(User.name, 'set', active_history=True)
+def _bump_user_auth_version(target, value, oldvalue, initiator):
+    # New users have no cached identity yet
+    if target.id is not None and value != oldvalue:
+        target.bump_auth_version()
+
+
+PLACEHOLDER_VENDOR_IMAGE = "https://images.unsplash.com/photo-1590602847861-f357a9332bbc?q=80&w=200&auto=format&fit=crop"
+
+# Width of the image variant list pages and cards use when they can't pick from a srcset
+LIST_IMAGE_WIDTH = 320
+
+
 class Vendor(db.Model):
     """Vendor model for business/service provider information."""
     __tablename__ = 'vendors'
@@ -55,12 +86,35 @@ class Vendor(db.Model):
     average_rating = db.Column(db.Float, default=0.0, nullable=False)
     created_at = db.Column(db.DateTime, default=utcnow(), nullable=False)
     
+    # Running feedback aggregates, updated atomically in submit_feedback and
+    # rebuilt in bulk by recompute_ratings.py
+    rating_count = db.Column(db.Integer, default=0, nullable=False, server_default='0')
+    overall_rating_sum = db.Column(db.Float, default=0.0, nullable=False, server_default='0')
+    hygiene_rating_sum = db.Column(db.Integer, default=0, nullable=False, server_default='0')
+    safety_rating_sum = db.Column(db.Integer, default=0, nullable=False, server_default='0')
+    staff_behavior_rating_sum = db.Column(db.Integer, default=0, nullable=False, server_default='0')
+
+    # Booking capacity: visits are grouped into slots of slot_minutes and at
+    # most slot_capacity bookings are accepted per slot (NULL = unlimited)
+    slot_minutes = db.Column(db.Integer, default=30, nullable=False, server_default='30')
+    slot_capacity = db.Column(db.Integer, nullable=True)
+
+    # Bumped on every change to the row or its images; the /api/vendors sync cursor
+    updated_at = db.Column(db.DateTime, default=utcnow, onupdate=utcnow, nullable=False, index=True)
+    
     # Relationship to images
     images = db.relationship('VendorImage', backref='vendor', lazy=True, cascade='all, delete-orphan')
     
-    def to_dict(self):
-        """Convert vendor profile to dictionary for JSON serialization."""
-        first_image = self.images[0].url if self.images else "https://images.unsplash.com/photo-1590602847861-f357a9332bbc?q=80&w=200&auto=format&fit=crop"
+    def to_dict(self, image=None):
+        """
+        Convert vendor profile to dictionary for JSON serialization.
+
+        Pass `image` (an entry from VendorImage.first_images) to avoid
+        loading the images relationship.
+        """
+        if image is None:
+            image = self.images[0].urls() if self.images else None
+        image = image or {'url': PLACEHOLDER_VENDOR_IMAGE, 'srcset': '', 'thumbnail_url': PLACEHOLDER_VENDOR_IMAGE}
         
         return {
             'id': self.id,
@@ -72,23 +126,137 @@ class Vendor(db.Model):
             'has_cctv': self.has_cctv,
             'has_female_staff': self.has_female_staff,
             'average_rating': self.average_rating,
-            'image_url': first_image if first_image else "https://images.unsplash.com/photo-1590602847861-f357a9332bbc?q=80&w=200&auto=format&fit=crop"
+            'review_count': self.rating_count or 0,
+            'image_url': image['url'] or PLACEHOLDER_VENDOR_IMAGE,
+            'image_srcset': image['srcset'],
+            'thumbnail_url': image['thumbnail_url'] or PLACEHOLDER_VENDOR_IMAGE,
+        }
+
+    def rating_breakdown(self):
+        """Per-dimension average ratings from the stored running sums."""
+        def average(total):
+            return round(total / self.rating_count, 1) if self.rating_count else 0.0
+
+        return {
+            'count': self.rating_count or 0,
+            'overall': average(self.overall_rating_sum or 0),
+            'hygiene': average(self.hygiene_rating_sum or 0),
+            'safety': average(self.safety_rating_sum or 0),
+            'staff_behavior': average(self.staff_behavior_rating_sum or 0),
         }
 
+    @classmethod
+    def record_rating(cls, vendor_id, hygiene, safety, staff_behavior, overall):
+        """
+        Add one feedback to the vendor's running aggregates in a single
+        UPDATE. The new values are computed from the row's current values
+        by the database, so concurrent submissions cannot lose updates.
+        """
+        return db.session.query(cls).filter(cls.id == vendor_id).update({
+            cls.rating_count: cls.rating_count + 1,
+            cls.overall_rating_sum: cls.overall_rating_sum + overall,
+            cls.hygiene_rating_sum: cls.hygiene_rating_sum + hygiene,
+            cls.safety_rating_sum: cls.safety_rating_sum + safety,
+            cls.staff_behavior_rating_sum: cls.staff_behavior_rating_sum + staff_behavior,
+            cls.average_rating: (cls.overall_rating_sum + overall) / (cls.rating_count + 1),
+        }, synchronize_session=False)
+
+    @classmethod
+    def recompute_ratings(cls):
+        """
+        Rebuild every vendor's rating aggregates from the feedbacks table.
+
+        Aggregates are computed once with GROUP BY and applied with
+        UPDATE ... FROM rather than per-vendor correlated subqueries, which
+        scan feedbacks once per vendor. Returns the number of vendors with
+        feedback.
+        """
+        totals = db.select(
+            Feedback.vendor_id.label('vendor_id'),
+            db.func.count(Feedback.id).label('count'),
+            db.func.sum(Feedback.overall_rating).label('overall'),
+            db.func.sum(Feedback.hygiene_rating).label('hygiene'),
+            db.func.sum(Feedback.safety_rating).label('safety'),
+            db.func.sum(Feedback.staff_behavior_rating).label('staff_behavior'),
+        ).group_by(Feedback.vendor_id).subquery()
+
+        # Vendors without feedback keep whatever average rating they had
+        db.session.execute(
+            db.update(cls).values(
+                rating_count=0, overall_rating_sum=0.0, hygiene_rating_sum=0,
+                safety_rating_sum=0, staff_behavior_rating_sum=0,
+            ).execution_options(synchronize_session=False)
+        )
+        result = db.session.execute(
+            db.update(cls).where(cls.id == totals.c.vendor_id).values(
+                rating_count=totals.c.count,
+                overall_rating_sum=totals.c.overall,
+                hygiene_rating_sum=totals.c.hygiene,
+                safety_rating_sum=totals.c.safety,
+                staff_behavior_rating_sum=totals.c.staff_behavior,
+                average_rating=totals.c.overall / totals.c.count,
+            ).execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+    @staticmethod
+    def serialize_many(vendors):
+        """Serialize vendors for list pages with one query for all their images."""
+        images = VendorImage.first_images([v.id for v in vendors])
+        # False (no image) makes to_dict use the placeholder rather than load v.images
+        return [v.to_dict(image=images.get(v.id, False)) for v in vendors]
+
+    @classmethod
+    def verified_listing(cls):
+        """Serialized verified, active vendors for list pages and maps."""
+        vendors = cls.query.filter_by(is_verified=True, is_active=True).order_by(cls.id).all()
+        return cls.serialize_many(vendors)
+
     def __repr__(self):
         return f'<Vendor {self.business_name}>'
 
+
+# Deleted vendors are remembered this long so syncing clients can drop them;
+# clients that last synced before that get a full list instead
+TOMBSTONE_RETENTION = timedelta(days=30)
+
+
+class VendorTombstone(db.Model):
+    """A deleted vendor, kept so /api/vendors can report the removal in deltas."""
+    __tablename__ = 'vendor_tombstones'
+
+    vendor_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    deleted_at = db.Column(db.DateTime, default=utcnow, nullable=False, index=True)
+
+
+@event.listens_for(Vendor, 'after_delete')
+def _record_vendor_tombstone(mapper, connection, target):
+    now = utcnow()
+    tombstones = VendorTombstone.__table__
+    connection.execute(tombstones.delete().where(
+        (tombstones.c.vendor_id == target.id) | (tombstones.c.deleted_at < now - TOMBSTONE_RETENTION)
+    ))
+    connection.execute(tombstones.insert().values(vendor_id=target.id, deleted_at=now))
+
+
+@event.listens_for(Vendor, 'after_insert')
+def _clear_vendor_tombstone(mapper, connection, target):
+    # SQLite can reuse the id of a deleted vendor
+    tombstones = VendorTombstone.__table__
+    connection.execute(tombstones.delete().where(tombstones.c.vendor_id == target.id))
+
 class Booking(db.Model):
     __tablename__ = 'bookings'
+    __table_args__ = (db.Index('ix_bookings_status_visit_date', 'status', 'visit_date'),)
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     vendor_id = db.Column(db.Integer, db.ForeignKey('vendors.id'), nullable=False)
     booking_time = db.Column(db.DateTime, default=utcnow(), nullable=False)
     visit_date = db.Column(db.DateTime, nullable=False)
     payment_mode = db.Column(db.String(20), nullable=False) # 'app' or 'pay_at_location'
     amount = db.Column(db.Float, nullable=False)
-    status = db.Column(db.String(20), default='pending', nullable=False) # 'pending', 'confirmed', 'cancelled', 'completed'
+    status = db.Column(db.String(20), default='pending', nullable=False) # 'pending', 'confirmed', 'cancelled', 'rejected', 'completed'
     
     # Relationships
     user = db.relationship('User', backref=db.backref('bookings', lazy=True))
@@ -97,6 +265,191 @@ class Booking(db.Model):
     def __repr__(self):
         return f'<Booking {self.id} for Vendor {self.vendor_id}>'
 
+
+# Booking statuses that no longer hold a place in their time slot
+RELEASED_STATUSES = ('cancelled', 'rejected')
+
+
+class SlotFull(Exception):
+    """Raised when a vendor's booking slot has no capacity left."""
+
+
+class BookingSlot(db.Model):
+    """Number of bookings taken in one of a vendor's time slots."""
+    __tablename__ = 'booking_slots'
+    __table_args__ = (db.UniqueConstraint('vendor_id', 'slot_start', name='uq_booking_slots_vendor_start'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    vendor_id = db.Column(db.Integer, db.ForeignKey('vendors.id', ondelete='CASCADE'), nullable=False)
+    slot_start = db.Column(db.DateTime, nullable=False)
+    booked = db.Column(db.Integer, default=0, nullable=False, server_default='0')
+
+    vendor = db.relationship('Vendor', backref=db.backref('slots', lazy=True, cascade='all, delete-orphan'))
+
+    @staticmethod
+    def slot_start_for(visit_date, slot_minutes):
+        """Start of the slot containing visit_date."""
+        minutes = visit_date.hour * 60 + visit_date.minute
+        start = minutes - minutes % slot_minutes
+        return visit_date.replace(hour=start // 60, minute=start % 60, second=0, microsecond=0)
+
+    @classmethod
+    def reserve(cls, vendor, visit_date):
+        """
+        Take one place in the vendor's slot for visit_date, raising SlotFull
+        if none is left. Returns the slot start.
+
+        The counter is only incremented by a conditional UPDATE
+        (booked < capacity), so concurrent requests are serialised by the
+        row lock and can never overbook. A missing slot row is created
+        inside a savepoint; losing that race to another request is harmless.
+        The caller commits together with the booking.
+        """
+        slot_start = cls.slot_start_for(visit_date, vendor.slot_minutes or 30)
+        if vendor.slot_capacity is None:
+            return slot_start
+
+        def take():
+            return db.session.execute(
+                db.update(cls)
+                .where(cls.vendor_id == vendor.id, cls.slot_start == slot_start, cls.booked < vendor.slot_capacity)
+                .values(booked=cls.booked + 1)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+
+        if take():
+            return slot_start
+
+        exists = db.session.execute(
+            db.select(cls.id).where(cls.vendor_id == vendor.id, cls.slot_start == slot_start)
+        ).first()
+        if exists is None:
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(db.insert(cls).values(vendor_id=vendor.id, slot_start=slot_start, booked=0))
+            except IntegrityError:
+                pass
+            if take():
+                return slot_start
+        raise SlotFull(slot_start)
+
+    @classmethod
+    def release(cls, vendor, visit_date):
+        """
+        Give back the place a booking took with reserve(), when it is
+        cancelled, rejected or deleted. The caller commits with the change.
+        """
+        if vendor.slot_capacity is None:
+            return
+        slot_start = cls.slot_start_for(visit_date, vendor.slot_minutes or 30)
+        db.session.execute(
+            db.update(cls)
+            .where(cls.vendor_id == vendor.id, cls.slot_start == slot_start, cls.booked > 0)
+            .values(booked=cls.booked - 1)
+            .execution_options(synchronize_session=False)
+        )
+
+    @classmethod
+    def rebuild(cls, vendor):
+        """
+        Recount the vendor's slots from today on from its bookings, at the
+        current slot_minutes. Needed when the slot length changes (existing
+        counters are keyed to the old slot boundaries) and when a capacity
+        is set (bookings made without one were never counted). The caller
+        commits.
+        """
+        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        visit_dates = db.session.execute(
+            db.select(Booking.visit_date).where(
+                Booking.vendor_id == vendor.id, Booking.visit_date >= today,
+                Booking.status.not_in(RELEASED_STATUSES))
+        ).scalars()
+        counts = Counter(cls.slot_start_for(visit_date, vendor.slot_minutes or 30) for visit_date in visit_dates)
+
+        db.session.execute(db.delete(cls).where(cls.vendor_id == vendor.id, cls.slot_start >= today))
+        if counts:
+            db.session.execute(db.insert(cls), [
+                {'vendor_id': vendor.id, 'slot_start': slot_start, 'booked': booked}
+                for slot_start, booked in counts.items()
+            ])
+
+
+@event.listens_for(Session, 'before_flush')
+def _release_booking_slots(db_session, flush_context, instances):
+    for obj in db_session.dirty:
+        if not isinstance(obj, Booking):
+            continue
+        previous = inspect(obj).attrs.status.history.deleted
+        if previous and previous[0] not in RELEASED_STATUSES and obj.status in RELEASED_STATUSES:
+            BookingSlot.release(obj.vendor, obj.visit_date)
+    for obj in db_session.deleted:
+        if isinstance(obj, Booking) and obj.status not in RELEASED_STATUSES and obj.vendor is not None:
+            BookingSlot.release(obj.vendor, obj.visit_date)
+
+class RevenueDaily(db.Model):
+    """
+    Completed-booking revenue rolled up per visit day, vendor and payment
+    mode. Kept current by record() when a booking is completed and rebuilt
+    from bookings by rebuild().
+    """
+    __tablename__ = 'revenue_daily'
+    __table_args__ = (db.UniqueConstraint('day', 'vendor_id', 'payment_mode', name='uq_revenue_daily_key'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False, index=True)
+    vendor_id = db.Column(db.Integer, db.ForeignKey('vendors.id', ondelete='CASCADE'), nullable=False, index=True)
+    payment_mode = db.Column(db.String(20), nullable=False)
+    bookings = db.Column(db.Integer, default=0, nullable=False, server_default='0')
+    amount = db.Column(db.Float, default=0.0, nullable=False, server_default='0')
+
+    vendor = db.relationship('Vendor', backref=db.backref('revenue_days', lazy=True, cascade='all, delete-orphan'))
+
+    @classmethod
+    def record(cls, booking):
+        """
+        Add a newly completed booking to its day's row with an atomic
+        increment, creating the row in a savepoint if needed. The caller
+        commits together with the status change.
+        """
+        key = (cls.day == booking.visit_date.date(), cls.vendor_id == booking.vendor_id,
+               cls.payment_mode == booking.payment_mode)
+
+        def increment():
+            return db.session.execute(
+                db.update(cls).where(*key)
+                .values(bookings=cls.bookings + 1, amount=cls.amount + booking.amount)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+
+        if increment():
+            return
+        try:
+            with db.session.begin_nested():
+                db.session.execute(db.insert(cls).values(
+                    day=booking.visit_date.date(), vendor_id=booking.vendor_id,
+                    payment_mode=booking.payment_mode, bookings=1, amount=booking.amount,
+                ))
+        except IntegrityError:
+            # Another request created the row first
+            increment()
+
+    @classmethod
+    def rebuild(cls):
+        """Replace the whole rollup with one INSERT ... SELECT over completed bookings."""
+        day = db.func.date(Booking.visit_date)
+        db.session.execute(db.delete(cls))
+        result = db.session.execute(
+            db.insert(cls).from_select(
+                ['day', 'vendor_id', 'payment_mode', 'bookings', 'amount'],
+                db.select(day, Booking.vendor_id, Booking.payment_mode,
+                          db.func.count(Booking.id), db.func.sum(Booking.amount))
+                .where(Booking.status == 'completed')
+                .group_by(day, Booking.vendor_id, Booking.payment_mode)
+            )
+        )
+        return result.rowcount
+
+
 class Feedback(db.Model):
     __tablename__ = 'feedbacks'
     
@@ -125,12 +478,24 @@ class VendorImage(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     vendor_id = db.Column(db.Integer, db.ForeignKey('vendors.id'), nullable=False)
     image_url = db.Column(db.String(255), nullable=True) # URL can be null if only data is used
-    image_data = db.Column(db.Text, nullable=True) # Store Base64 data
+    # Legacy Base64 data, moved out by migrate_images.py. Deferred so list
+    # queries never pull it; only loaded when .url falls back to it.
+    image_data = deferred(db.Column(db.Text, nullable=True))
+    content_hash = db.Column(db.String(64), nullable=True, index=True) # SHA-256 key in the image store
+    mime_type = db.Column(db.String(50), nullable=True)
+    size_bytes = db.Column(db.Integer, nullable=True)
+    # {width: content_hash} of the fixed-width copies made at upload (or by
+    # generate_thumbnails.py); the full image is listed under its own width
+    variants = db.Column(db.JSON(none_as_null=True), nullable=True)
     uploaded_at = db.Column(db.DateTime, default=utcnow(), nullable=False)
     
     @property
     def url(self):
         """Safely get image URL or Base64 data."""
+        # Content-addressed images are served from the image store
+        if self.content_hash:
+            return self.store_url(self.content_hash)
+
         # Extreme defense: catch any database error during column access
         try:
             # Check if it's already loaded to avoid query
@@ -148,13 +513,117 @@ class VendorImage(db.Model):
         # Fallback to stored URL
         try:
             if self.image_url:
-                if self.image_url.startswith('uploads/'):
-                    return f"/{self.image_url}"
-                return f"/static/{self.image_url}" if not self.image_url.startswith('static/') else f"/{self.image_url}"
+                return self.static_url(self.image_url)
         except Exception:
             pass
         
         return "https://images.unsplash.com/photo-1584622650111-993a426fbf0a?q=80&w=800&auto=format&fit=crop"
 
+    @staticmethod
+    def static_url(image_url):
+        """Resolve a stored image_url (relative or absolute) to a servable URL."""
+        if image_url.startswith(('http://', 'https://')):
+            return image_url
+        if image_url.startswith('uploads/'):
+            return f"/{image_url}"
+        return f"/static/{image_url}" if not image_url.startswith('static/') else f"/{image_url}"
+
+    @staticmethod
+    def store_url(content_hash):
+        return f"/images/{content_hash}"
+
+    @staticmethod
+    def resize_url(content_hash, width, height, fmt=None):
+        """/img URL rendering the stored image cropped to width x height (a box in IMAGE_RESIZE_SIZES, or twice one)."""
+        params = {'w': width, 'h': height}
+        if fmt:
+            params['fmt'] = fmt
+        return f"/img/{content_hash}?{urlencode(params)}"
+
+    def resized_url(self, width, height, fmt=None):
+        if not self.content_hash:
+            return self.thumbnail_url(width)
+        return self.resize_url(self.content_hash, width, height, fmt)
+
+    def resized_srcset(self, width, height):
+        """1x/2x srcset of resized copies for a box of width x height CSS pixels ('' for legacy images)."""
+        if not self.content_hash:
+            return ''
+        candidates = []
+        for density in (1, 2):
+            url = self.resize_url(self.content_hash, width * density, height * density)
+            candidates.append(f"{url} {density}x")
+        return ', '.join(candidates)
+
+    @classmethod
+    def srcset_for(cls, variants):
+        """'<url> 160w, <url> 320w, ...' for a variants mapping ('' if there are none)."""
+        if not variants:
+            return ''
+        return ', '.join(f"{cls.store_url(content_hash)} {width}w"
+                         for width, content_hash in sorted(variants.items(), key=lambda item: int(item[0])))
+
+    @classmethod
+    def thumbnail_for(cls, variants, width=LIST_IMAGE_WIDTH):
+        """URL of the narrowest variant at least `width` wide (else the widest), None without variants."""
+        if not variants:
+            return None
+        widths = sorted(int(w) for w in variants)
+        chosen = next((w for w in widths if w >= width), widths[-1])
+        return cls.store_url(variants[str(chosen)])
+
+    @property
+    def srcset(self):
+        return self.srcset_for(self.variants)
+
+    def thumbnail_url(self, width=LIST_IMAGE_WIDTH):
+        return self.thumbnail_for(self.variants, width) or self.url
+
+    def urls(self):
+        """{'url', 'srcset', 'thumbnail_url'} as used by Vendor.to_dict."""
+        return {'url': self.url, 'srcset': self.srcset, 'thumbnail_url': self.thumbnail_url()}
+
+    @classmethod
+    def first_images(cls, vendor_ids):
+        """
+        Map vendor id -> {'url', 'srcset', 'thumbnail_url'} of its first
+        image using a single query.
+
+        Only lightweight reference columns are selected; legacy rows that
+        still hold base64 data get a URL to /vendor-images/<id> instead of
+        an inline data URI, and no srcset.
+        """
+        if not vendor_ids:
+            return {}
+
+        first_ids = db.session.query(db.func.min(cls.id)).\
+            filter(cls.vendor_id.in_(vendor_ids)).\
+            group_by(cls.vendor_id)
+        rows = db.session.query(cls.id, cls.vendor_id, cls.content_hash, cls.variants, cls.image_url,
+                                cls.image_data.isnot(None)).\
+            filter(cls.id.in_(first_ids)).all()
+
+        images = {}
+        for image_id, vendor_id, content_hash, variants, image_url, has_data in rows:
+            if content_hash:
+                url = cls.store_url(content_hash)
+            elif has_data:
+                url = f"/vendor-images/{image_id}"
+            elif image_url:
+                url = cls.static_url(image_url)
+            else:
+                continue
+            images[vendor_id] = {'url': url, 'srcset': cls.srcset_for(variants),
+                                 'thumbnail_url': cls.thumbnail_for(variants) or url}
+        return images
+
     def __repr__(self):
         return f'<VendorImage {self.id}>'
+
+
+@event.listens_for(VendorImage, 'after_insert')
+@event.listens_for(VendorImage, 'after_delete')
+def _touch_vendor_for_image(mapper, connection, target):
+    # A vendor's listing includes its first image, so image changes count as vendor changes
+    vendors = Vendor.__table__
+    connection.execute(vendors.update().where(vendors.c.id == target.vendor_id).values(updated_at=utcnow()))
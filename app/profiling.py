@@ -0,0 +1,145 @@
+import bisect
+import threading
+import time
+
+from flask import g, has_request_context, request, before_render_template, template_rendered
+from sqlalchemy import event
+
+# Histogram bucket upper bounds in milliseconds (last bucket is +Inf)
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised in budget-enforcing mode when a route runs too many SQL statements."""
+
+
+def query_budget(max_queries):
+    """
+    Declare the maximum number of SQL statements a view may execute.
+
+    Only enforced when QUERY_BUDGET_ENFORCE is set (e.g. in tests); in
+    normal profiling it is reported alongside the measured count.
+    """
+    def decorator(f):
+        f.query_budget = max_queries
+        return f
+    return decorator
+
+
+class EndpointHistogram:
+    """Per-endpoint latency histogram with SQL and template totals."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def observe(self, endpoint, wall_ms, sql_count, sql_ms, template_ms):
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = self._endpoints[endpoint] = {
+                    'count': 0, 'wall_ms_sum': 0.0, 'sql_count_sum': 0, 'sql_count_max': 0,
+                    'sql_ms_sum': 0.0, 'template_ms_sum': 0.0, 'buckets': [0] * (len(BUCKETS_MS) + 1)
+                }
+            stats['count'] += 1
+            stats['wall_ms_sum'] += wall_ms
+            stats['sql_count_sum'] += sql_count
+            stats['sql_count_max'] = max(stats['sql_count_max'], sql_count)
+            stats['sql_ms_sum'] += sql_ms
+            stats['template_ms_sum'] += template_ms
+            stats['buckets'][bisect.bisect_left(BUCKETS_MS, wall_ms)] += 1
+
+    def snapshot(self):
+        with self._lock:
+            result = {}
+            for endpoint, stats in self._endpoints.items():
+                count = stats['count']
+                result[endpoint] = {
+                    'count': count,
+                    'wall_ms_avg': round(stats['wall_ms_sum'] / count, 3),
+                    'sql_count_avg': round(stats['sql_count_sum'] / count, 2),
+                    'sql_count_max': stats['sql_count_max'],
+                    'sql_ms_avg': round(stats['sql_ms_sum'] / count, 3),
+                    'template_ms_avg': round(stats['template_ms_sum'] / count, 3),
+                    'buckets': dict(zip([f'le_{b}' for b in BUCKETS_MS] + ['le_inf'], stats['buckets'])),
+                }
+            return result
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+histogram = EndpointHistogram()
+
+
+def _install_sql_listeners(engine):
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and 'profile' in g:
+            conn.info.setdefault('profile_query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('profile_query_start')
+        if starts and has_request_context() and 'profile' in g:
+            g.profile['sql_count'] += 1
+            g.profile['sql_time'] += time.perf_counter() - starts.pop()
+
+
+def init_profiling(app, engine):
+    """
+    Record per-request wall time, SQL statement count/time and template
+    render time. Emits a Server-Timing header and feeds `histogram`.
+    Enabled with PROFILING_ENABLED.
+    """
+    if not app.config.get('PROFILING_ENABLED'):
+        return
+
+    _install_sql_listeners(engine)
+
+    @before_render_template.connect_via(app)
+    def on_before_render(sender, template, context, **extra):
+        if 'profile' in g:
+            g.profile['template_start'].append(time.perf_counter())
+
+    @template_rendered.connect_via(app)
+    def on_rendered(sender, template, context, **extra):
+        if 'profile' in g and g.profile['template_start']:
+            g.profile['template_time'] += time.perf_counter() - g.profile['template_start'].pop()
+
+    @app.before_request
+    def start_profile():
+        g.profile = {
+            'start': time.perf_counter(),
+            'sql_count': 0,
+            'sql_time': 0.0,
+            'template_time': 0.0,
+            'template_start': [],
+        }
+
+    @app.after_request
+    def finish_profile(response):
+        profile = g.pop('profile', None)
+        if profile is None:
+            return response
+
+        wall_ms = (time.perf_counter() - profile['start']) * 1000
+        sql_ms = profile['sql_time'] * 1000
+        template_ms = profile['template_time'] * 1000
+        endpoint = request.endpoint or 'unknown'
+
+        histogram.observe(endpoint, wall_ms, profile['sql_count'], sql_ms, template_ms)
+        response.headers['Server-Timing'] = ', '.join([
+            f'app;dur={wall_ms:.2f}',
+            f'db;dur={sql_ms:.2f};desc="{profile["sql_count"]} queries"',
+            f'tpl;dur={template_ms:.2f}',
+        ])
+
+        view = app.view_functions.get(request.endpoint)
+        budget = getattr(view, 'query_budget', None)
+        if budget is not None and profile['sql_count'] > budget and app.config.get('QUERY_BUDGET_ENFORCE'):
+            raise QueryBudgetExceeded(
+                f"{endpoint} ran {profile['sql_count']} SQL statements (budget {budget})"
+            )
+        return response
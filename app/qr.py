@@ -0,0 +1,101 @@
+import base64
+import calendar
+import hashlib
+import hmac
+import io
+
+import qrcode
+import qrcode.image.svg
+from flask import current_app
+
+from app.cache import LRUCache
+
+# Rendered QR images keyed by (booking_id, status, format)
+qr_cache = LRUCache(maxsize=1024, ttl=24 * 3600)
+
+TOKEN_VERSION = 'S1'
+
+
+def _b36(number):
+    digits = '0123456789abcdefghijklmnopqrstuvwxyz'
+    out = ''
+    while True:
+        number, rem = divmod(number, 36)
+        out = digits[rem] + out
+        if not number:
+            return out
+
+
+def _signature(payload):
+    secret = current_app.config['BOOKING_TOKEN_SECRET'].encode()
+    digest = hmac.new(secret, payload.encode(), hashlib.sha256).digest()
+    # 96 bits is plenty for a token that is only checked online
+    return base64.urlsafe_b64encode(digest[:12]).decode().rstrip('=')
+
+
+def make_booking_token(booking):
+    """
+    Compact signed token identifying a booking, e.g. 'S1.1z.k.2q3x8.<sig>'.
+
+    Fields are base36 booking id, vendor id and visit time in minutes since
+    the epoch, so the QR payload stays short regardless of names.
+    """
+    # visit_date is stored naive, so encode its wall-clock value as-is
+    visit_minutes = calendar.timegm(booking.visit_date.timetuple()) // 60
+    payload = '.'.join([TOKEN_VERSION, _b36(booking.id), _b36(booking.vendor_id), _b36(visit_minutes)])
+    return f'{payload}.{_signature(payload)}'
+
+
+def verify_booking_token(token):
+    """
+    Check a token's signature and return (booking_id, vendor_id, visit_minutes),
+    or None if it is malformed or forged.
+    """
+    try:
+        version, booking_id, vendor_id, visit_minutes, signature = token.strip().split('.')
+    except (AttributeError, ValueError):
+        return None
+    if version != TOKEN_VERSION:
+        return None
+
+    payload = '.'.join([version, booking_id, vendor_id, visit_minutes])
+    if not hmac.compare_digest(signature, _signature(payload)):
+        return None
+    try:
+        return int(booking_id, 36), int(vendor_id, 36), int(visit_minutes, 36)
+    except ValueError:
+        return None
+
+
+def render_qr(data, fmt='png'):
+    """Render data as a QR code image and return its bytes."""
+    qr = qrcode.QRCode(
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=10,
+        border=4,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+
+    buffered = io.BytesIO()
+    if fmt == 'svg':
+        qr.make_image(image_factory=qrcode.image.svg.SvgPathImage).save(buffered)
+    else:
+        qr.make_image(fill_color="black", back_color="white").save(buffered, format="PNG")
+    return buffered.getvalue()
+
+
+def booking_qr_image(booking, fmt='png'):
+    """
+    Return (image_bytes, etag) for a booking's QR code, rendering it only
+    on the first request for this booking, status and format.
+    """
+    key = (booking.id, booking.status, fmt)
+    found, value = qr_cache.get(key)
+    if found:
+        return value
+
+    image = render_qr(make_booking_token(booking), fmt)
+    value = (image, hashlib.sha1(image).hexdigest())
+    qr_cache.set(key, value)
+    return value
@@ -1,17 +1,19 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, jsonify
 from flask_login import login_user, logout_user, login_required, current_user
 from app import db
 from app.models import User
 from app.decorators import admin_required, vendor_required, user_required
+from app.spatial import vendor_index
+from app.cache import get_cache, get_verified_vendors_by_id, invalidate_verified_vendors
+from app.profiling import query_budget
+import math
 import os
-import qrcode
-import io
-import base64
 
 main = Blueprint('main', __name__)
 
 
 @main.route('/')
+@query_budget(3)
 def index():
     """Home route."""
     if current_user.is_authenticated:
@@ -21,36 +23,93 @@ def index():
             return redirect(url_for('main.admin_dashboard'))
         else:
             return redirect(url_for('main.welcome_home'))
-    
-    from app.models import Vendor
-    vendors = Vendor.query.filter_by(is_verified=True, is_active=True).all()
-    return render_template('landing.html', vendors=vendors)
+
+    return render_template('landing.html')
 
 
 @main.route('/welcome')
 @login_required
+@query_budget(2)
 def welcome_home():
-    """Authenticated user homepage."""
-    from app.models import Vendor
-    vendors = Vendor.query.filter_by(is_verified=True, is_active=True).all()
-    return render_template('welcome.html', vendors=vendors)
+    """Authenticated user homepage. Nearby vendors are fetched client-side."""
+    return render_template('welcome.html')
 
 
 @main.route('/landing')
+@query_budget(3)
 def landing():
     """Explicit landing page for guests."""
-    from app.models import Vendor
-    vendors = Vendor.query.filter_by(is_verified=True, is_active=True).all()
-    return render_template('landing.html', vendors=vendors)
+    return render_template('landing.html')
 
 
 @main.route('/explore')
 @login_required
+@query_budget(2)
 def explore():
-    """Explore page with Google Maps."""
-    from app.models import Vendor
-    vendors = Vendor.query.filter_by(is_verified=True, is_active=True).all()
-    return render_template('explore.html', vendors=vendors)
+    """Explore page with Google Maps. Nearby vendors are fetched client-side."""
+    return render_template('explore.html')
+
+
+@main.route('/api/vendors')
+@query_budget(4)
+def vendors_sync():
+    """
+    Vendor list for the PWA's IndexedDB copy: the full list, or with
+    ?since=<cursor> only what changed since (see app/vendor_sync.py).
+    Answers 304 when the client's If-None-Match matches.
+    """
+    from app.vendor_sync import parse_cursor, sync_body
+
+    try:
+        since = parse_cursor(request.args.get('since'))
+    except ValueError:
+        return jsonify({'error': 'since must be a cursor from a previous response.'}), 400
+
+    body, etag = sync_body(since)
+    response = current_app.response_class(body, mimetype='application/json')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
+
+@main.route('/api/vendors/nearby')
+@query_budget(3)
+def nearby_vendors():
+    """
+    Return verified vendors closest to a point.
+
+    Query params: lat, lng (required), k (max results, default 10, clamped
+    to 1..100) and radius (metres, optional).
+    """
+    try:
+        lat = float(request.args['lat'])
+        lng = float(request.args['lng'])
+        k = max(1, min(int(request.args.get('k', 10)), 100))
+        radius = request.args.get('radius')
+        radius = float(radius) if radius else None
+    except (KeyError, ValueError):
+        return jsonify({'error': 'lat and lng are required numbers.'}), 400
+
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return jsonify({'error': 'lat/lng out of range.'}), 400
+    if radius is not None and (not math.isfinite(radius) or radius <= 0):
+        return jsonify({'error': 'radius must be a positive number of metres.'}), 400
+
+    hits = vendor_index.nearest(lat, lng, k=k, radius=radius)
+
+    # Cached serialized vendors, review_count included from the stored counter
+    vendors = get_verified_vendors_by_id()
+
+    results = []
+    for vendor_id, distance in hits:
+        vendor = vendors.get(vendor_id)
+        if vendor is None:
+            continue
+        data = dict(vendor)
+        data['distance'] = round(distance, 1)
+        results.append(data)
+
+    return jsonify({'vendors': results})
 
 
 @main.route('/ask-ai')
@@ -60,6 +119,33 @@ def ask_ai():
     return render_template('ask_ai.html')
 
 
+@main.route('/api/ai/chat', methods=['POST'])
+@login_required
+def ai_chat():
+    """Stream an Ask AI answer as server-sent events."""
+    import json
+    from flask import Response, stream_with_context
+    from app.ai_gateway import get_ai_gateway
+
+    data = request.get_json(silent=True) or {}
+    prompt = (data.get('prompt') or '').strip()
+    if not prompt:
+        return jsonify({'error': 'Prompt is required'}), 400
+    try:
+        max_tokens = max(1, min(int(data.get('max_tokens') or 1000), 2000))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'max_tokens must be a number'}), 400
+
+    def events():
+        for event in get_ai_gateway().stream(prompt[:4000], max_tokens):
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+    response = Response(stream_with_context(events()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @main.route('/register', methods=['GET', 'POST'])
 def register():
     """User registration route."""
@@ -156,7 +242,9 @@ def login():
 @login_required
 def logout():
     """User logout route."""
+    from app.auth_cache import forget_identity
     logout_user()
+    forget_identity()
     flash('You have been logged out.', 'success')
     return redirect(url_for('main.index'))
 
@@ -175,96 +263,81 @@ def dashboard():
 
 @main.route('/admin/dashboard')
 @admin_required
+@query_budget(6)
 def admin_dashboard():
     """Admin dashboard (admin only)."""
-    from app.models import Vendor
+    from app import stats
     
-    # Get all users for admin overview
-    all_users = User.query.all()
-    user_count = User.query.count()
-    admin_count = User.query.filter_by(role='admin').count()
-    vendor_count = User.query.filter_by(role='vendor').count()
-    regular_user_count = User.query.filter_by(role='user').count()
+    role_counts = stats.user_role_counts()
+    vendor_counts = stats.vendor_status_counts()
     
-    # Get all vendors
-    all_vendors = Vendor.query.all()
-    pending_vendors = Vendor.query.filter_by(is_verified=False).all()
-    verified_vendors = Vendor.query.filter_by(is_verified=True).all()
+    # Only what the dashboard renders: the approval queue and latest vendors
+    per_page = current_app.config['ADMIN_PAGE_SIZE']
+    pending_vendors = stats.vendor_list(status='pending', per_page=per_page)
+    recent_vendors = stats.vendor_list(per_page=5)
     
     return render_template('admin_dashboard.html', 
                          user=current_user,
-                         all_users=all_users,
-                         user_count=user_count,
-                         admin_count=admin_count,
-                         vendor_count=vendor_count,
-                         regular_user_count=regular_user_count,
-                         all_vendors=all_vendors,
+                         user_count=role_counts['total'],
+                         admin_count=role_counts['admin'],
+                         vendor_count=role_counts['vendor'],
+                         regular_user_count=role_counts['user'],
+                         vendor_counts=vendor_counts,
                          pending_vendors=pending_vendors,
-                         verified_vendors=verified_vendors)
+                         recent_vendors=recent_vendors)
 
 
 @main.route('/admin/vendors')
 @admin_required
+@query_budget(5)
 def admin_vendors():
     """Admin vendor management page (admin only)."""
-    from app.models import Vendor
+    from app import stats
     
-    # Get all vendors
-    all_vendors = Vendor.query.all()
-    pending_vendors = Vendor.query.filter_by(is_verified=False).all()
-    verified_vendors = Vendor.query.filter_by(is_verified=True).all()
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = current_app.config['ADMIN_PAGE_SIZE']
+    
+    vendor_counts = stats.vendor_status_counts()
+    pending_vendors = stats.vendor_list(status='pending', page=page, per_page=per_page)
+    verified_vendors = stats.vendor_list(status='verified', page=page, per_page=per_page)
     
     return render_template('admin_vendors.html',
                          user=current_user,
-                         all_vendors=all_vendors,
+                         vendor_counts=vendor_counts,
                          pending_vendors=pending_vendors,
-                         verified_vendors=verified_vendors)
+                         verified_vendors=verified_vendors,
+                         page=page,
+                         pages=stats.page_count(max(vendor_counts['pending'], vendor_counts['verified']), per_page))
 
 
 
 
 @main.route('/admin/users')
 @admin_required
+@query_budget(5)
 def admin_users():
     """Admin user management page (admin only)."""
-    from app.models import Booking, Feedback
+    from app import stats
     
     # Get search query and filter
     search_query = request.args.get('search', '').strip()
     filter_type = request.args.get('filter', 'all')
-    
-    # Base query
-    query = User.query
-    
-    # Apply search filter
-    if search_query:
-        query = query.filter(
-            (User.name.ilike(f'%{search_query}%')) |
-            (User.email.ilike(f'%{search_query}%'))
-        )
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = current_app.config['ADMIN_PAGE_SIZE']
     
     # Apply type filter
     if filter_type == 'flagged':
         # For now, just show all users. You can add flagging logic later
         pass
     
-    # Get all users
-    users = query.all()
-    
-    # Add booking count and average rating to each user
-    for user in users:
-        user.bookings_count = Booking.query.filter_by(user_id=user.id).count()
-        
-        # Get average rating safely - join through bookings since Feedback doesn't have user_id
-        avg_result = db.session.query(db.func.avg(Feedback.overall_rating)).\
-            join(Booking, Feedback.booking_id == Booking.id).\
-            filter(Booking.user_id == user.id).scalar()
-        user.average_rating = round(float(avg_result), 1) if avg_result else 0
+    users, total = stats.user_list(search=search_query, page=page, per_page=per_page)
     
     return render_template('admin_users.html',
                          user=current_user,
-                         all_users=User.query.all(),
                          users=users,
+                         total_users=total,
+                         page=page,
+                         pages=stats.page_count(total, per_page),
                          search_query=search_query,
                          filter_type=filter_type)
 
@@ -298,15 +371,11 @@ def admin_user_detail(user_id):
 @user_required
 def user_dashboard():
     """User dashboard (regular users only) - Shows nearby verified vendors."""
-    from app.models import Vendor
-    # Fetch verified and active vendors to show on the map/list
-    verified_vendors = Vendor.query.filter_by(is_verified=True, is_active=True).all()
-    # Serialize for JS
-    vendors_json = [v.to_dict() for v in verified_vendors]
-    return render_template('user_dashboard.html', user=current_user, vendors=verified_vendors, vendors_json=vendors_json)
+    return render_template('user_dashboard.html', user=current_user)
 
 
 @main.route('/vendor/<int:vendor_id>')
+@query_budget(10)
 def vendor_detail(vendor_id):
     """Detailed view for a specific vendor."""
     from app.models import Vendor
@@ -327,7 +396,12 @@ def manifest():
 
 @main.route('/service-worker.js')
 def service_worker():
-    return current_app.send_static_file('service-worker.js')
+    """Service worker with the current asset manifest baked in; browsers must always revalidate it."""
+    from app.assets import get_manifest, precache_urls
+    body = render_template('service-worker.js', version=get_manifest()['version'], precache_urls=precache_urls())
+    response = current_app.response_class(body, mimetype='application/javascript')
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 
 @main.route('/vendor/onboard', methods=['GET', 'POST'])
@@ -338,7 +412,7 @@ def vendor_onboard():
     from datetime import datetime, time
     
     # Check if vendor already has a profile
-    if current_user.vendor_profile:
+    if current_user.vendor_profile_id:
         flash('You have already completed vendor onboarding.', 'info')
         return redirect(url_for('main.vendor_dashboard'))
     
@@ -413,45 +487,25 @@ def vendor_onboard():
             db.session.add(vendor)
             db.session.flush() # Get vendor ID before committing to add images
 
-            # Handle Image Uploads
-            from werkzeug.utils import secure_filename
+            # Handle Image Uploads (processed together in the image pool)
             from app.models import VendorImage
-            import uuid
-
-            # Ensure upload folder exists
-            upload_folder = current_app.config['UPLOAD_FOLDER']
-            is_vercel = os.environ.get('VERCEL') == '1'
-            
-            if is_vercel:
-                upload_folder = '/tmp/uploads'
-                
-            if not os.path.exists(upload_folder):
-                os.makedirs(upload_folder)
-
-            for file in image_files:
-                if file and file.filename != '' and '.' in file.filename and \
-                   file.filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']:
-                    
-                    filename = secure_filename(file.filename)
-                    unique_filename = f"{uuid.uuid4().hex}_{filename}"
-                    file_path = os.path.join(upload_folder, unique_filename)
-                    # Convert to Base64
-                    file_content = file.read()
-                    import base64
-                    base64_data = base64.b64encode(file_content).decode('utf-8')
-                    # Guess mime type from extension if file.content_type is empty
-                    mime_type = file.content_type if file.content_type else 'image/jpeg'
-                    img_data_uri = f"data:{mime_type};base64,{base64_data}"
-                    
-                    # Reset pointer to save to file system (backup)
-                    file.seek(0)
-                    file.save(file_path)
-                    
-                    img_url = f"uploads/{unique_filename}"
-                    new_image = VendorImage(vendor_id=vendor.id, image_url=img_url, image_data=img_data_uri)
-                    db.session.add(new_image)
+            from app.storage import save_uploads
+
+            stored, rejected = save_uploads([
+                file for file in image_files
+                if file and file.filename != '' and '.' in file.filename and
+                file.filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
+            ])
+            for image in stored:
+                new_image = VendorImage(vendor_id=vendor.id, content_hash=image.content_hash,
+                                        mime_type=image.mime_type, size_bytes=image.size_bytes,
+                                        variants=image.variants)
+                db.session.add(new_image)
 
             db.session.commit()
+            if rejected:
+                flash(f'Skipped {len(rejected)} file(s) that are not valid images: '
+                      f'{", ".join(name for name, _ in rejected)}', 'warning')
             flash('Vendor profile created with images! Your profile is pending verification.', 'success')
             return redirect(url_for('main.vendor_dashboard'))
 
@@ -475,6 +529,8 @@ def approve_vendor(vendor_id):
     vendor.is_active = True
     
     db.session.commit()
+    vendor_index.sync(vendor)
+    invalidate_verified_vendors()
     
     flash(f'Vendor "{vendor.business_name}" has been approved and activated.', 'success')
     return redirect(url_for('main.admin_dashboard'))
@@ -491,6 +547,8 @@ def reject_vendor(vendor_id):
     
     db.session.delete(vendor)
     db.session.commit()
+    vendor_index.discard(vendor_id)
+    invalidate_verified_vendors()
     
     flash(f'Vendor "{business_name}" has been rejected and removed.', 'warning')
     return redirect(url_for('main.admin_dashboard'))
@@ -515,6 +573,8 @@ def delete_vendor(vendor_id):
             db.session.delete(associated_user)
             
         db.session.commit()
+        vendor_index.discard(vendor_id)
+        invalidate_verified_vendors()
         flash(f'Vendor "{business_name}" and their account have been permanently deleted.', 'success')
     except Exception as e:
         db.session.rollback()
@@ -533,6 +593,8 @@ def disable_vendor(vendor_id):
     vendor.is_active = False
     
     db.session.commit()
+    vendor_index.sync(vendor)
+    invalidate_verified_vendors()
     
     flash(f'Vendor "{vendor.business_name}" has been disabled.', 'info')
     return redirect(url_for('main.admin_dashboard'))
@@ -542,11 +604,10 @@ def disable_vendor(vendor_id):
 @vendor_required
 def upload_images():
     """Handle multi-image uploads for vendors."""
-    from werkzeug.utils import secure_filename
     from app.models import VendorImage
-    import uuid
+    from app.storage import save_uploads
     
-    if not current_user.vendor_profile:
+    if not current_user.vendor_profile_id:
         flash('Please complete your onboarding first.', 'error')
         return redirect(url_for('main.vendor_onboard'))
 
@@ -559,46 +620,24 @@ def upload_images():
         flash('No images selected.', 'error')
         return redirect(url_for('main.vendor_dashboard'))
 
-    # Ensure upload folder exists
-    upload_folder = current_app.config['UPLOAD_FOLDER']
-    is_vercel = os.environ.get('VERCEL') == '1'
-    if is_vercel:
-        upload_folder = '/tmp/uploads'
-        
-    if not os.path.exists(upload_folder):
-        os.makedirs(upload_folder)
-
-    uploaded_count = 0
-    for file in files:
-        if file and '.' in file.filename and \
-           file.filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']:
-            
-            # Create unique filename to avoid collisions
-            filename = secure_filename(file.filename)
-            unique_filename = f"{uuid.uuid4().hex}_{filename}"
-            
-            # Save file
-            file_path = os.path.join(upload_folder, unique_filename)
-            
-            # Convert to Base64
-            file_content = file.read()
-            import base64
-            base64_data = base64.b64encode(file_content).decode('utf-8')
-            mime_type = file.content_type if file.content_type else 'image/jpeg'
-            img_data_uri = f"data:{mime_type};base64,{base64_data}"
-            
-            # Reset pointer to save file
-            file.seek(0)
-            file.save(file_path)
-            
-            # Save to database (store the relative URL for easy serving)
-            img_url = f"uploads/{unique_filename}"
-            new_image = VendorImage(vendor_id=current_user.vendor_profile.id, image_url=img_url, image_data=img_data_uri)
-            db.session.add(new_image)
-            uploaded_count += 1
-            
+    stored, rejected = save_uploads([
+        file for file in files
+        if file and '.' in file.filename and
+        file.filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
+    ])
+    for image in stored:
+        new_image = VendorImage(vendor_id=current_user.vendor_profile_id, content_hash=image.content_hash,
+                                mime_type=image.mime_type, size_bytes=image.size_bytes,
+                                variants=image.variants)
+        db.session.add(new_image)
+    uploaded_count = len(stored)
+
+    if rejected:
+        flash(f'Skipped {len(rejected)} file(s) that are not valid images: '
+              f'{", ".join(name for name, _ in rejected)}', 'warning')
     if uploaded_count > 0:
         db.session.commit()
+        invalidate_verified_vendors()
         flash(f'Successfully uploaded {uploaded_count} images.', 'success')
     else:
         flash('No valid images uploaded.', 'error')
@@ -606,11 +645,45 @@ def upload_images():
     return redirect(url_for('main.vendor_dashboard'))
 
 
+@main.route('/vendor/capacity', methods=['POST'])
+@vendor_required
+def update_capacity():
+    """Set the vendor's booking slot length and per-slot capacity."""
+    from app.models import BookingSlot
+    vendor = current_user.vendor_profile
+    if not vendor:
+        flash('Please complete onboarding first.', 'error')
+        return redirect(url_for('main.vendor_onboard'))
+
+    try:
+        slot_minutes = int(request.form.get('slot_minutes', 30))
+        capacity = request.form.get('slot_capacity', '').strip()
+        slot_capacity = int(capacity) if capacity else None
+    except ValueError:
+        flash('Slot length and capacity must be whole numbers.', 'error')
+        return redirect(url_for('main.vendor_dashboard'))
+
+    if slot_minutes not in (15, 30, 60) or (slot_capacity is not None and slot_capacity < 1):
+        flash('Choose a 15, 30 or 60 minute slot and a capacity of at least 1.', 'error')
+        return redirect(url_for('main.vendor_dashboard'))
+
+    # Counters are keyed to slot boundaries and only kept while a capacity is set
+    recount = slot_capacity is not None and \
+        (slot_minutes != (vendor.slot_minutes or 30) or vendor.slot_capacity is None)
+    vendor.slot_minutes = slot_minutes
+    vendor.slot_capacity = slot_capacity
+    if recount:
+        BookingSlot.rebuild(vendor)
+    db.session.commit()
+    flash('Booking capacity updated.', 'success')
+    return redirect(url_for('main.vendor_dashboard'))
+
+
 @main.route('/book/<int:vendor_id>', methods=['POST'])
 @user_required
 def book_vendor(vendor_id):
     """Handle vendor booking for users."""
-    from app.models import Vendor, Booking
+    from app.models import Vendor, Booking, BookingSlot, SlotFull
     from datetime import datetime
     
     vendor = Vendor.query.get_or_404(vendor_id)
@@ -629,6 +702,14 @@ def book_vendor(vendor_id):
         flash('Invalid date format.', 'error')
         return redirect(url_for('main.user_dashboard'))
 
+    # Claim a place in the time slot before inserting; both commit together
+    try:
+        BookingSlot.reserve(vendor, visit_date)
+    except SlotFull:
+        db.session.rollback()
+        flash('That time slot is fully booked. Please choose another time.', 'error')
+        return redirect(url_for('main.vendor_detail', vendor_id=vendor.id))
+
     new_booking = Booking(
         user_id=current_user.id,
         vendor_id=vendor.id,
@@ -660,47 +741,87 @@ def booking_confirmation(booking_id):
     return render_template('booking_confirmation.html', booking=booking)
 
 
+def can_view_booking(booking):
+    """Owner, admin, or the vendor the booking is for."""
+    if current_user.role == 'admin' or booking.user_id == current_user.id:
+        return True
+    return current_user.role == 'vendor' and current_user.vendor_profile_id is not None and \
+        booking.vendor_id == current_user.vendor_profile_id
+
+
 @main.route('/booking/<int:booking_id>/qr')
 @login_required
+@query_budget(3)
 def booking_qr(booking_id):
-    """Generate and show QR code for a booking."""
+    """Show the QR code page for a booking."""
     from app.models import Booking
     booking = Booking.query.get_or_404(booking_id)
     
     # Ensure user can only see their own booking (unless admin or the vendor of the booking)
-    is_admin = current_user.role == 'admin'
-    is_owner = booking.user_id == current_user.id
-    is_vendor = current_user.role == 'vendor' and current_user.vendor_profile and booking.vendor_id == current_user.vendor_profile.id
-    
-    if not (is_admin or is_owner or is_vendor):
+    if not can_view_booking(booking):
         flash('Unauthorized access.', 'error')
         return redirect(url_for('main.index'))
     
-    # Generate QR data
-    qr_data = f"Booking ID: {booking.id}\nUser: {booking.user.name}\nVendor: {booking.vendor.business_name}\nDate: {booking.visit_date.strftime('%Y-%m-%d %H:%M')}\nStatus: {booking.status}"
+    return render_template('booking_qr.html', booking=booking)
+
+
+@main.route('/booking/<int:booking_id>/qr.<fmt>')
+@login_required
+@query_budget(3)
+def booking_qr_image(booking_id, fmt):
+    """QR code image (png or svg) carrying a signed booking token."""
+    from flask import Response, abort
+    from app.models import Booking
+    from app.qr import booking_qr_image as render_booking_qr
     
-    # Create QR code
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=4,
-    )
-    qr.add_data(qr_data)
-    qr.make(fit=True)
+    if fmt not in ('png', 'svg'):
+        abort(404)
+    
+    booking = Booking.query.get_or_404(booking_id)
+    if not can_view_booking(booking):
+        abort(403)
+    
+    image, etag = render_booking_qr(booking, fmt)
+    mimetype = 'image/svg+xml' if fmt == 'svg' else 'image/png'
+    response = Response(image, mimetype=mimetype)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, max-age=3600'
+    return response.make_conditional(request)
 
-    img = qr.make_image(fill_color="black", back_color="white")
+
+@main.route('/vendor/verify-booking', methods=['POST'])
+@vendor_required
+def verify_booking():
+    """Check a scanned booking token (vendor only)."""
+    from app.models import Booking
+    from app.qr import verify_booking_token
+    from datetime import datetime, timedelta
+    
+    token = request.form.get('token') or (request.get_json(silent=True) or {}).get('token', '')
+    claims = verify_booking_token(token)
+    if claims is None:
+        return jsonify({'valid': False, 'error': 'Invalid or tampered token.'}), 400
     
-    # Save to bytes buffer
-    buffered = io.BytesIO()
-    img.save(buffered, format="PNG")
-    qr_base64 = base64.b64encode(buffered.getvalue()).decode('utf-8')
+    booking_id, vendor_id, visit_minutes = claims
+    if current_user.vendor_profile_id is None or vendor_id != current_user.vendor_profile_id:
+        return jsonify({'valid': False, 'error': 'Booking is for a different vendor.'}), 403
     
-    return render_template('booking_qr.html', booking=booking, qr_code=qr_base64)
+    # Signature already proves booking and vendor; only the live status is read
+    status = db.session.query(Booking.status).filter(Booking.id == booking_id).scalar()
+    if status is None:
+        return jsonify({'valid': False, 'error': 'Booking not found.'}), 404
+    
+    return jsonify({
+        'valid': True,
+        'booking_id': booking_id,
+        'visit_date': (datetime(1970, 1, 1) + timedelta(minutes=visit_minutes)).isoformat(),
+        'status': status
+    })
 
 
 @main.route('/booking/<int:booking_id>/feedback', methods=['GET', 'POST'])
 @user_required
+@query_budget(8)
 def submit_feedback(booking_id):
     """Submit feedback for a completed booking."""
     from app.models import Booking, Feedback, Vendor
@@ -743,13 +864,11 @@ def submit_feedback(booking_id):
             
             db.session.add(new_feedback)
             
-            # Recalculate Vendor Average Rating
-            vendor = booking.vendor
-            all_feedbacks = Feedback.query.filter_by(vendor_id=vendor.id).all()
-            total_rating = sum([f.overall_rating for f in all_feedbacks]) + overall
-            vendor.average_rating = total_rating / (len(all_feedbacks) + 1)
+            # Update the vendor's running rating aggregates in SQL
+            Vendor.record_rating(booking.vendor_id, hygiene, safety, staff, overall)
             
             db.session.commit()
+            invalidate_verified_vendors()
             flash('Thank you for your feedback! It helps keep SheSafe reliable.', 'success')
             return redirect(url_for('main.user_dashboard'))
             
@@ -762,15 +881,24 @@ def submit_feedback(booking_id):
 @vendor_required
 def complete_booking(booking_id):
     """Mark a booking as completed (Vendor only)."""
-    from app.models import Booking
+    from app.models import Booking, RevenueDaily
     booking = Booking.query.get_or_404(booking_id)
     
     # Ensure vendor owns this booking
-    if booking.vendor_id != current_user.vendor_profile.id:
+    if booking.vendor_id != current_user.vendor_profile_id:
         flash('Unauthorized access.', 'error')
         return redirect(url_for('main.vendor_dashboard'))
     
-    booking.status = 'completed'
+    # Conditional UPDATE: of two concurrent completions only one changes the
+    # row, so the revenue is recorded once
+    completed = db.session.execute(
+        db.update(Booking)
+        .where(Booking.id == booking.id, Booking.status != 'completed')
+        .values(status='completed')
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if completed == 1:
+        RevenueDaily.record(booking)
     db.session.commit()
     
     flash('Booking marked as completed. The user can now leave a review!', 'success')
@@ -779,36 +907,10 @@ def complete_booking(booking_id):
 @main.route('/update-db-schema')
 def update_db_schema():
     """Temporary route to update database schema."""
-    from sqlalchemy import text
-    results = []
-    
-    # Use independent transactions for each step
-    def run_step(conn, sql, description):
-        try:
-            conn.execute(text(sql))
-            conn.commit()
-            results.append(f"Successfully {description}")
-        except Exception as e:
-            conn.rollback()
-            results.append(f"Failed {description}: {str(e)}")
+    from app.schema import upgrade_schema
 
     try:
-        with db.engine.connect() as conn:
-            # 1. Update category column type
-            run_step(conn, "ALTER TABLE vendors ALTER COLUMN category TYPE VARCHAR(255)", "updated vendors.category")
-            
-            # 2. Add image_data to vendor_images
-            # We check if it exists first
-            try:
-                conn.execute(text("SELECT image_data FROM vendor_images LIMIT 1"))
-                results.append("Column image_data already exists")
-            except Exception:
-                conn.rollback() # Transaction aborted by failed select, must rollback
-                run_step(conn, "ALTER TABLE vendor_images ADD COLUMN image_data TEXT", "added image_data column")
-
-            # 3. Make image_url nullable
-            run_step(conn, "ALTER TABLE vendor_images ALTER COLUMN image_url DROP NOT NULL", "made image_url nullable")
-            
+        results = upgrade_schema()
         return "<br>".join(results) + "<br><br><b>Schema update attempt complete! Please try the dashboards now.</b>"
     except Exception as e:
         return f"CRITICAL Error connecting to DB: {str(e)}"
@@ -838,28 +940,107 @@ def create_admin():
     return f"Admin created! Email: {admin_email}, Password: {admin_password}"
 
 
+def _parse_date(value):
+    """Parse a YYYY-MM-DD query argument, or None if missing/invalid."""
+    from datetime import date
+    try:
+        return date.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
 @main.route('/admin/revenue')
 @admin_required
+@query_budget(8)
 def admin_revenue():
     """Admin revenue page (admin only)."""
-    from app.models import Booking
-    
-    # Get all completed bookings
-    completed_bookings = Booking.query.filter_by(status='completed').order_by(Booking.booking_time.desc()).all()
-    
-    # Calculate total revenue
-    total_revenue = sum([b.amount for b in completed_bookings])
-    
-    # Group revenue by payment mode
-    revenue_by_mode = {}
-    for b in completed_bookings:
-        revenue_by_mode[b.payment_mode] = revenue_by_mode.get(b.payment_mode, 0) + b.amount
-        
+    from app import stats
+    from app.models import Vendor
+
+    start = _parse_date(request.args.get('start'))
+    end = _parse_date(request.args.get('end'))
+    vendor_id = request.args.get('vendor', type=int)
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = current_app.config['ADMIN_PAGE_SIZE']
+
+    # Totals and breakdowns come from the revenue_daily rollup, so their cost
+    # doesn't grow with the number of bookings
+    summary = stats.revenue_summary(start, end, vendor_id)
+    bookings, total = stats.revenue_bookings(start, end, vendor_id, page=page, per_page=per_page)
+
     return render_template('admin_revenue.html',
                          user=current_user,
-                         bookings=completed_bookings,
-                         total_revenue=total_revenue,
-                         revenue_by_mode=revenue_by_mode)
+                         bookings=bookings,
+                         total_revenue=summary['amount'],
+                         total_bookings=summary['bookings'],
+                         revenue_by_mode={mode: m['amount'] for mode, m in summary['by_mode'].items()},
+                         top_vendors=[] if vendor_id else stats.revenue_by_vendor(start, end),
+                         daily=stats.revenue_by_day(start, end, vendor_id),
+                         vendor=db.session.get(Vendor, vendor_id) if vendor_id else None,
+                         start=start,
+                         end=end,
+                         page=page,
+                         pages=stats.page_count(total, per_page))
+
+
+@main.route('/admin/export/<kind>.<fmt>')
+@admin_required
+def admin_export(kind, fmt):
+    """Stream bookings, feedback, vendors or revenue as CSV/JSONL (admin only)."""
+    from flask import Response, stream_with_context
+    from app.exports import EXPORTS, FORMATS, stream_export, export_filename
+
+    if kind not in EXPORTS or fmt not in FORMATS:
+        return jsonify({'error': 'Unknown export'}), 404
+
+    start = _parse_date(request.args.get('start'))
+    end = _parse_date(request.args.get('end'))
+    vendor_id = request.args.get('vendor', type=int)
+
+    # stream_with_context keeps the DB session open while the body is generated
+    response = Response(
+        stream_with_context(stream_export(kind, fmt, start, end, vendor_id)),
+        mimetype=FORMATS[fmt],
+    )
+    response.headers['Content-Disposition'] = \
+        f'attachment; filename="{export_filename(kind, fmt, start, end, vendor_id)}"'
+    return response
+
+
+@main.route('/admin/cache-stats')
+@admin_required
+def admin_cache_stats():
+    """Cache hit/miss counters for this worker (admin only)."""
+    from app.qr import qr_cache
+    from app.auth_cache import loader_stats
+    from app.image_resize import get_image_resizer
+    return jsonify({'app': get_cache().stats(), 'qr': qr_cache.stats(), 'user_loader': loader_stats.snapshot(),
+                    'image_resize': get_image_resizer().stats()})
+
+
+@main.route('/admin/ai-status')
+@admin_required
+def admin_ai_status():
+    """Ask AI provider breaker states, latencies and response cache stats (admin only)."""
+    from app.ai_gateway import get_ai_gateway
+    return jsonify(get_ai_gateway().status())
+
+
+@main.route('/admin/db-pool-stats')
+@admin_required
+def admin_db_pool_stats():
+    """Connection pool occupancy and checkout/connect latency for this worker (admin only)."""
+    from app.db_metrics import pool_status
+    return jsonify(pool_status(db.engine))
+
+
+@main.route('/admin/profiling')
+@admin_required
+def admin_profiling():
+    """Per-endpoint latency histogram, SQL and template time for this worker (admin only)."""
+    from app.profiling import histogram
+    return jsonify({'enabled': bool(current_app.config.get('PROFILING_ENABLED')),
+                    'endpoints': histogram.snapshot()})
 
 
 @main.route('/admin/settings')
@@ -870,6 +1051,92 @@ def admin_settings():
 
 
 
+@main.route('/images/<content_hash>')
+def serve_image(content_hash):
+    """Serve a content-addressed image. The URL never changes content, so cache forever."""
+    from flask import send_file, Response, abort
+    from app.models import VendorImage
+    from app.storage import get_image_store, sniff_mime_type
+
+    if request.if_none_match and content_hash in request.if_none_match:
+        response = Response(status=304)
+    else:
+        store = get_image_store()
+        path = store.local_path(content_hash)
+        mime_type = db.session.query(VendorImage.mime_type).\
+            filter_by(content_hash=content_hash).limit(1).scalar()
+        # Older rows may hold a client-supplied type; only ever serve an image type
+        if not (mime_type or '').startswith('image/'):
+            mime_type = None
+        if path:
+            if mime_type is None:
+                with open(path, 'rb') as f:
+                    mime_type = sniff_mime_type(f.read(16))
+            response = send_file(path, mimetype=mime_type, conditional=False, etag=False)
+        else:
+            data = store.get(content_hash)
+            if data is None:
+                abort(404)
+            response = Response(data, mimetype=mime_type or sniff_mime_type(data))
+
+    response.set_etag(content_hash)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    return response
+
+
+@main.route('/img/<content_hash>')
+def serve_resized_image(content_hash):
+    """Serve a stored image cropped to fill one of the IMAGE_RESIZE_SIZES boxes (?w=&h=) as ?fmt=."""
+    from flask import send_file, Response, abort
+    from app.image_processing import InvalidImage
+    from app.image_resize import get_image_resizer, parse_resize_spec, variant_key
+
+    resizer = get_image_resizer()
+    try:
+        spec = parse_resize_spec(request.args, resizer.sizes)
+    except ValueError as e:
+        abort(400, description=str(e))
+
+    etag = variant_key(content_hash, spec, resizer.quality)
+    if request.if_none_match and etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        try:
+            f, etag = resizer.open(content_hash, spec)
+        except (LookupError, InvalidImage):
+            abort(404)
+        response = send_file(f, mimetype=resizer.mime_type(spec), conditional=False, etag=False)
+
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+
+@main.route('/vendor-images/<int:image_id>')
+def serve_legacy_image(image_id):
+    """Serve a VendorImage that still stores base64 data (not yet migrated)."""
+    from flask import Response, abort
+    from app.models import VendorImage
+    from app.storage import decode_data_uri, sniff_mime_type
+
+    image = VendorImage.query.get_or_404(image_id)
+    if image.content_hash:
+        return redirect(url_for('main.serve_image', content_hash=image.content_hash), code=301)
+    if not image.image_data:
+        abort(404)
+
+    # The data URI's type came from the uploading client: trust only the bytes
+    _, data = decode_data_uri(image.image_data)
+    mime_type = sniff_mime_type(data, default=None)
+    if mime_type is None or not mime_type.startswith('image/'):
+        abort(404)
+    response = Response(data, mimetype=mime_type)
+    response.headers['Cache-Control'] = 'public, max-age=86400'
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    return response
+
+
 @main.route('/uploads/<path:filename>')
 def serve_uploads(filename):
     """Serve uploaded files from /tmp on Vercel or normal static folder."""
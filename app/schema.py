@@ -0,0 +1,91 @@
+"""
+In-place schema upgrade for databases created by earlier versions.
+
+db.create_all() only creates missing tables, so columns and indexes added
+to existing tables are applied here. Every step is idempotent and runs in
+its own transaction, so one failing step (e.g. a PostgreSQL-only ALTER on
+SQLite) doesn't stop the rest. /update-db-schema and the maintenance
+scripts (migrate_images.py, recompute_ratings.py, ...) all call
+upgrade_schema(), so there is one list of steps to keep current.
+"""
+from sqlalchemy import inspect, text
+
+from app import db
+
+
+def upgrade_schema():
+    """Apply every upgrade step; returns a list of human-readable results."""
+    results = []
+
+    def run_step(conn, sql, description):
+        try:
+            conn.execute(text(sql))
+            conn.commit()
+            results.append(f"Successfully {description}")
+        except Exception as e:
+            conn.rollback()
+            results.append(f"Failed {description}: {str(e)}")
+
+    def add_column(conn, table, column, sql_type):
+        inspector = inspect(conn)
+        # Tables that don't exist yet are created whole by db.create_all()
+        if not inspector.has_table(table):
+            return
+        if column in {c['name'] for c in inspector.get_columns(table)}:
+            results.append(f"Column {table}.{column} already exists")
+            return
+        run_step(conn, f"ALTER TABLE {table} ADD COLUMN {column} {sql_type}", f"added {table}.{column} column")
+
+    with db.engine.connect() as conn:
+        # 1. Update category column type
+        run_step(conn, "ALTER TABLE vendors ALTER COLUMN category TYPE VARCHAR(255)", "updated vendors.category")
+
+        # 2. Add image_data to vendor_images
+        add_column(conn, "vendor_images", "image_data", "TEXT")
+
+        # 3. Make image_url nullable
+        run_step(conn, "ALTER TABLE vendor_images ALTER COLUMN image_url DROP NOT NULL", "made image_url nullable")
+
+        # 4. Image store references
+        add_column(conn, "vendor_images", "content_hash", "VARCHAR(64)")
+        add_column(conn, "vendor_images", "mime_type", "VARCHAR(50)")
+        add_column(conn, "vendor_images", "size_bytes", "INTEGER")
+        run_step(conn, "CREATE INDEX IF NOT EXISTS ix_vendor_images_content_hash ON vendor_images (content_hash)", "indexed content_hash")
+
+        # 5. Running rating aggregates (run recompute_ratings.py afterwards)
+        add_column(conn, "vendors", "rating_count", "INTEGER NOT NULL DEFAULT 0")
+        for column, sql_type in [("overall_rating_sum", "FLOAT"), ("hygiene_rating_sum", "INTEGER"),
+                                 ("safety_rating_sum", "INTEGER"), ("staff_behavior_rating_sum", "INTEGER")]:
+            add_column(conn, "vendors", column, f"{sql_type} NOT NULL DEFAULT 0")
+
+        # 6. Booking capacity
+        add_column(conn, "vendors", "slot_minutes", "INTEGER NOT NULL DEFAULT 30")
+        add_column(conn, "vendors", "slot_capacity", "INTEGER")
+        # 7. Revenue drill-down index (run rebuild_revenue.py afterwards)
+        run_step(conn, "CREATE INDEX IF NOT EXISTS ix_bookings_status_visit_date ON bookings (status, visit_date)", "indexed bookings status/visit_date")
+
+        db.create_all()
+        results.append("Created missing tables (booking_slots, revenue_daily, vendor_tombstones)")
+
+        # 8. User search index (pg_trgm GIN indexes / SQLite FTS5)
+        from app.search import ensure_search_index
+        if ensure_search_index():
+            results.append("User search index ready")
+        else:
+            results.append("User search index unavailable, admin search will use ILIKE")
+
+        # 9. Vendor delta sync cursor (backfilled from created_at)
+        add_column(conn, "vendors", "updated_at", "TIMESTAMP")
+        run_step(conn, "UPDATE vendors SET updated_at = created_at WHERE updated_at IS NULL", "backfilled vendors.updated_at")
+        run_step(conn, "CREATE INDEX IF NOT EXISTS ix_vendors_updated_at ON vendors (updated_at)", "indexed vendors.updated_at")
+
+        # 10. Session identity cache version stamp
+        add_column(conn, "users", "auth_version", "INTEGER NOT NULL DEFAULT 0")
+
+        # 11. Image thumbnail widths (run generate_thumbnails.py afterwards)
+        add_column(conn, "vendor_images", "variants", "JSON")
+
+        # 12. Per-user booking lookups (admin user list aggregates)
+        run_step(conn, "CREATE INDEX IF NOT EXISTS ix_bookings_user_id ON bookings (user_id)", "indexed bookings.user_id")
+
+    return results
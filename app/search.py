@@ -0,0 +1,157 @@
+"""
+Indexed user search for the admin pages.
+
+PostgreSQL uses pg_trgm GIN indexes on users.name and users.email; SQLite
+uses an FTS5 trigram shadow table (users_fts) kept in sync by triggers, so
+rows written by any code path, including bulk inserts, are searchable.
+Both rank prefix matches first, then substring matches, then fuzzy
+(trigram) matches. Databases without either feature fall back to ILIKE.
+"""
+from flask import current_app
+from sqlalchemy import event, literal_column, table
+
+from app import db
+from app.models import User
+
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5("
+    "name, email, content='users', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_ai AFTER INSERT ON users BEGIN "
+    "INSERT INTO users_fts(rowid, name, email) VALUES (new.id, new.name, new.email); END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_ad AFTER DELETE ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, name, email) VALUES ('delete', old.id, old.name, old.email); END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_au AFTER UPDATE OF name, email ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, name, email) VALUES ('delete', old.id, old.name, old.email); "
+    "INSERT INTO users_fts(rowid, name, email) VALUES (new.id, new.name, new.email); END",
+]
+
+POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_users_name_trgm ON users USING gin (name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_users_email_trgm ON users USING gin (email gin_trgm_ops)",
+]
+
+users_fts = table('users_fts')
+
+# Whether the search index exists, per database URL; checked once per process
+_available = {}
+
+
+def _index_exists(conn):
+    dialect = conn.dialect.name
+    if dialect == 'sqlite':
+        sql = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users_fts'"
+    elif dialect == 'postgresql':
+        sql = "SELECT 1 FROM pg_indexes WHERE indexname = 'ix_users_name_trgm'"
+    else:
+        return False
+    return conn.execute(db.text(sql)).first() is not None
+
+
+def _create_index(conn):
+    """Run the dialect's DDL in a savepoint; returns False if it isn't supported here."""
+    statements = {'sqlite': SQLITE_DDL, 'postgresql': POSTGRES_DDL}.get(conn.dialect.name)
+    if not statements:
+        return False
+    try:
+        with conn.begin_nested():
+            for sql in statements:
+                conn.execute(db.text(sql))
+    except Exception as e:
+        # FTS5 not compiled in, or no permission to create pg_trgm
+        current_app.logger.warning(f"User search index unavailable, falling back to ILIKE: {e}")
+        return False
+    return True
+
+
+@event.listens_for(User.__table__, 'after_create')
+def _after_users_created(target, conn, **kw):
+    _available[str(conn.engine.url)] = _create_index(conn)
+
+
+@event.listens_for(User.__table__, 'before_drop')
+def _before_users_dropped(target, conn, **kw):
+    if conn.dialect.name == 'sqlite':
+        # Triggers go with the users table but the FTS table would be left stale
+        conn.execute(db.text("DROP TABLE IF EXISTS users_fts"))
+    _available.pop(str(conn.engine.url), None)
+
+
+def ensure_search_index(rebuild=False):
+    """
+    Create the search index on an existing database if it is missing and
+    populate it from users. Pass rebuild=True to repopulate regardless.
+    Returns whether indexed search is available.
+    """
+    with db.engine.begin() as conn:
+        existed = _index_exists(conn)
+        available = existed or _create_index(conn)
+        if available and conn.dialect.name == 'sqlite' and (rebuild or not existed):
+            conn.execute(db.text("INSERT INTO users_fts(users_fts) VALUES ('rebuild')"))
+    _available[str(db.engine.url)] = available
+    return available
+
+
+def index_available():
+    key = str(db.engine.url)
+    if key not in _available:
+        with db.engine.connect() as conn:
+            _available[key] = _index_exists(conn)
+    return _available[key]
+
+
+def _like_escape(term):
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _fts_query(term, fuzzy):
+    """FTS5 trigram query: the term as a substring, or with fuzzy any of its trigrams."""
+    def quote(s):
+        return '"' + s.replace('"', '""') + '"'
+    if not fuzzy:
+        return quote(term)
+    trigrams = {term[i:i + 3] for i in range(len(term) - 2)}
+    return ' OR '.join([quote(term)] + [quote(t) for t in sorted(trigrams) if t != term])
+
+
+def user_matches(term, fuzzy=False):
+    """
+    Select of (user_id, tier, score) for users matching `term`, to be joined
+    to users and ordered by tier, then score. Tier 0 is a name or email
+    prefix match, 1 a substring match and 2 a fuzzy match; lower score is
+    better within a tier.
+
+    Without `fuzzy` only substring matches are returned. Fuzzy (trigram)
+    matching is meant as a fallback when that finds nothing, since short
+    trigrams like 'use' match a large share of any table.
+    """
+    term = term.strip().lower()
+    escaped = _like_escape(term)
+    prefix, contains = f'{escaped}%', f'%{escaped}%'
+    name, email = db.func.lower(User.name), db.func.lower(User.email)
+
+    tier = db.case(
+        (name.like(prefix, escape='\\') | email.like(prefix, escape='\\'), 0),
+        (name.like(contains, escape='\\') | email.like(contains, escape='\\'), 1),
+        else_=2,
+    )
+
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite' and len(term) >= 3 and index_available():
+        fts = literal_column('users_fts')
+        return db.select(User.id.label('user_id'), tier.label('tier'), db.func.bm25(fts).label('score')).\
+            select_from(users_fts).join(User, User.id == literal_column('users_fts.rowid')).\
+            where(fts.op('MATCH')(_fts_query(term, fuzzy)))
+
+    if dialect == 'postgresql' and index_available():
+        similarity = db.func.greatest(db.func.similarity(User.name, term), db.func.similarity(User.email, term))
+        condition = User.name.ilike(contains, escape='\\') | User.email.ilike(contains, escape='\\')
+        if fuzzy:
+            # pg_trgm's % uses the GIN index with pg_trgm.similarity_threshold (0.3)
+            condition = condition | User.name.bool_op('%')(term) | User.email.bool_op('%')(term)
+        return db.select(User.id.label('user_id'), tier.label('tier'), (-similarity).label('score')).where(condition)
+
+    # Short SQLite terms (below trigram length) and unindexed databases
+    return db.select(User.id.label('user_id'), tier.label('tier'), literal_column('0').label('score')).where(
+        name.like(contains, escape='\\') | email.like(contains, escape='\\')
+    )
@@ -0,0 +1,154 @@
+import math
+import threading
+import time
+
+EARTH_RADIUS_M = 6371e3
+
+# Grid cell size in degrees (~5.5km of latitude). Small enough that a
+# nearest-neighbour lookup only touches a handful of cells, large enough
+# that a city's worth of vendors fits in a few buckets.
+CELL_DEG = 0.05
+
+
+def haversine(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two points in metres."""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = math.radians(lat2 - lat1)
+    d_lambda = math.radians(lng2 - lng1)
+
+    a = math.sin(d_phi / 2) ** 2 + \
+        math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+class VendorIndex:
+    """
+    In-process spatial index over verified, active vendor coordinates.
+
+    Points are bucketed into a fixed lat/lng grid. Lookups only scan the
+    buckets around the query point, so cost depends on local density
+    rather than on the total number of vendors.
+    """
+
+    def __init__(self, cell_deg=CELL_DEG, max_age=300):
+        self.cell_deg = cell_deg
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._points = {}
+        self._loaded_at = None
+
+    def _cell(self, lat, lng):
+        return (int(math.floor(lat / self.cell_deg)), int(math.floor(lng / self.cell_deg)))
+
+    def _add(self, vendor_id, lat, lng):
+        self._remove(vendor_id)
+        cell = self._cell(lat, lng)
+        self._points[vendor_id] = (lat, lng, cell)
+        self._buckets.setdefault(cell, set()).add(vendor_id)
+
+    def _remove(self, vendor_id):
+        point = self._points.pop(vendor_id, None)
+        if point is None:
+            return
+        bucket = self._buckets.get(point[2])
+        if bucket is not None:
+            bucket.discard(vendor_id)
+            if not bucket:
+                del self._buckets[point[2]]
+
+    def load(self, rows):
+        """Replace the index contents with (id, latitude, longitude) rows."""
+        with self._lock:
+            self._buckets = {}
+            self._points = {}
+            for vendor_id, lat, lng in rows:
+                if lat is not None and lng is not None:
+                    self._add(vendor_id, lat, lng)
+            self._loaded_at = time.monotonic()
+
+    def ensure_loaded(self):
+        """Build (or periodically rebuild) the index from the database."""
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.max_age:
+            return
+        from app import db
+        from app.models import Vendor
+        rows = db.session.query(Vendor.id, Vendor.latitude, Vendor.longitude).\
+            filter_by(is_verified=True, is_active=True).all()
+        self.load(rows)
+
+    def sync(self, vendor):
+        """Add, move or drop a vendor depending on its current status."""
+        if self._loaded_at is None:
+            return
+        with self._lock:
+            if vendor.is_verified and vendor.is_active:
+                self._add(vendor.id, vendor.latitude, vendor.longitude)
+            else:
+                self._remove(vendor.id)
+
+    def discard(self, vendor_id):
+        """Drop a deleted vendor from the index."""
+        with self._lock:
+            self._remove(vendor_id)
+
+    def __len__(self):
+        return len(self._points)
+
+    def nearest(self, lat, lng, k=10, radius=None):
+        """
+        Return up to k (vendor_id, distance_m) pairs ordered by distance,
+        optionally limited to vendors within `radius` metres.
+        """
+        if radius is not None and not (math.isfinite(radius) and radius > 0):
+            raise ValueError(f'radius must be a positive finite number, got {radius!r}')
+        self.ensure_loaded()
+        with self._lock:
+            if not self._points or k <= 0:
+                return []
+
+            center = self._cell(lat, lng)
+            cell_m = self.cell_deg * math.pi / 180 * EARTH_RADIUS_M
+
+            # Group occupied cells by ring. This is O(buckets) rather than
+            # O(vendors), and avoids walking long runs of empty rings when
+            # the query point is far from any listing.
+            rings = {}
+            ci, cj = center
+            for i, j in self._buckets:
+                rings.setdefault(max(abs(i - ci), abs(j - cj)), []).append((i, j))
+            max_rings = max(rings)
+            if radius is not None:
+                max_rings = min(max_rings, int(radius / (cell_m * self._cos_at(lat, max_rings))) + 1)
+
+            found = []
+            for r in range(max_rings + 1):
+                for cell in rings.get(r, ()):
+                    for vendor_id in self._buckets.get(cell, ()):
+                        p_lat, p_lng, _ = self._points[vendor_id]
+                        dist = haversine(lat, lng, p_lat, p_lng)
+                        if radius is None or dist <= radius:
+                            found.append((dist, vendor_id))
+                # Everything outside ring r is at least r cells away.
+                # Longitude degrees shrink towards the poles, so use the
+                # narrowest cell width the search may have reached.
+                if len(found) >= k:
+                    found.sort()
+                    if found[k - 1][0] <= r * cell_m * self._cos_at(lat, r + 1):
+                        break
+
+            found.sort()
+            return [(vendor_id, dist) for dist, vendor_id in found[:k]]
+
+    def _cos_at(self, lat, rings):
+        edge = min(abs(lat) + rings * self.cell_deg, 89.9)
+        return max(math.cos(math.radians(edge)), 1e-6)
+
+    def within(self, lat, lng, radius, limit=None):
+        """Return (vendor_id, distance_m) pairs within `radius` metres."""
+        self.ensure_loaded()
+        return self.nearest(lat, lng, k=limit or len(self._points), radius=radius)
+
+
+vendor_index = VendorIndex()
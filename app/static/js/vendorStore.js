@@ -0,0 +1,86 @@
+// vendorStore.js - Local copy of the SheSafe vendor list in IndexedDB
+//
+// sync() asks /api/vendors only for what changed since the last cursor
+// (with If-None-Match, so an unchanged list costs a bodiless 304) and
+// applies the upserts and removals locally. all() reads the local copy,
+// which also works offline.
+
+const DB_NAME = "shesafe";
+const DB_VERSION = 1;
+
+function promisify(request) {
+    return new Promise((resolve, reject) => {
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+function transactionDone(tx) {
+    return new Promise((resolve, reject) => {
+        tx.oncomplete = () => resolve();
+        tx.onerror = () => reject(tx.error);
+        tx.onabort = () => reject(tx.error);
+    });
+}
+
+class VendorStore {
+    constructor(endpoint = "/api/vendors") {
+        this.endpoint = endpoint;
+        this.dbPromise = null;
+    }
+
+    static isSupported() {
+        return typeof indexedDB !== "undefined";
+    }
+
+    open() {
+        if (!this.dbPromise) {
+            const request = indexedDB.open(DB_NAME, DB_VERSION);
+            request.onupgradeneeded = () => {
+                const db = request.result;
+                if (!db.objectStoreNames.contains("vendors")) db.createObjectStore("vendors", { keyPath: "id" });
+                if (!db.objectStoreNames.contains("meta")) db.createObjectStore("meta");
+            };
+            this.dbPromise = promisify(request);
+        }
+        return this.dbPromise;
+    }
+
+    async all() {
+        const db = await this.open();
+        return promisify(db.transaction("vendors").objectStore("vendors").getAll());
+    }
+
+    async meta(key) {
+        const db = await this.open();
+        return promisify(db.transaction("meta").objectStore("meta").get(key));
+    }
+
+    // Returns true if the local copy changed.
+    async sync() {
+        const [cursor, etag] = await Promise.all([this.meta("cursor"), this.meta("etag")]);
+        const url = cursor ? `${this.endpoint}?since=${encodeURIComponent(cursor)}` : this.endpoint;
+        const headers = etag ? { "If-None-Match": etag } : {};
+
+        const response = await fetch(url, { headers: headers, cache: "no-store" });
+        if (response.status === 304) return false;
+        if (!response.ok) throw new Error(`Vendor sync HTTP ${response.status}`);
+        const data = await response.json();
+
+        const db = await this.open();
+        const tx = db.transaction(["vendors", "meta"], "readwrite");
+        const vendors = tx.objectStore("vendors");
+        if (data.full) vendors.clear();
+        data.removed.forEach((id) => vendors.delete(id));
+        data.vendors.forEach((vendor) => vendors.put(vendor));
+
+        const meta = tx.objectStore("meta");
+        if (data.cursor) meta.put(data.cursor, "cursor");
+        const newEtag = response.headers.get("ETag");
+        if (newEtag) meta.put(newEtag, "etag");
+        await transactionDone(tx);
+        return data.full || data.vendors.length > 0 || data.removed.length > 0;
+    }
+}
+
+export default VendorStore;
@@ -0,0 +1,212 @@
+from datetime import timedelta
+
+from app import db
+from app.models import User, Vendor, Booking, Feedback, RevenueDaily
+from app.search import user_matches
+
+
+def page_count(total, per_page):
+    """Number of pages needed to show `total` rows (at least 1)."""
+    return max((total + per_page - 1) // per_page, 1)
+
+
+def user_role_counts():
+    """User counts per role plus a 'total', from a single GROUP BY."""
+    counts = {'admin': 0, 'vendor': 0, 'user': 0}
+    rows = db.session.query(User.role, db.func.count(User.id)).group_by(User.role).all()
+    for role, count in rows:
+        counts[role] = count
+    counts['total'] = sum(count for _, count in rows)
+    return counts
+
+
+def vendor_status_counts():
+    """Vendor counts by verification/activity status, from a single GROUP BY."""
+    counts = {'total': 0, 'pending': 0, 'verified': 0, 'active': 0}
+    rows = db.session.query(Vendor.is_verified, Vendor.is_active, db.func.count(Vendor.id)).\
+        group_by(Vendor.is_verified, Vendor.is_active).all()
+    for is_verified, is_active, count in rows:
+        counts['total'] += count
+        counts['verified' if is_verified else 'pending'] += count
+        if is_verified and is_active:
+            counts['active'] += count
+    return counts
+
+
+VENDOR_LIST_COLUMNS = (
+    Vendor.id, Vendor.business_name, Vendor.category, Vendor.address, Vendor.description,
+    Vendor.has_cctv, Vendor.has_female_staff, Vendor.is_verified, Vendor.is_active,
+    Vendor.average_rating, Vendor.created_at,
+)
+
+
+def vendor_list(status=None, page=1, per_page=50):
+    """
+    One page of vendors with their owner's name and email, selecting only
+    the columns the admin pages render. `status` is None, 'pending' or
+    'verified'.
+    """
+    query = db.session.query(*VENDOR_LIST_COLUMNS, User.name, User.email).\
+        join(User, User.id == Vendor.user_id)
+    if status == 'pending':
+        query = query.filter(Vendor.is_verified.is_(False))
+    elif status == 'verified':
+        query = query.filter(Vendor.is_verified.is_(True))
+
+    rows = query.order_by(Vendor.id).limit(per_page).offset((page - 1) * per_page).all()
+
+    vendors = []
+    for row in rows:
+        vendor = {column.key: value for column, value in zip(VENDOR_LIST_COLUMNS, row)}
+        vendor['user'] = {'name': row[-2], 'email': row[-1]}
+        vendors.append(vendor)
+    return vendors
+
+
+def user_list(search=None, page=1, per_page=50):
+    """
+    One page of users with booking count and average feedback rating,
+    best search matches first when `search` is given.
+
+    The page is selected first; booking counts and ratings are then
+    aggregated for just those users (bookings.user_id is indexed), rather
+    than grouping the whole bookings table. Returns (users, total).
+    """
+    query = User.query
+    order = [User.id]
+    total = None
+    if search:
+        # Ranked, index-backed matching (see app/search.py); fall back to
+        # fuzzy matching only when there is no substring match
+        for fuzzy in (False, True):
+            matches = user_matches(search, fuzzy=fuzzy).subquery()
+            query = User.query.join(matches, matches.c.user_id == User.id)
+            total = query.order_by(None).count()
+            if total:
+                break
+        order = [matches.c.tier, matches.c.score, User.id]
+    else:
+        total = query.order_by(None).count()
+
+    rows = query.with_entities(User.id, User.name, User.email, User.role).\
+        order_by(*order).\
+        limit(per_page).offset((page - 1) * per_page).all()
+
+    page_ids = [row[0] for row in rows]
+    aggregates = {}
+    if page_ids:
+        # Feedback doesn't have user_id, so join through bookings
+        aggregate_rows = db.session.query(
+            Booking.user_id,
+            db.func.count(db.distinct(Booking.id)),
+            db.func.avg(Feedback.overall_rating)
+        ).outerjoin(Feedback, Feedback.booking_id == Booking.id).\
+            filter(Booking.user_id.in_(page_ids)).\
+            group_by(Booking.user_id).all()
+        aggregates = {user_id: (count, avg) for user_id, count, avg in aggregate_rows}
+
+    users = []
+    for user_id, name, email, role in rows:
+        bookings_count, avg_rating = aggregates.get(user_id, (0, None))
+        users.append({
+            'id': user_id,
+            'name': name,
+            'email': email,
+            'role': role,
+            'bookings_count': bookings_count,
+            'average_rating': round(float(avg_rating), 1) if avg_rating else 0
+        })
+    return users, total
+
+
+def _revenue_filter(query, start=None, end=None, vendor_id=None):
+    if start:
+        query = query.filter(RevenueDaily.day >= start)
+    if end:
+        query = query.filter(RevenueDaily.day <= end)
+    if vendor_id:
+        query = query.filter(RevenueDaily.vendor_id == vendor_id)
+    return query
+
+
+def revenue_summary(start=None, end=None, vendor_id=None):
+    """
+    Revenue totals from the daily rollup: overall amount and booking count
+    plus a per-payment-mode breakdown. Dates are inclusive.
+    """
+    rows = _revenue_filter(db.session.query(
+        RevenueDaily.payment_mode,
+        db.func.sum(RevenueDaily.bookings),
+        db.func.sum(RevenueDaily.amount)
+    ), start, end, vendor_id).group_by(RevenueDaily.payment_mode).all()
+
+    by_mode = {mode: {'bookings': int(count or 0), 'amount': float(amount or 0)} for mode, count, amount in rows}
+    return {
+        'bookings': sum(m['bookings'] for m in by_mode.values()),
+        'amount': sum(m['amount'] for m in by_mode.values()),
+        'by_mode': by_mode,
+    }
+
+
+def revenue_by_vendor(start=None, end=None, limit=20):
+    """Top vendors by revenue in the date range, from the daily rollup."""
+    amount = db.func.sum(RevenueDaily.amount).label('amount')
+    rows = _revenue_filter(db.session.query(
+        RevenueDaily.vendor_id, Vendor.business_name,
+        db.func.sum(RevenueDaily.bookings), amount
+    ), start, end).join(Vendor, Vendor.id == RevenueDaily.vendor_id).\
+        group_by(RevenueDaily.vendor_id, Vendor.business_name).\
+        order_by(amount.desc()).limit(limit).all()
+
+    return [{
+        'vendor_id': vendor_id,
+        'business_name': business_name,
+        'bookings': int(count or 0),
+        'amount': float(total or 0),
+    } for vendor_id, business_name, count, total in rows]
+
+
+def revenue_by_day(start=None, end=None, vendor_id=None, limit=31):
+    """Daily revenue totals, newest first, from the daily rollup."""
+    rows = _revenue_filter(db.session.query(
+        RevenueDaily.day, db.func.sum(RevenueDaily.bookings), db.func.sum(RevenueDaily.amount)
+    ), start, end, vendor_id).group_by(RevenueDaily.day).\
+        order_by(RevenueDaily.day.desc()).limit(limit).all()
+
+    return [{'day': day, 'bookings': int(count or 0), 'amount': float(total or 0)} for day, count, total in rows]
+
+
+def revenue_bookings(start=None, end=None, vendor_id=None, page=1, per_page=50):
+    """
+    One page of the completed bookings behind the revenue figures, with
+    user and vendor names joined in. Returns (bookings, total).
+    """
+    query = db.session.query(Booking).filter(Booking.status == 'completed')
+    if start:
+        query = query.filter(Booking.visit_date >= start)
+    if end:
+        # `end` is an inclusive date; compare against the following midnight
+        query = query.filter(Booking.visit_date < end + timedelta(days=1))
+    if vendor_id:
+        query = query.filter(Booking.vendor_id == vendor_id)
+
+    total = query.order_by(None).count()
+
+    rows = query.with_entities(
+        Booking.id, Booking.visit_date, Booking.amount, Booking.payment_mode,
+        User.name, Vendor.id, Vendor.business_name
+    ).join(User, User.id == Booking.user_id).\
+        join(Vendor, Vendor.id == Booking.vendor_id).\
+        order_by(Booking.visit_date.desc(), Booking.id.desc()).\
+        limit(per_page).offset((page - 1) * per_page).all()
+
+    bookings = [{
+        'id': booking_id,
+        'visit_date': visit_date,
+        'amount': amount,
+        'payment_mode': payment_mode,
+        'user_name': user_name,
+        'vendor_id': booking_vendor_id,
+        'business_name': business_name,
+    } for booking_id, visit_date, amount, payment_mode, user_name, booking_vendor_id, business_name in rows]
+    return bookings, total
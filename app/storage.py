@@ -0,0 +1,286 @@
+import base64
+import hashlib
+import os
+import tempfile
+from collections import namedtuple
+
+from flask import current_app
+
+from app.image_processing import CHUNK_SIZE, InvalidImage, get_image_pool, process_image, processing_options
+
+# variants: {width as str: content hash} for srcset (the JSON form stored on VendorImage)
+StoredImage = namedtuple('StoredImage', 'content_hash mime_type size_bytes variants')
+
+
+def sniff_mime_type(data, default='image/jpeg'):
+    """Guess an image MIME type from its leading magic bytes."""
+    if data.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'image/png'
+    if data.startswith(b'\xff\xd8\xff'):
+        return 'image/jpeg'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    if data[:6] in (b'GIF87a', b'GIF89a'):
+        return 'image/gif'
+    if data[4:12] == b'ftypavif':
+        return 'image/avif'
+    return default
+
+
+def decode_data_uri(data_uri):
+    """Split a 'data:<mime>;base64,<payload>' string into (mime, bytes)."""
+    header, _, payload = data_uri.partition(',')
+    mime_type = None
+    if header.startswith('data:'):
+        mime_type = header[5:].split(';', 1)[0] or None
+    else:
+        # Bare base64 without a data URI prefix
+        payload = data_uri
+    return mime_type, base64.b64decode(payload)
+
+
+class ImageStore:
+    """
+    Content-addressed blob store interface.
+
+    Blobs are keyed by the SHA-256 hex digest of their bytes, so storing
+    the same image twice is a no-op and a key never changes content.
+    """
+
+    def put(self, data):
+        """Store bytes and return their content hash."""
+        raise NotImplementedError
+
+    def get(self, content_hash):
+        """Return the stored bytes, or None if the hash is unknown."""
+        raise NotImplementedError
+
+    def exists(self, content_hash):
+        raise NotImplementedError
+
+    def delete(self, content_hash):
+        raise NotImplementedError
+
+    def local_path(self, content_hash):
+        """Filesystem path for the blob if the backend has one, else None."""
+        return None
+
+    def put_file(self, path, content_hash=None):
+        """Store the file at path (consuming it) and return its content hash."""
+        try:
+            with open(path, 'rb') as f:
+                return self.put(f.read())
+        finally:
+            os.remove(path)
+
+    def staging_dir(self):
+        """Directory for spooled uploads and processed files waiting for put_file()."""
+        return tempfile.gettempdir()
+
+    @staticmethod
+    def hash_bytes(data):
+        return hashlib.sha256(data).hexdigest()
+
+
+class LocalImageStore(ImageStore):
+    """
+    Stores blobs on the local filesystem under <root>/ab/cd/<hash>.
+
+    The root holds runtime data and carries its own .gitignore, so blobs
+    are never versioned wherever IMAGE_STORE_PATH points.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._ignore_in_git()
+
+    def _ignore_in_git(self):
+        marker = os.path.join(self.root, '.gitignore')
+        if os.path.exists(marker):
+            return
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            with open(marker, 'w') as f:
+                f.write('*\n')
+        except OSError:
+            # Read-only deployments never write blobs locally either
+            pass
+
+    def _path(self, content_hash):
+        if len(content_hash) != 64 or any(c not in '0123456789abcdef' for c in content_hash):
+            raise ValueError(f'Invalid content hash: {content_hash!r}')
+        return os.path.join(self.root, content_hash[:2], content_hash[2:4], content_hash)
+
+    def put(self, data):
+        content_hash = self.hash_bytes(data)
+        path = self._path(content_hash)
+        if os.path.exists(path):
+            return content_hash
+
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+
+        # Write to a temp file and rename so readers never see partial blobs
+        fd, tmp_path = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return content_hash
+
+    def put_file(self, path, content_hash=None):
+        # Staged on the same filesystem, so the blob is moved into place, not copied
+        if content_hash is None:
+            with open(path, 'rb') as f:
+                digest = hashlib.sha256()
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                    digest.update(chunk)
+            content_hash = digest.hexdigest()
+        target = self._path(content_hash)
+        if os.path.exists(target):
+            os.remove(path)
+            return content_hash
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(path, target)
+        return content_hash
+
+    def staging_dir(self):
+        directory = os.path.join(self.root, 'staging')
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+    def get(self, content_hash):
+        try:
+            with open(self._path(content_hash), 'rb') as f:
+                return f.read()
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def exists(self, content_hash):
+        try:
+            return os.path.exists(self._path(content_hash))
+        except ValueError:
+            return False
+
+    def delete(self, content_hash):
+        try:
+            os.remove(self._path(content_hash))
+        except (FileNotFoundError, ValueError):
+            pass
+
+    def local_path(self, content_hash):
+        try:
+            path = self._path(content_hash)
+        except ValueError:
+            return None
+        return path if os.path.exists(path) else None
+
+
+backends = {
+    'local': lambda app: LocalImageStore(app.config['IMAGE_STORE_PATH']),
+}
+
+
+def init_image_store(app):
+    """Create the configured image store and attach it to the app."""
+    backend = app.config.get('IMAGE_STORE_BACKEND', 'local')
+    app.extensions['image_store'] = backends[backend](app)
+
+
+def get_image_store():
+    return current_app.extensions['image_store']
+
+
+def spool_upload(file, directory):
+    """
+    Copy an upload to a temp file in directory, CHUNK_SIZE bytes at a time,
+    hashing as it goes. Returns (path, sha256 of the raw upload, size).
+    """
+    digest = hashlib.sha256()
+    size = 0
+    fd, path = tempfile.mkstemp(dir=directory, suffix='.upload')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            for chunk in iter(lambda: file.stream.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+                size += len(chunk)
+                out.write(chunk)
+    except Exception:
+        os.remove(path)
+        raise
+    return path, digest.hexdigest(), size
+
+
+def save_uploads(files):
+    """
+    Store a batch of uploaded images.
+
+    Each upload is streamed to disk, then decoded, validated, stripped of
+    metadata and re-encoded (plus its thumbnail widths) in the image process
+    pool, all files in parallel. Returns (stored, rejected): a StoredImage
+    per accepted file in upload order, and (filename, reason) per file that
+    isn't a usable image. The same upload twice in one batch is processed
+    once.
+    """
+    store = get_image_store()
+    staging = store.staging_dir()
+    options = processing_options()
+
+    spooled = []
+    jobs = {}
+    try:
+        for file in files:
+            path, raw_hash, size = spool_upload(file, staging)
+            spooled.append((file.filename, raw_hash, size))
+            if raw_hash in jobs or size == 0:
+                os.remove(path)
+            else:
+                jobs[raw_hash] = path
+
+        job_hashes = list(jobs)
+        results = dict(zip(job_hashes, get_image_pool().map(
+            process_image, [(jobs[h], staging, options) for h in job_hashes])))
+    finally:
+        for path in jobs.values():
+            if os.path.exists(path):
+                os.remove(path)
+
+    processed = {raw_hash: result for raw_hash, result in results.items() if not isinstance(result, Exception)}
+    try:
+        for result in results.values():
+            if isinstance(result, Exception) and not isinstance(result, InvalidImage):
+                raise result
+        stored_by_hash = {}
+        for raw_hash, result in processed.items():
+            # The full image is one of the variants, under its own width
+            variants = {str(width): store.put_file(variant.path, variant.content_hash)
+                        for width, variant in result.variants.items()}
+            stored_by_hash[raw_hash] = StoredImage(result.content_hash, result.mime_type, result.size_bytes, variants)
+    finally:
+        for result in processed.values():
+            for variant in result.variants.values():
+                if os.path.exists(variant.path):
+                    os.remove(variant.path)
+
+    stored, rejected = [], []
+    for filename, raw_hash, size in spooled:
+        if raw_hash in stored_by_hash:
+            stored.append(stored_by_hash[raw_hash])
+        else:
+            rejected.append((filename, str(results.get(raw_hash, 'Empty file'))))
+    return stored, rejected
+
+
+def save_upload(file):
+    """
+    Store one uploaded image and return its StoredImage.
+    Raises InvalidImage if it isn't a usable image.
+    """
+    stored, rejected = save_uploads([file])
+    if rejected:
+        raise InvalidImage(rejected[0][1])
+    return stored[0]
@@ -0,0 +1,122 @@
+// SheSafe service worker. Rendered by the /service-worker.js route, so the
+// cache version and precache list come from the asset manifest (build_assets.py);
+// any asset change produces a new worker and new cache names.
+const VERSION = {{ version|tojson }};
+const PRECACHE_URLS = {{ precache_urls|tojson }};
+
+const STATIC_CACHE = `shesafe-static-${VERSION}`;
+const DATA_CACHE = `shesafe-data-${VERSION}`;
+const PAGES_CACHE = `shesafe-pages-${VERSION}`;
+const CURRENT_CACHES = [STATIC_CACHE, DATA_CACHE, PAGES_CACHE];
+
+// Third-party CSS/JS/fonts the pages load from CDNs
+const CDN_HOSTS = [
+    'cdn.tailwindcss.com',
+    'fonts.googleapis.com',
+    'fonts.gstatic.com',
+    'unpkg.com'
+];
+
+// Never served from cache: streaming AI answers, admin exports, the logout flow,
+// and the vendor sync endpoint, whose client keeps its own copy in IndexedDB
+const BYPASS_PATHS = [/^\/api\/ai\//, /^\/admin\/export\//, /^\/logout/, /^\/api\/vendors$/];
+
+self.addEventListener('install', (event) => {
+    event.waitUntil(
+        caches.open(STATIC_CACHE)
+            .then((cache) => cache.addAll(PRECACHE_URLS))
+            .then(() => self.skipWaiting())
+    );
+});
+
+self.addEventListener('activate', (event) => {
+    // Drop caches from previous versions (including the old fixed 'shesafe-v1')
+    event.waitUntil(
+        caches.keys()
+            .then((names) => Promise.all(
+                names
+                    .filter((name) => name.startsWith('shesafe-') && !CURRENT_CACHES.includes(name))
+                    .map((name) => caches.delete(name))
+            ))
+            .then(() => self.clients.claim())
+    );
+});
+
+// Content-hashed or content-addressed: the URL's bytes never change
+async function cacheFirst(request, cacheName) {
+    const cache = await caches.open(cacheName);
+    const cached = await cache.match(request);
+    if (cached) return cached;
+    const response = await fetch(request);
+    if (response.ok) cache.put(request, response.clone());
+    return response;
+}
+
+// Answer from cache at once when possible, refresh it in the background
+async function staleWhileRevalidate(event, cacheName) {
+    const cache = await caches.open(cacheName);
+    const cached = await cache.match(event.request);
+    const refresh = fetch(event.request).then((response) => {
+        if (response.ok || response.type === 'opaque') {
+            return cache.put(event.request, response.clone()).then(() => response);
+        }
+        return response;
+    });
+    if (cached) {
+        event.waitUntil(refresh.catch(() => null));
+        return cached;
+    }
+    return refresh;
+}
+
+// Pages are personalised: always ask the network, fall back to the last copy offline
+async function networkFirst(request, cacheName) {
+    const cache = await caches.open(cacheName);
+    try {
+        const response = await fetch(request);
+        if (response.ok && !response.redirected) cache.put(request, response.clone());
+        return response;
+    } catch (error) {
+        const cached = await cache.match(request);
+        if (cached) return cached;
+        return new Response('<h1>You are offline</h1><p>Reconnect to use SheSafe.</p>', {
+            status: 503,
+            headers: { 'Content-Type': 'text/html; charset=utf-8' }
+        });
+    }
+}
+
+self.addEventListener('fetch', (event) => {
+    const request = event.request;
+    // Mutations (bookings, uploads, logins, AI prompts) always go straight to the network
+    if (request.method !== 'GET') return;
+
+    const url = new URL(request.url);
+
+    if (url.origin !== self.location.origin) {
+        if (CDN_HOSTS.includes(url.hostname)) {
+            event.respondWith(staleWhileRevalidate(event, STATIC_CACHE));
+        }
+        return;
+    }
+
+    if (BYPASS_PATHS.some((pattern) => pattern.test(url.pathname))) {
+        if (url.pathname.startsWith('/logout')) {
+            // Don't leave the previous user's pages or data behind
+            event.waitUntil(Promise.all([caches.delete(PAGES_CACHE), caches.delete(DATA_CACHE)]));
+        }
+        return;
+    }
+
+    if ((url.pathname.startsWith('/static/') && url.searchParams.has('v')) ||
+        url.pathname.startsWith('/images/') || url.pathname.startsWith('/img/')) {
+        event.respondWith(cacheFirst(request, STATIC_CACHE));
+    } else if (url.pathname.startsWith('/static/')) {
+        event.respondWith(staleWhileRevalidate(event, STATIC_CACHE));
+    } else if (url.pathname.startsWith('/api/vendors')) {
+        event.respondWith(staleWhileRevalidate(event, DATA_CACHE));
+    } else if (request.mode === 'navigate') {
+        event.respondWith(networkFirst(request, PAGES_CACHE));
+    }
+    // Anything else (other JSON endpoints, admin tools) is left to the network
+});
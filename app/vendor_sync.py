@@ -0,0 +1,102 @@
+"""
+Delta sync of the public vendor list for the PWA.
+
+Clients keep the list in IndexedDB and call /api/vendors?since=<cursor>
+with the cursor from their last sync. The reply carries only vendors whose
+updated_at moved past the cursor and the ids of vendors that were deleted
+(tombstones) or hidden (unverified, disabled) since, plus the next cursor.
+Without a cursor, or with one older than the tombstone retention, the full
+list is sent with full=True and the client replaces its copy.
+
+The cursor (latest updated_at or deleted_at) doubles as the data version:
+the full-list response is encoded once per cursor and served from the app
+cache as ready-made bytes with a precomputed ETag.
+
+Cursors are updated_at timestamps. A row can commit a moment after a newer
+row (updated_at is set before the write lock is taken), so deltas reach
+back SYNC_OVERLAP before the cursor; re-sent rows are harmless upserts.
+"""
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+
+from app import db
+from app.cache import get_cache
+from app.models import Vendor, VendorTombstone, TOMBSTONE_RETENTION
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+SYNC_OVERLAP = timedelta(seconds=60)
+
+
+def encode_json(payload):
+    """Compact UTF-8 JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def _naive_utc(value):
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def parse_cursor(value):
+    """Cursor string -> naive UTC datetime (None for no cursor); raises ValueError if malformed."""
+    if not value:
+        return None
+    return _naive_utc(datetime.fromisoformat(value))
+
+
+def current_cursor():
+    """Timestamp of the latest vendor change or deletion, as a cursor string."""
+    latest_update, latest_delete = db.session.execute(db.select(
+        db.select(db.func.max(Vendor.updated_at)).scalar_subquery(),
+        db.select(db.func.max(VendorTombstone.deleted_at)).scalar_subquery(),
+    )).one()
+    latest = max((_naive_utc(t) for t in (latest_update, latest_delete) if t is not None), default=None)
+    return latest.isoformat() if latest else None
+
+
+def is_full_sync(since):
+    horizon = datetime.now(timezone.utc).replace(tzinfo=None) - TOMBSTONE_RETENTION
+    return since is None or since < horizon
+
+
+def full_listing(cursor):
+    """{'body': JSON text, 'etag'} of the full list, built once per cursor."""
+    def build():
+        body = encode_json({'cursor': cursor, 'full': True, 'vendors': Vendor.verified_listing(), 'removed': []})
+        return {'body': body.decode('utf-8'), 'etag': hashlib.sha1(body).hexdigest()}
+    return get_cache().get_or_set(f'vendor_listing:{cursor}', build)
+
+
+def vendor_delta(since, cursor):
+    """
+    Delta payload: {'cursor', 'full': False, 'vendors': [to_dict...], 'removed': [ids]}.
+    `since` is a naive UTC datetime from parse_cursor.
+    """
+    floor = since - SYNC_OVERLAP
+    changed = Vendor.query.filter(Vendor.updated_at > floor).order_by(Vendor.id).all()
+    visible = [v for v in changed if v.is_verified and v.is_active]
+    removed = [v.id for v in changed if not (v.is_verified and v.is_active)]
+    removed += db.session.execute(
+        db.select(VendorTombstone.vendor_id).where(VendorTombstone.deleted_at > floor).
+        order_by(VendorTombstone.vendor_id)
+    ).scalars().all()
+    return {'cursor': cursor, 'full': False, 'vendors': Vendor.serialize_many(visible), 'removed': removed}
+
+
+def sync_body(since=None):
+    """(JSON bytes, ETag) answering a sync request."""
+    # Read the cursor first: anything changed after it is re-sent next time
+    cursor = current_cursor()
+    if is_full_sync(since):
+        listing = full_listing(cursor)
+        return listing['body'].encode('utf-8'), listing['etag']
+    body = encode_json(vendor_delta(since, cursor))
+    return body, hashlib.sha1(body).hexdigest()
@@ -0,0 +1,106 @@
+"""
+Local stub of OpenAI-compatible chat providers for exercising the Ask AI gateway.
+
+    python -m benchmarks.ai_stub --port 8765 --provider fast:0.05:0 --provider slow:3:0 --provider flaky:0.1:0.5
+
+Each --provider is name:first_token_seconds:error_rate and is served at
+http://127.0.0.1:<port>/<name>/v1/chat/completions. Point the app at them
+with stub_providers() as AI_PROVIDERS.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = 'Stay hydrated and use clean, well lit washrooms where staff are present .'.split()
+
+
+def stub_providers(port, names):
+    """AI_PROVIDERS entries pointing at a running stub."""
+    return [
+        {'name': name, 'url': f'http://127.0.0.1:{port}/{name}/v1/chat/completions',
+         'api_key': 'stub', 'models': [f'{name}-model']}
+        for name in names
+    ]
+
+
+def make_handler(behaviours, token_delay, stats):
+    def count(name, outcome):
+        with stats_lock:
+            stats.setdefault(name, {'requests': 0, 'completed': 0, 'cancelled': 0, 'failed': 0})[outcome] += 1
+
+    stats_lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            name = self.path.strip('/').split('/')[0]
+            first_token, error_rate = behaviours.get(name, (0.0, 1.0))
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            count(name, 'requests')
+            if random.random() < error_rate:
+                count(name, 'failed')
+                self.send_response(503)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+            time.sleep(first_token)
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            try:
+                for word in [f'[{name}]'] + WORDS:
+                    chunk = {'model': body.get('model'), 'choices': [{'delta': {'content': word + ' '}}]}
+                    self.wfile.write(f'data: {json.dumps(chunk)}\n\n'.encode())
+                    self.wfile.flush()
+                    time.sleep(token_delay)
+                self.wfile.write(b'data: [DONE]\n\n')
+                self.wfile.flush()
+                count(name, 'completed')
+            except (BrokenPipeError, ConnectionResetError):
+                # The gateway cancelled this request
+                count(name, 'cancelled')
+            self.close_connection = True
+
+    return Handler
+
+
+def serve(port, behaviours, token_delay=0.01):
+    """
+    Stub server (not yet started; call serve_forever). Port 0 picks a free
+    port (server.server_address[1]). server.stats counts requests and how
+    each ended ({name: {'requests', 'completed', 'cancelled', 'failed'}}).
+    """
+    stats = {}
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(behaviours, token_delay, stats))
+    server.daemon_threads = True
+    server.stats = stats
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Stub OpenAI-compatible providers.')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--provider', action='append', default=[],
+                        help='name:first_token_seconds:error_rate (repeatable)')
+    parser.add_argument('--token-delay', type=float, default=0.01)
+    args = parser.parse_args(argv)
+
+    behaviours = {}
+    for spec in args.provider or ['fast:0.05:0']:
+        name, first_token, error_rate = spec.split(':')
+        behaviours[name] = (float(first_token), float(error_rate))
+    print(f'Serving {", ".join(behaviours)} on port {args.port}')
+    serve(args.port, behaviours, args.token_delay).serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""
+Hammer one vendor's booking slots from many threads and check capacity holds.
+
+    python -m benchmarks.contention --threads 32 --attempts 2000 --capacity 10 --slots 20
+
+Seeds a small benchmark database, gives one vendor a per-slot capacity,
+then fires concurrent POST /book/<vendor_id> requests through a threaded
+HTTP server spread over `slots` time slots. Reports bookings/sec and
+verifies from the database that no slot holds more than its capacity.
+"""
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+from collections import Counter
+from datetime import datetime, timedelta
+
+from werkzeug.serving import make_server
+
+from app import create_app, db
+from app.models import Booking, BookingSlot, Vendor
+from benchmarks.run import _opener_for, percentile
+from benchmarks.seed import is_seeded, seed
+
+
+def _book(opener, url, visit_date):
+    body = urllib.parse.urlencode({
+        'visit_date': visit_date.strftime('%Y-%m-%dT%H:%M'),
+        'payment_mode': 'app',
+        'amount': '20',
+    }).encode()
+    try:
+        with opener.open(url, data=body, timeout=60) as response:
+            response.read()
+            return response.status, response.headers.get('Location', '')
+    except urllib.error.HTTPError as e:
+        e.read()
+        return e.code, e.headers.get('Location', '')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Concurrent booking contention benchmark.')
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--attempts', type=int, default=2000, help='total booking attempts')
+    parser.add_argument('--capacity', type=int, default=10, help='bookings allowed per slot')
+    parser.add_argument('--slots', type=int, default=20, help='distinct slots the attempts are spread over')
+    parser.add_argument('--slot-minutes', type=int, default=30)
+    parser.add_argument('--skip-seed', action='store_true', help='reuse the benchmark database if it is already seeded')
+    parser.add_argument('--output', help='write JSON results here instead of stdout')
+    args = parser.parse_args(argv)
+
+    app = create_app('benchmark')
+    with app.app_context():
+        if not (args.skip_seed and is_seeded()):
+            seed(users=100, vendors=10, bookings=0, feedbacks=0, bench_pool=0)
+        vendor = db.session.execute(db.select(Vendor).order_by(Vendor.id)).scalars().first()
+        vendor.slot_minutes = args.slot_minutes
+        vendor.slot_capacity = args.capacity
+        vendor.is_verified = vendor.is_active = True
+        db.session.execute(db.delete(BookingSlot).where(BookingSlot.vendor_id == vendor.id))
+        db.session.execute(db.delete(Booking).where(Booking.vendor_id == vendor.id))
+        db.session.commit()
+        vendor_id = vendor.id
+
+    base = datetime.utcnow().replace(second=0, microsecond=0) + timedelta(days=1)
+    base = BookingSlot.slot_start_for(base, args.slot_minutes)
+    slot_starts = [base + timedelta(minutes=args.slot_minutes * i) for i in range(args.slots)]
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+    book_url = f'{base_url}/book/{vendor_id}'
+
+    outcomes = Counter()
+    latencies = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(args.threads)
+    per_thread = max(1, args.attempts // args.threads)
+
+    def worker(index):
+        rng = random.Random(index)
+        opener = _opener_for(base_url, 'user')
+        local_outcomes = Counter()
+        local_latencies = []
+        barrier.wait()
+        for _ in range(per_thread):
+            # Land somewhere inside a random slot
+            visit = rng.choice(slot_starts) + timedelta(minutes=rng.randrange(args.slot_minutes))
+            t0 = time.perf_counter()
+            status, location = _book(opener, book_url, visit)
+            local_latencies.append((time.perf_counter() - t0) * 1000)
+            if status == 302 and '/booking/confirmation/' in location:
+                local_outcomes['booked'] += 1
+            elif status == 302:
+                local_outcomes['rejected'] += 1
+            else:
+                local_outcomes[f'http_{status}'] += 1
+        with lock:
+            outcomes.update(local_outcomes)
+            latencies.extend(local_latencies)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    for t in workers:
+        t.start()
+    started = time.perf_counter()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+
+    with app.app_context():
+        per_slot = Counter()
+        for (visit_date,) in db.session.execute(db.select(Booking.visit_date).where(Booking.vendor_id == vendor_id)):
+            per_slot[BookingSlot.slot_start_for(visit_date, args.slot_minutes)] += 1
+        counters = dict(db.session.execute(
+            db.select(BookingSlot.slot_start, BookingSlot.booked).where(BookingSlot.vendor_id == vendor_id)
+        ).all())
+
+    overbooked = {str(k): v for k, v in per_slot.items() if v > args.capacity}
+    mismatched = {str(k): (v, counters.get(k)) for k, v in per_slot.items() if counters.get(k) != v}
+    latencies.sort()
+    report = {
+        'meta': {
+            'database': app.config['SQLALCHEMY_DATABASE_URI'].split(':', 1)[0],
+            'threads': args.threads,
+            'slots': args.slots,
+            'capacity_per_slot': args.capacity,
+        },
+        'attempts': sum(outcomes.values()),
+        'outcomes': dict(outcomes),
+        'seconds': round(elapsed, 3),
+        'attempts_per_sec': round(sum(outcomes.values()) / elapsed, 2),
+        'bookings_per_sec': round(outcomes['booked'] / elapsed, 2),
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'bookings_in_db': sum(per_slot.values()),
+        'max_expected': min(args.capacity * args.slots, sum(outcomes.values())),
+        'overbooked_slots': overbooked,
+        'counter_mismatches': mismatched,
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+        print(f'Wrote {args.output}')
+    else:
+        print(output)
+    if overbooked or mismatched:
+        raise SystemExit('Capacity violated')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,304 @@
+"""
+Load-test the hot routes against a seeded database.
+
+    python -m benchmarks.run --mode both --requests 200 --threads 8 --output bench.json
+
+Seeds the database named by BENCHMARK_DATABASE_URI (SQLite under instance/
+by default), drives each route through the Flask test client and/or a
+threaded HTTP server, and writes p50/p95/p99 latency, throughput and SQL
+query counts (read from the Server-Timing header) as JSON.
+"""
+import argparse
+import http.cookiejar
+import json
+import logging
+import random
+import re
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime
+
+from werkzeug.serving import make_server
+
+from app import create_app, db
+from app.models import Booking, Feedback
+from benchmarks.seed import BENCH_ADMIN_EMAIL, BENCH_USER_EMAIL, BENCH_USER_ID, BENCH_PASSWORD, DEFAULT_SCALE, is_seeded, seed
+
+QUERY_COUNT_RE = re.compile(r'desc="(\d+) queries"')
+
+CREDENTIALS = {
+    'admin': (BENCH_ADMIN_EMAIL, BENCH_PASSWORD),
+    'user': (BENCH_USER_EMAIL, BENCH_PASSWORD),
+}
+
+
+class BookingPool:
+    """Hands out the bench user's unreviewed bookings, each at most once for feedback."""
+
+    def __init__(self, booking_ids):
+        self._lock = threading.Lock()
+        self._ids = list(booking_ids)
+        self._unreviewed = list(booking_ids)
+
+    def any(self, rng):
+        return rng.choice(self._ids)
+
+    def take(self):
+        with self._lock:
+            return self._unreviewed.pop() if self._unreviewed else None
+
+
+def build_routes(pool, user_pages):
+    """
+    Route specs as (name, role, method, build) where build(rng) returns
+    (path, form_data) or None when the route has run out of input rows.
+    """
+    def feedback(rng):
+        booking_id = pool.take()
+        if booking_id is None:
+            return None
+        return f'/booking/{booking_id}/feedback', {
+            'hygiene_rating': rng.randint(1, 5),
+            'safety_rating': rng.randint(1, 5),
+            'staff_behavior_rating': rng.randint(1, 5),
+            'comments': 'Benchmark review',
+        }
+
+    return [
+        ('landing', None, 'GET', lambda rng: ('/landing', None)),
+        ('explore', 'user', 'GET', lambda rng: ('/explore', None)),
+        ('nearby_vendors', 'user', 'GET', lambda rng: (
+            f'/api/vendors/nearby?lat={rng.gauss(28.95, 0.2):.5f}&lng={rng.gauss(77.10, 0.2):.5f}&k=20', None)),
+        ('user_dashboard', 'user', 'GET', lambda rng: ('/user/dashboard', None)),
+        ('admin_users', 'admin', 'GET', lambda rng: (f'/admin/users?page={rng.randint(1, user_pages)}', None)),
+        ('admin_revenue', 'admin', 'GET', lambda rng: ('/admin/revenue', None)),
+        ('booking_qr', 'user', 'GET', lambda rng: (f'/booking/{pool.any(rng)}/qr', None)),
+        ('booking_qr_image', 'user', 'GET', lambda rng: (f'/booking/{pool.any(rng)}/qr.png', None)),
+        ('submit_feedback', 'user', 'POST', feedback),
+    ]
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(samples, elapsed):
+    """Collapse (latency_s, status, query_count) samples into a result dict."""
+    latencies = sorted(s[0] * 1000 for s in samples)
+    queries = [s[2] for s in samples if s[2] is not None]
+    errors = sum(1 for s in samples if s[1] >= 400)
+    return {
+        'count': len(samples),
+        'errors': errors,
+        'p50_ms': _round(percentile(latencies, 50)),
+        'p95_ms': _round(percentile(latencies, 95)),
+        'p99_ms': _round(percentile(latencies, 99)),
+        'mean_ms': _round(sum(latencies) / len(latencies)) if latencies else None,
+        'throughput_rps': round(len(samples) / elapsed, 2) if elapsed else None,
+        'queries_avg': round(sum(queries) / len(queries), 2) if queries else None,
+        'queries_max': max(queries) if queries else None,
+    }
+
+
+def _round(value):
+    return round(value, 3) if value is not None else None
+
+
+def _query_count(server_timing):
+    match = QUERY_COUNT_RE.search(server_timing or '')
+    return int(match.group(1)) if match else None
+
+
+# --- Flask test client driver ---
+
+def _client_for(app, role):
+    client = app.test_client()
+    if role:
+        email, password = CREDENTIALS[role]
+        client.post('/login', data={'email': email, 'password': password})
+    return client
+
+
+def run_client(app, routes, requests_per_route, warmup, rng):
+    """Drive each route sequentially in-process through the test client."""
+    clients = {role: _client_for(app, role) for role in {None, 'user', 'admin'}}
+    results = {}
+    for name, role, method, build in routes:
+        client = clients[role]
+        samples = []
+        started = time.perf_counter()
+        for i in range(warmup + requests_per_route):
+            spec = build(rng)
+            if spec is None:
+                break
+            path, data = spec
+            t0 = time.perf_counter()
+            response = client.open(path, method=method, data=data)
+            latency = time.perf_counter() - t0
+            if i >= warmup:
+                samples.append((latency, response.status_code, _query_count(response.headers.get('Server-Timing'))))
+            else:
+                started = time.perf_counter()
+        results[name] = summarize(samples, time.perf_counter() - started)
+    return results
+
+
+# --- Threaded HTTP driver ---
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+def _opener_for(base_url, role):
+    opener = urllib.request.build_opener(
+        urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect()
+    )
+    if role:
+        email, password = CREDENTIALS[role]
+        _http_request(opener, base_url + '/login', {'email': email, 'password': password})
+    return opener
+
+
+def _http_request(opener, url, data=None):
+    body = urllib.parse.urlencode(data).encode() if data is not None else None
+    try:
+        with opener.open(url, data=body, timeout=60) as response:
+            response.read()
+            return response.status, response.headers.get('Server-Timing')
+    except urllib.error.HTTPError as e:
+        # Redirects surface here because of _NoRedirect; they are not errors
+        e.read()
+        return e.code, e.headers.get('Server-Timing')
+
+
+def run_http(app, routes, requests_per_route, warmup, threads, random_seed):
+    """Serve the app on a local threaded server and hammer each route from `threads` workers."""
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+    server_thread.start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+
+    results = {}
+    try:
+        for name, role, method, build in routes:
+            samples = []
+            samples_lock = threading.Lock()
+            barrier = threading.Barrier(threads)
+            per_thread = max(1, requests_per_route // threads)
+
+            def worker(index):
+                rng = random.Random(random_seed + index)
+                opener = _opener_for(base_url, role)
+                for _ in range(warmup):
+                    spec = build(rng)
+                    if spec is not None:
+                        _http_request(opener, base_url + spec[0], spec[1])
+                barrier.wait()
+                local = []
+                for _ in range(per_thread):
+                    spec = build(rng)
+                    if spec is None:
+                        break
+                    t0 = time.perf_counter()
+                    status, timing = _http_request(opener, base_url + spec[0], spec[1])
+                    local.append((time.perf_counter() - t0, status, _query_count(timing)))
+                with samples_lock:
+                    samples.extend(local)
+
+            workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+            for t in workers:
+                t.start()
+            started = time.perf_counter()
+            for t in workers:
+                t.join()
+            results[name] = summarize(samples, time.perf_counter() - started)
+    finally:
+        server.shutdown()
+    return results
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark SheSafe routes against a seeded database.')
+    parser.add_argument('--users', type=int, default=DEFAULT_SCALE['users'])
+    parser.add_argument('--vendors', type=int, default=DEFAULT_SCALE['vendors'])
+    parser.add_argument('--bookings', type=int, default=DEFAULT_SCALE['bookings'])
+    parser.add_argument('--feedbacks', type=int, default=DEFAULT_SCALE['feedbacks'])
+    parser.add_argument('--requests', type=int, default=200, help='measured requests per route')
+    parser.add_argument('--warmup', type=int, default=5, help='unmeasured requests per route (per thread in http mode)')
+    parser.add_argument('--threads', type=int, default=8, help='worker threads for the http driver')
+    parser.add_argument('--mode', choices=['client', 'http', 'both'], default='both')
+    parser.add_argument('--skip-seed', action='store_true', help='reuse the benchmark database if it is already seeded')
+    parser.add_argument('--seed', type=int, default=42, help='random seed')
+    parser.add_argument('--output', help='write JSON results here instead of stdout')
+    args = parser.parse_args(argv)
+
+    app = create_app('benchmark')
+    report = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'git_revision': _git_revision(),
+            'mode': args.mode,
+            'threads': args.threads,
+            'requests_per_route': args.requests,
+        },
+        'results': {},
+    }
+
+    with app.app_context():
+        report['meta']['database'] = db.engine.dialect.name
+        if not (args.skip_seed and is_seeded()):
+            t0 = time.perf_counter()
+            dataset = seed(args.users, args.vendors, args.bookings, args.feedbacks,
+                           bench_pool=max(1000, args.requests * 3), random_seed=args.seed)
+            dataset['seconds'] = round(time.perf_counter() - t0, 2)
+            report['meta']['dataset'] = dataset
+
+        # Completed bookings of the bench user that have no review yet
+        reviewed = db.select(Feedback.booking_id)
+        bench_ids = db.session.execute(
+            db.select(Booking.id).where(
+                Booking.user_id == BENCH_USER_ID, Booking.status == 'completed', Booking.id.not_in(reviewed)
+            )
+        ).scalars().all()
+        user_count = db.session.execute(db.text('SELECT COUNT(*) FROM users')).scalar()
+        db.session.remove()
+
+    user_pages = max(1, -(-user_count // app.config['ADMIN_PAGE_SIZE']))
+    # Split the feedback pool so each driver posts against fresh bookings
+    half = len(bench_ids) // 2 if args.mode == 'both' else len(bench_ids)
+
+    if args.mode in ('client', 'both'):
+        routes = build_routes(BookingPool(bench_ids[:half]), user_pages)
+        report['results']['client'] = run_client(app, routes, args.requests, args.warmup, random.Random(args.seed))
+    if args.mode in ('http', 'both'):
+        routes = build_routes(BookingPool(bench_ids[half:] or bench_ids), user_pages)
+        report['results']['http'] = run_http(app, routes, args.requests, args.warmup, args.threads, args.seed)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+        print(f'Wrote {args.output}')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Seed a benchmark database at a configurable scale.
+
+Bulk generation is shared with generate_data.py (see app.datagen); this
+adds the fixed bench admin and bench user accounts the load driver logs in
+as, plus a pool of the bench user's completed, unreviewed bookings. The
+database is built at run time and never committed.
+"""
+import random
+from datetime import datetime, timedelta
+
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.datagen import CityCentre, bulk_insert, generate, reset_sequences
+from app.models import User, Booking, RevenueDaily
+
+BENCH_PASSWORD = 'benchmark'
+BENCH_ADMIN_EMAIL = 'bench-admin@shesafe.test'
+BENCH_USER_EMAIL = 'bench-user@shesafe.test'
+BENCH_USER_ID = 2
+
+# Keep everything near the nearby-vendors queries the driver issues
+BENCH_CITIES = [CityCentre('Sonipat', 28.95, 77.10, 25.0, 1.0)]
+
+DEFAULT_SCALE = {
+    'users': 5000,
+    'vendors': 1000,
+    'bookings': 50000,
+    'feedbacks': 10000,
+}
+
+
+def is_seeded():
+    """True if the database already holds a seeded dataset (the bench admin exists)."""
+    if not db.inspect(db.engine).has_table(User.__tablename__):
+        return False
+    return db.session.execute(db.select(User.id).filter_by(email=BENCH_ADMIN_EMAIL)).first() is not None
+
+
+def seed(users, vendors, bookings, feedbacks, bench_pool=1000, batch_size=5000, random_seed=42):
+    """
+    Drop and recreate all tables, then insert the requested number of rows.
+
+    The bench user also gets `bench_pool` completed, unreviewed bookings so
+    feedback submission and QR routes have dedicated rows to hit.
+    Returns a dict describing the dataset.
+    """
+    rng = random.Random(random_seed)
+    db.drop_all()
+    db.create_all()
+
+    password_hash = generate_password_hash(BENCH_PASSWORD)
+    now = datetime(2025, 1, 1)
+
+    bulk_insert(User, [
+        {'id': 1, 'name': 'Bench Admin', 'email': BENCH_ADMIN_EMAIL, 'password_hash': password_hash, 'role': 'admin'},
+        {'id': BENCH_USER_ID, 'name': 'Bench User', 'email': BENCH_USER_EMAIL,
+         'password_hash': password_hash, 'role': 'user'},
+    ])
+    counts = generate(users=users, vendors=vendors, bookings=bookings, feedbacks=feedbacks,
+                      cities=BENCH_CITIES, password_hash=password_hash, batch_size=batch_size,
+                      random_seed=random_seed, now=now)
+
+    first_vendor = db.session.execute(db.select(db.func.min(Booking.vendor_id))).scalar() or 1
+    last_vendor = db.session.execute(db.select(db.func.max(Booking.vendor_id))).scalar() or 1
+    first_booking = counts['bookings'] + 1
+    counts['bookings'] += bulk_insert(Booking, (
+        {
+            'id': first_booking + i,
+            'user_id': BENCH_USER_ID,
+            'vendor_id': rng.randint(first_vendor, last_vendor),
+            'booking_time': now,
+            'visit_date': now + timedelta(days=1),
+            'payment_mode': 'app',
+            'amount': 20.0,
+            'status': 'completed',
+        }
+        for i in range(bench_pool)
+    ), batch_size)
+    RevenueDaily.rebuild()
+
+    reset_sequences()
+    db.session.commit()
+    counts['users'] += 2
+    return counts
@@ -0,0 +1,19 @@
+import os
+import sys
+
+# Add the project root to sys.path
+sys.path.append(os.getcwd())
+
+from app.assets import MANIFEST_NAME, write_manifest
+
+STATIC_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app', 'static')
+
+
+def build():
+    """Write the content-hashed asset manifest used by asset_url() and the service worker."""
+    manifest = write_manifest(STATIC_FOLDER)
+    print(f"Wrote {MANIFEST_NAME}: {len(manifest['assets'])} assets, version {manifest['version']}.")
+
+
+if __name__ == "__main__":
+    build()
@@ -1,4 +1,5 @@
 import os
+import sys
 
 basedir = os.path.abspath(os.path.dirname(__file__))
 
@@ -6,6 +7,8 @@ basedir = os.path.abspath(os.path.dirname(__file__))
 class Config:
     """Base configuration."""
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
+    # HMAC key for booking QR tokens (falls back to SECRET_KEY)
+    BOOKING_TOKEN_SECRET = os.environ.get('BOOKING_TOKEN_SECRET') or SECRET_KEY
     @staticmethod
     def fix_database_url(url):
         if not url or not isinstance(url, str):
@@ -47,20 +50,58 @@ class Config:
         except Exception:
             return url
 
+    @staticmethod
+    def build_engine_options(mode):
+        """
+        SQLAlchemy engine options for a pooling mode:
+
+        - 'null': no pooling, one connection per checkout (serverless / Vercel)
+        - 'queue': persistent QueuePool for long-lived workers
+        - 'pgbouncer': small QueuePool in front of PgBouncer in transaction
+          mode. No session-level state is set on connections, and PgBouncer
+          owns liveness checks, so pre-ping is off.
+        """
+        from sqlalchemy.pool import NullPool, QueuePool
+
+        connect_args = {
+            'sslmode': os.environ.get('DB_SSLMODE', 'require'),
+            'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', 10))
+        }
+
+        if mode == 'null':
+            return {
+                'poolclass': NullPool,
+                'pool_pre_ping': True,
+                'connect_args': connect_args
+            }
+
+        options = {
+            'poolclass': QueuePool,
+            'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+            'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+            'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+            'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+            'pool_pre_ping': True,
+            'pool_reset_on_return': 'rollback',
+            'connect_args': connect_args
+        }
+        if mode == 'pgbouncer':
+            options.update({
+                'pool_size': int(os.environ.get('DB_POOL_SIZE', 2)),
+                'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 5)),
+                'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 300)),
+                'pool_pre_ping': False
+            })
+        elif mode != 'queue':
+            raise ValueError(f"Unknown DB_POOL_MODE: {mode!r}")
+        return options
+
     DATABASE_URL = fix_database_url.__func__(os.environ.get('DATABASE_URL'))
+    # 'null' (serverless), 'queue' (long-lived workers) or 'pgbouncer'
+    DB_POOL_MODE = os.environ.get('DB_POOL_MODE') or ('null' if os.environ.get('VERCEL') == '1' else 'queue')
     if DATABASE_URL:
         SQLALCHEMY_DATABASE_URI = DATABASE_URL
-        
-        # Optimize for Supabase and Serverless (Vercel)
-        from sqlalchemy.pool import NullPool
-        SQLALCHEMY_ENGINE_OPTIONS = {
-            'poolclass': NullPool,
-            'pool_pre_ping': True,
-            'connect_args': {
-                'sslmode': 'require',
-                'connect_timeout': 30
-            }
-        }
+        SQLALCHEMY_ENGINE_OPTIONS = build_engine_options.__func__(DB_POOL_MODE)
     else:
         SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(basedir, 'instance', 'app.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
@@ -70,15 +111,73 @@ class Config:
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max upload size
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'webp'}
 
+    # Content-addressed image store ('local' is the only built-in backend).
+    # Runtime data: never commit what is written under IMAGE_STORE_PATH.
+    IMAGE_STORE_BACKEND = os.environ.get('IMAGE_STORE_BACKEND', 'local')
+    IMAGE_STORE_PATH = os.environ.get('IMAGE_STORE_PATH') or \
+        ('/tmp/images' if os.environ.get('VERCEL') == '1' else os.path.join(basedir, 'instance', 'images'))
+
+    # Upload processing (app/image_processing.py): uploads are re-encoded to
+    # IMAGE_FORMAT (WEBP, AVIF if Pillow supports it, JPEG or PNG) without
+    # metadata, shrunk to IMAGE_MAX_DIMENSION, in a pool of
+    # IMAGE_PROCESS_WORKERS processes (default min(4, CPUs); 0 = inline).
+    IMAGE_FORMAT = os.environ.get('IMAGE_FORMAT', 'WEBP')
+    IMAGE_QUALITY = int(os.environ.get('IMAGE_QUALITY', 82))
+    IMAGE_MAX_DIMENSION = int(os.environ.get('IMAGE_MAX_DIMENSION', 2048))
+    IMAGE_MAX_PIXELS = int(os.environ.get('IMAGE_MAX_PIXELS', 40_000_000))
+    IMAGE_PROCESS_WORKERS = int(os.environ['IMAGE_PROCESS_WORKERS']) if os.environ.get('IMAGE_PROCESS_WORKERS') \
+        else (0 if os.environ.get('VERCEL') == '1' else None)
+    # Widths of the srcset copies made of every image (narrower than the original)
+    IMAGE_THUMBNAIL_WIDTHS = tuple(int(w) for w in os.environ.get('IMAGE_THUMBNAIL_WIDTHS', '160,320,640').split(','))
+
+    # /img/<hash>?w=&h=&fmt= resized variants (app/image_resize.py), kept in an
+    # on-disk LRU cache of at most IMAGE_RESIZE_CACHE_BYTES. IMAGE_RESIZE_SIZES
+    # are the WxH boxes the templates render; each is served at 1x and 2x.
+    IMAGE_RESIZE_CACHE_PATH = os.environ.get('IMAGE_RESIZE_CACHE_PATH') or \
+        ('/tmp/image-cache' if os.environ.get('VERCEL') == '1' else os.path.join(basedir, 'instance', 'image-cache'))
+    IMAGE_RESIZE_CACHE_BYTES = int(os.environ.get('IMAGE_RESIZE_CACHE_BYTES', 256 * 1024 * 1024))
+    IMAGE_RESIZE_SIZES = tuple(tuple(int(n) for n in box.split('x'))
+                               for box in os.environ.get('IMAGE_RESIZE_SIZES', '96x96,128x160').split(','))
+
+    # Per-request profiling (Server-Timing header, /admin/profiling histogram).
+    # QUERY_BUDGET_ENFORCE makes routes fail when they exceed their @query_budget.
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED') == '1'
+    QUERY_BUDGET_ENFORCE = os.environ.get('QUERY_BUDGET_ENFORCE') == '1'
+
+    # Rows per page on admin list pages
+    ADMIN_PAGE_SIZE = int(os.environ.get('ADMIN_PAGE_SIZE', 50))
+
+    # Cache for shared read-mostly data (verified vendor list, ...).
+    # Set CACHE_REDIS_URL (requires the redis package) to share it across workers.
+    CACHE_TTL = int(os.environ.get('CACHE_TTL', 300))
+    CACHE_MAXSIZE = int(os.environ.get('CACHE_MAXSIZE', 128))
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL')
+
     # Google Maps API Key
     GOOGLE_MAPS_API_KEY = os.environ.get('GOOGLE_MAPS_API_KEY', '')
     if not GOOGLE_MAPS_API_KEY:
-        print("WARNING: GOOGLE_MAPS_API_KEY environment variable is not set. Google Maps features will not load.")
+        print("WARNING: GOOGLE_MAPS_API_KEY environment variable is not set. Google Maps features will not load.", file=sys.stderr)
 
     # AI Service API Keys
     OPENROUTER_API_KEY = os.environ.get('OPENROUTER_API_KEY', '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')
     NVIDIA_API_KEY = os.environ.get('NVIDIA_API_KEY', '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')
     SILICONFLOW_API_KEY = os.environ.get('SILICONFLOW_API_KEY', '14d72f5ee2284ad1bccbf09afb177f3e.XmKGoH-DT4_GfzPx9LEe_jQ6')
+    GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY', '')
+
+    # Ask AI gateway (app/ai_gateway.py). Keys stay server-side.
+    # AI_PROVIDERS overrides the built-in provider list, e.g. to point at a local stub.
+    AI_PROVIDERS = None
+    AI_HEDGE_DELAY = float(os.environ.get('AI_HEDGE_DELAY', 1.5))  # seconds before racing the next model
+    AI_MAX_HEDGES = int(os.environ.get('AI_MAX_HEDGES', 3))
+    AI_FIRST_TOKEN_TIMEOUT = float(os.environ.get('AI_FIRST_TOKEN_TIMEOUT', 20))
+    AI_STREAM_TIMEOUT = float(os.environ.get('AI_STREAM_TIMEOUT', 60))
+    AI_BREAKER_FAILURES = int(os.environ.get('AI_BREAKER_FAILURES', 3))
+    AI_BREAKER_COOLDOWN = float(os.environ.get('AI_BREAKER_COOLDOWN', 30))
+    # Ask AI response cache (app/ai_cache.py); AI_CACHE_TTL=0 disables it.
+    # AI_CACHE_PATH puts it in a SQLite file shared by all workers on the host.
+    AI_CACHE_TTL = int(os.environ.get('AI_CACHE_TTL', 24 * 3600))
+    AI_CACHE_MAXSIZE = int(os.environ.get('AI_CACHE_MAXSIZE', 1000))
+    AI_CACHE_PATH = os.environ.get('AI_CACHE_PATH')
 
     @staticmethod
     def init_app(app):
@@ -99,11 +198,25 @@ class TestingConfig(Config):
     """Testing configuration."""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    PROFILING_ENABLED = True
+    QUERY_BUDGET_ENFORCE = True
+
+
+class BenchmarkConfig(Config):
+    """Benchmark configuration: seeded database, profiling on, budgets off."""
+    DEBUG = False
+    SQLALCHEMY_DATABASE_URI = Config.fix_database_url(os.environ.get('BENCHMARK_DATABASE_URI')) or \
+        'sqlite:///' + os.path.join(basedir, 'instance', 'benchmark.db')
+    SQLALCHEMY_ENGINE_OPTIONS = Config.build_engine_options('queue') \
+        if SQLALCHEMY_DATABASE_URI.startswith('postgresql') else {}
+    PROFILING_ENABLED = True
+    QUERY_BUDGET_ENFORCE = False
 
 
 config = {
     'development': DevelopmentConfig,
     'production': ProductionConfig,
     'testing': TestingConfig,
+    'benchmark': BenchmarkConfig,
     'default': DevelopmentConfig
 }
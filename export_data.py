@@ -0,0 +1,42 @@
+"""
+Export bookings, feedback, vendors or the revenue rollup as CSV or JSONL.
+
+    python export_data.py bookings --start 2025-01-01 --end 2025-01-31 -o january.csv
+    python export_data.py revenue --format jsonl --vendor 12
+"""
+import argparse
+import os
+import sys
+from datetime import date
+
+# Add the project root to sys.path
+sys.path.append(os.getcwd())
+
+from app import create_app
+from app.exports import EXPORTS, FORMATS, stream_export
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Stream a SheSafe export to a file or stdout.')
+    parser.add_argument('kind', choices=sorted(EXPORTS))
+    parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+    parser.add_argument('--start', type=date.fromisoformat, help='first day to include (YYYY-MM-DD)')
+    parser.add_argument('--end', type=date.fromisoformat, help='last day to include (YYYY-MM-DD)')
+    parser.add_argument('--vendor', type=int, help='only this vendor id')
+    parser.add_argument('--config', default='default')
+    parser.add_argument('-o', '--output', help='output file (default: stdout)')
+    args = parser.parse_args(argv)
+
+    app = create_app(args.config)
+    with app.app_context():
+        out = open(args.output, 'w', newline='') if args.output else sys.stdout
+        try:
+            for chunk in stream_export(args.kind, args.format, args.start, args.end, args.vendor):
+                out.write(chunk)
+        finally:
+            if args.output:
+                out.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Populate the database with synthetic users, vendors, images, bookings and
+feedback, plus the real vendors around Ashoka University.
+
+    python generate_data.py --users 10000 --vendors 2000 --bookings 200000 --feedbacks 40000
+    python generate_data.py --reset --city "Jaipur:26.9124,75.7873:8:2" --city "Sonipat:28.9457,77.1024"
+    python generate_data.py --users 0 --vendors 0 --bookings 0   # fixtures only
+"""
+import argparse
+import os
+import sys
+import time
+
+# Add the project root to sys.path
+sys.path.append(os.getcwd())
+
+from werkzeug.security import generate_password_hash
+
+from app import create_app, db
+from app.cache import invalidate_verified_vendors
+from app.datagen import DEFAULT_CITIES, generate, load_fixtures, parse_city, reset_sequences
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Bulk-generate synthetic SheSafe data.')
+    parser.add_argument('--config', default='default', help="config name, e.g. 'production' or 'benchmark'")
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--vendors', type=int, default=200)
+    parser.add_argument('--bookings', type=int, default=10000)
+    parser.add_argument('--feedbacks', type=int, default=2000)
+    parser.add_argument('--city', action='append', type=parse_city, dest='cities',
+                        help="cluster centre as name:lat,lng[:spread_km[:weight]] (repeatable)")
+    parser.add_argument('--password', default='password123', help='password for every generated account')
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=42, help='random seed')
+    parser.add_argument('--no-fixtures', action='store_true', help='skip the real Ashoka-area vendors')
+    parser.add_argument('--reset', action='store_true', help='drop and recreate all tables first')
+    args = parser.parse_args(argv)
+
+    app = create_app(args.config)
+    with app.app_context():
+        if args.reset:
+            db.drop_all()
+        db.create_all()
+
+        started = time.perf_counter()
+        password_hash = generate_password_hash(args.password)
+        fixtures = 0 if args.no_fixtures else load_fixtures(password_hash)
+        counts = generate(
+            users=args.users, vendors=args.vendors, bookings=args.bookings, feedbacks=args.feedbacks,
+            cities=args.cities or DEFAULT_CITIES, password_hash=password_hash,
+            batch_size=args.batch_size, random_seed=args.seed,
+        )
+        reset_sequences()
+        db.session.commit()
+        invalidate_verified_vendors()
+
+        elapsed = time.perf_counter() - started
+        summary = ', '.join(f'{count} {name}' for name, count in counts.items())
+        print(f"Inserted {fixtures} fixture vendors and {summary} in {elapsed:.1f}s.")
+
+
+if __name__ == '__main__':
+    main()
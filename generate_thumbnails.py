@@ -0,0 +1,92 @@
+import argparse
+import os
+import sys
+import tempfile
+
+# Add the project root to sys.path
+sys.path.append(os.getcwd())
+
+from app import create_app, db
+from app.models import Vendor, VendorImage, utcnow
+from app.cache import invalidate_verified_vendors
+from app.image_processing import InvalidImage, get_image_pool, process_variants, processing_options
+from app.storage import get_image_store
+
+app = create_app()
+
+
+def _source_path(store, image, staging):
+    """(path, is_temporary) of the stored blob, copied to staging if the backend has no local file."""
+    path = store.local_path(image.content_hash)
+    if path:
+        return path, False
+    data = store.get(image.content_hash)
+    if data is None:
+        return None, False
+    fd, path = tempfile.mkstemp(dir=staging)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    return path, True
+
+
+def backfill(batch_size=50, limit=None):
+    """Make the srcset widths for stored images that don't have them yet, in batches."""
+    with app.app_context():
+        store = get_image_store()
+        staging = store.staging_dir()
+        options = processing_options()
+        pool = get_image_pool()
+
+        done = failed = 0
+        last_id = 0
+        while limit is None or done + failed < limit:
+            size = batch_size if limit is None else min(batch_size, limit - done - failed)
+            # Keyset pagination; rows that fail get variants={} so reruns skip them
+            batch = VendorImage.query.\
+                filter(VendorImage.id > last_id, VendorImage.content_hash.isnot(None),
+                       VendorImage.variants.is_(None)).\
+                order_by(VendorImage.id).limit(size).all()
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            sources = [_source_path(store, image, staging) for image in batch]
+            try:
+                results = pool.map(process_variants, [(path, staging, options) for path, _ in sources if path])
+            finally:
+                for path, temporary in sources:
+                    if temporary:
+                        os.remove(path)
+
+            results = iter(results)
+            for image, (path, _) in zip(batch, sources):
+                result = next(results) if path else InvalidImage('Missing from the image store')
+                if isinstance(result, Exception):
+                    print(f"Skipping image {image.id}: {result}")
+                    image.variants = {}
+                    failed += 1
+                    continue
+                variants, full_width = result
+                image.variants = {str(width): store.put_file(variant.path, variant.content_hash)
+                                  for width, variant in variants.items()}
+                image.variants[str(full_width)] = image.content_hash
+                done += 1
+
+            # Synced clients pick up the new srcsets as vendor changes
+            db.session.query(Vendor).filter(Vendor.id.in_({image.vendor_id for image in batch})).\
+                update({Vendor.updated_at: utcnow()}, synchronize_session=False)
+            db.session.commit()
+            db.session.expunge_all()
+            print(f"Processed up to image {last_id} ({done} done, {failed} failed)")
+
+        if done:
+            invalidate_verified_vendors()
+        print(f"Done. Thumbnails generated for {done} images, {failed} failed.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate srcset thumbnail widths for existing vendor images.")
+    parser.add_argument('--batch-size', type=int, default=50)
+    parser.add_argument('--limit', type=int, help="Process at most this many images in this run")
+    args = parser.parse_args()
+    backfill(batch_size=args.batch_size, limit=args.limit)
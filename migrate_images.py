@@ -0,0 +1,71 @@
+import argparse
+import binascii
+import os
+import sys
+
+# Add the project root to sys.path
+sys.path.append(os.getcwd())
+
+from sqlalchemy.orm import undefer
+from app import create_app, db
+from app.models import VendorImage
+from app.cache import invalidate_verified_vendors
+from app.schema import upgrade_schema
+from app.storage import decode_data_uri, get_image_store, sniff_mime_type
+
+app = create_app()
+
+
+def migrate(batch_size=100, dry_run=False):
+    """Move VendorImage.image_data blobs into the image store in batches."""
+    with app.app_context():
+        for line in upgrade_schema():
+            print(line)
+        store = get_image_store()
+
+        moved = failed = 0
+        last_id = 0
+        while True:
+            # Keyset pagination keeps each batch cheap and bounded in memory
+            # image_data is deferred on the model: load it with the batch, not per row
+            batch = VendorImage.query.options(undefer(VendorImage.image_data)).\
+                filter(VendorImage.id > last_id, VendorImage.image_data.isnot(None)).\
+                order_by(VendorImage.id).limit(batch_size).all()
+            if not batch:
+                break
+
+            for image in batch:
+                last_id = image.id
+                try:
+                    _, data = decode_data_uri(image.image_data)
+                except (binascii.Error, ValueError) as e:
+                    print(f"Skipping image {image.id}: could not decode ({e})")
+                    failed += 1
+                    continue
+
+                if not dry_run:
+                    image.content_hash = store.put(data)
+                    # The data URI's type came from the uploading client: go by the bytes only
+                    image.mime_type = sniff_mime_type(data)
+                    image.size_bytes = len(data)
+                    image.image_data = None
+                moved += 1
+
+            if not dry_run:
+                db.session.commit()
+            # Drop the loaded blobs before fetching the next batch
+            db.session.expunge_all()
+            print(f"Processed up to image {last_id} ({moved} moved, {failed} failed)")
+
+        # Cached vendor listings still point at the legacy image URLs
+        if moved and not dry_run:
+            invalidate_verified_vendors()
+        print(f"Done. {moved} images moved to the image store, {failed} failed.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move base64 VendorImage data into the image store.")
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+    migrate(batch_size=args.batch_size, dry_run=args.dry_run)
@@ -0,0 +1,25 @@
+import os
+import sys
+
+# Add the project root to sys.path
+sys.path.append(os.getcwd())
+
+from app import create_app, db
+from app.models import RevenueDaily
+
+app = create_app()
+
+
+def rebuild():
+    """Rebuild the revenue_daily rollup from completed bookings."""
+    with app.app_context():
+        # Creates revenue_daily if this database predates it
+        db.create_all()
+
+        rowcount = RevenueDaily.rebuild()
+        db.session.commit()
+        print(f"Rebuilt revenue rollup: {rowcount} day/vendor/payment-mode rows.")
+
+
+if __name__ == "__main__":
+    rebuild()
@@ -0,0 +1,28 @@
+import os
+import sys
+
+# Add the project root to sys.path
+sys.path.append(os.getcwd())
+
+from app import create_app, db
+from app.models import Vendor
+from app.cache import invalidate_verified_vendors
+from app.schema import upgrade_schema
+
+app = create_app()
+
+
+def recompute():
+    """Rebuild every vendor's rating aggregates from the feedbacks table."""
+    with app.app_context():
+        for line in upgrade_schema():
+            print(line)
+
+        rowcount = Vendor.recompute_ratings()
+        db.session.commit()
+        invalidate_verified_vendors()
+        print(f"Recomputed rating aggregates for {rowcount} vendors.")
+
+
+if __name__ == "__main__":
+    recompute()
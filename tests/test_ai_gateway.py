@@ -0,0 +1,139 @@
+"""
+Ask AI gateway against the local stub providers (benchmarks/ai_stub.py).
+
+    python -m pytest tests/test_ai_gateway.py
+"""
+import json
+import threading
+import time
+import unittest
+
+from app import create_app, db
+from app.ai_gateway import AIGateway
+from app.models import User
+from benchmarks.ai_stub import serve, stub_providers
+
+
+class StubTestCase(unittest.TestCase):
+    # name: (first_token_seconds, error_rate)
+    BEHAVIOURS = {
+        'fast': (0.05, 0.0),
+        'slow': (0.6, 0.0),
+        'failing': (0.0, 1.0),
+        'hanging': (30.0, 0.0),
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = serve(0, cls.BEHAVIOURS, token_delay=0.02)
+        cls.port = cls.server.server_address[1]
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def gateway(self, names, **options):
+        options.setdefault('hedge_delay', 0.1)
+        options.setdefault('first_token_timeout', 2.0)
+        options.setdefault('stream_timeout', 5.0)
+        return AIGateway(stub_providers(self.port, names), **options)
+
+    def wait_for(self, condition, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+
+class GatewayRaceTest(StubTestCase):
+    def test_fastest_provider_wins(self):
+        # 'slow' is tried first; the hedge to 'fast' launched 0.1s later should still win
+        events = list(self.gateway(['slow', 'fast']).stream('Is it safe?'))
+        self.assertEqual(events[0]['type'], 'meta')
+        self.assertEqual(events[0]['provider'], 'fast')
+        self.assertEqual(events[-1]['type'], 'done')
+        self.assertTrue(events[-1]['text'].startswith('[fast]'))
+
+    def test_losers_are_cancelled(self):
+        before = dict(self.server.stats.get('slow', {}))
+        gateway = self.gateway(['slow', 'fast'])
+        list(gateway.stream('Where is the nearest washroom?'))
+        self.assertTrue(self.wait_for(
+            lambda: self.server.stats['slow']['cancelled'] > before.get('cancelled', 0)))
+        self.assertEqual(self.server.stats['slow']['completed'], before.get('completed', 0))
+        # Losing a race is not a failure
+        slow = gateway.status()['providers']['slow']
+        self.assertEqual(slow['state'], 'closed')
+        self.assertEqual(slow['errors'], 0)
+
+
+class GatewayBreakerTest(StubTestCase):
+    def test_failing_provider_trips_breaker(self):
+        gateway = self.gateway(['failing'], failure_threshold=2)
+        for _ in range(2):
+            events = list(gateway.stream('Hello'))
+            self.assertEqual([e['type'] for e in events], ['error'])
+        self.assertEqual(gateway.status()['providers']['failing']['state'], 'open')
+        # Skipped without a request while open
+        requests = self.server.stats['failing']['requests']
+        events = list(gateway.stream('Hello again'))
+        self.assertEqual([e['type'] for e in events], ['error'])
+        self.assertEqual(self.server.stats['failing']['requests'], requests)
+
+    def test_hanging_provider_trips_breaker(self):
+        gateway = self.gateway(['hanging'], first_token_timeout=0.5, failure_threshold=2)
+        for _ in range(2):
+            events = list(gateway.stream('Hello'))
+            self.assertEqual([e['type'] for e in events], ['error'])
+        status = gateway.status()['providers']['hanging']
+        self.assertEqual(status['state'], 'open')
+        self.assertEqual(status['errors'], 2)
+
+
+class ChatEndpointTest(StubTestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app.extensions['ai_gateway'] = self.gateway(['fast'])
+        with self.app.app_context():
+            db.create_all()
+            user = User(name='Test User', email='ai-test@shesafe.test', role='user')
+            user.set_password('password')
+            db.session.add(user)
+            db.session.commit()
+        self.client = self.app.test_client()
+        self.client.post('/login', data={'email': 'ai-test@shesafe.test', 'password': 'password'})
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_sse_framing(self):
+        response = self.client.post('/api/ai/chat', json={'prompt': 'Hygiene tips?'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+
+        body = response.get_data(as_text=True)
+        self.assertTrue(body.endswith('\n\n'))
+        frames = body[:-2].split('\n\n')
+        events = []
+        for frame in frames:
+            event_line, data_line = frame.split('\n')
+            self.assertTrue(event_line.startswith('event: '))
+            self.assertTrue(data_line.startswith('data: '))
+            event = json.loads(data_line[len('data: '):])
+            self.assertEqual(event['type'], event_line[len('event: '):])
+            events.append(event)
+
+        self.assertEqual(events[0]['type'], 'meta')
+        self.assertEqual(events[-1]['type'], 'done')
+        deltas = ''.join(e['text'] for e in events if e['type'] == 'delta')
+        self.assertEqual(events[-1]['text'].strip(), deltas.strip())
+
+    def test_prompt_required(self):
+        response = self.client.post('/api/ai/chat', json={'prompt': '  '})
+        self.assertEqual(response.status_code, 400)